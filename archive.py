@@ -0,0 +1,260 @@
+"""
+Langzeitarchiv der Ladehistorie im Spaltenformat (Parquet), partitioniert nach Wallbox und Monat.
+
+Jede Wallbox erhält ein Verzeichnis, jeder Monat eine Datei:
+
+    goe_archiv/123456/2024-05.parquet
+    goe_archiv/http%3A%2F%2F192.168.1.100/2024-05.parquet
+
+Die Dateien enthalten die Ladevorgänge mit echten Datums- und Gleitkommatypen
+sowie dem Sitzungsschlüssel (siehe session_store.session_keys). Beim Lesen werden
+nur die Dateien der angefragten Wallboxen und Monate und nur die benötigten
+Spalten geladen (Memory Mapping); ein Jahr einer ganzen Flotte ist damit ohne
+erneuten Export in Millisekunden verfügbar.
+
+Für das Archiv wird pyarrow benötigt (optional, pip install pyarrow).
+
+Aufruf:
+    python archive.py goe_archiv --import-db goe_charger_sessions.sqlite
+    python archive.py goe_archiv --year 2024
+    python archive.py goe_archiv --year 2024 --serial 123456 --csv pruefung_2024.csv
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import date, timedelta
+from urllib.parse import quote, unquote
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Local Imports
+from session_store import SessionStore, session_keys
+
+
+ARCHIVE_COLUMNS = ['session_key', 'Start', 'Ende', 'Energie [kWh]', 'ID Chip']
+DEFAULT_COLUMNS = ['Start', 'Ende', 'Energie [kWh]']
+
+
+def _pyarrow():
+    """Lädt pyarrow erst bei Bedarf, damit das Archiv optional bleibt."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Für das Archiv wird pyarrow benötigt (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def open_archive(root):
+    """Öffnet das Archiv und prüft vorab, ob pyarrow installiert ist (root None = kein Archiv)."""
+    if root is None:
+        return None
+    _pyarrow()
+    return SessionArchive(root)
+
+
+def _schema(pa):
+    return pa.schema([
+        ('session_key', pa.int64()),
+        ('Start', pa.timestamp('us')),
+        ('Ende', pa.timestamp('us')),
+        ('Energie [kWh]', pa.float64()),
+        ('ID Chip', pa.string())
+    ])
+
+
+class SessionArchive:
+    """
+    Parquet-Archiv der Ladevorgänge aller Wallboxen.
+    Neue Ladevorgänge werden monatsweise ergänzt; bereits archivierte werden über
+    ihren Sitzungsschlüssel erkannt.
+    """
+
+    def __init__(self, root="goe_archiv"):
+        """Initialisiert das Archiv.
+
+        Args:
+            root: Verzeichnis des Archivs (wird beim ersten Schreiben angelegt)
+        """
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _charger_dir(self, serial):
+        return os.path.join(self.root, quote(serial, safe=''))
+
+    def serials(self):
+        """Liefert die Schlüssel aller archivierten Wallboxen."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(name) for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def months(self, serial):
+        """Liefert die archivierten Monate einer Wallbox ('JJJJ-MM', aufsteigend)."""
+        directory = self._charger_dir(serial)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.parquet')] for name in os.listdir(directory) if name.endswith('.parquet'))
+
+    def write(self, serial, df):
+        """Ergänzt das Archiv einer Wallbox um Ladevorgänge.
+
+        Es werden nur die Monatsdateien neu geschrieben, in die neue Ladevorgänge fallen.
+
+        Args:
+            serial: Seriennummer bzw. Schlüssel der Wallbox
+            df: DataFrame mit den Spalten 'Start', 'Ende', 'Energie [kWh]' und optional 'ID Chip'
+
+        Returns:
+            Anzahl der neu archivierten Ladevorgänge
+        """
+        if not len(df):
+            return 0
+        pa, pq = _pyarrow()
+        schema = _schema(pa)
+
+        frame = pd.DataFrame({
+            'session_key': session_keys(serial, df),
+            'Start': df['Start'].to_numpy('datetime64[us]'),
+            'Ende': df['Ende'].to_numpy('datetime64[us]'),
+            'Energie [kWh]': df['Energie [kWh]'].to_numpy('float64'),
+            'ID Chip': df['ID Chip'].astype(object).where(df['ID Chip'].notna(), None)
+            if 'ID Chip' in df.columns else None
+        })
+        frame = frame[~frame['session_key'].duplicated()]
+
+        directory = self._charger_dir(serial)
+        added = 0
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            for month, part in frame.groupby(frame['Start'].dt.to_period('M'), sort=False):
+                path = os.path.join(directory, f"{month.strftime('%Y-%m')}.parquet")
+                table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+                if os.path.exists(path):
+                    existing = pq.read_table(path, memory_map=True)
+                    known = existing.column('session_key').to_numpy()
+                    table = table.filter(pa.array(~np.isin(part['session_key'].to_numpy(), known)))
+                    if not table.num_rows:
+                        continue
+                    added += table.num_rows
+                    table = pa.concat_tables([existing, table])
+                else:
+                    added += table.num_rows
+
+                # Erst vollständig schreiben, dann ersetzen: Leser sehen nie eine halbe Datei
+                temp = f"{path}.tmp"
+                pq.write_table(table.sort_by('Start'), temp)
+                os.replace(temp, path)
+        return added
+
+    def read(self, serials=None, start_date=None, end_date=None, columns=None):
+        """Liest Ladevorgänge aus dem Archiv.
+
+        Args:
+            serials: Schlüssel der Wallboxen (Standard: alle)
+            start_date: Erster Tag (date, Standard: ohne Begrenzung)
+            end_date: Letzter Tag (date, inklusive, Standard: ohne Begrenzung)
+            columns: Zu ladende Spalten aus ARCHIVE_COLUMNS (Standard: DEFAULT_COLUMNS)
+
+        Returns:
+            DataFrame mit den angefragten Spalten und 'Seriennummer' (kategorial),
+            nach Wallbox und Start sortiert; wie beim SessionStore zählen nur
+            Ladevorgänge, die im Zeitraum begonnen und geendet haben
+        """
+        pa, pq = _pyarrow()
+        columns = list(columns or DEFAULT_COLUMNS)
+        unknown = set(columns) - set(ARCHIVE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unknown))}")
+        needed = columns + [column for column in ('Start', 'Ende') if column not in columns]
+
+        first = f"{start_date:%Y-%m}" if start_date else None
+        last = f"{end_date:%Y-%m}" if end_date else None
+        serials = self.serials() if serials is None else list(dict.fromkeys(serials))
+        tables, codes = [], []
+        for code, serial in enumerate(serials):
+            directory = self._charger_dir(serial)
+            for month in self.months(serial):
+                if (first and month < first) or (last and month > last):
+                    continue
+                # ParquetFile statt read_table: kein Dataset-Aufbau je Datei
+                path = os.path.join(directory, f"{month}.parquet")
+                tables.append(pq.ParquetFile(path, memory_map=True).read(columns=needed, use_threads=False))
+                codes.append(code)
+
+        if tables:
+            df = pa.concat_tables(tables).to_pandas()
+        else:
+            df = _schema(pa).empty_table().select(needed).to_pandas()
+        # Wallbox je Zeile aus der Partition, als Kategorie ohne Kopie der Strings
+        counts = [table.num_rows for table in tables]
+        df['Seriennummer'] = pd.Categorical.from_codes(np.repeat(np.array(codes, dtype='int32'), counts),
+                                                       categories=pd.Index(serials, dtype=object))
+
+        mask = np.ones(len(df), dtype=bool)
+        if start_date:
+            mask &= (df['Start'] >= pd.Timestamp(start_date)).to_numpy()
+        if end_date:
+            mask &= (df['Ende'] < pd.Timestamp(end_date + timedelta(days=1))).to_numpy()
+        if not mask.all():
+            df = df[mask]
+        return df[columns + ['Seriennummer']].reset_index(drop=True)
+
+    def import_store(self, store):
+        """Übernimmt alle Ladevorgänge eines SessionStore in das Archiv.
+
+        Returns:
+            Anzahl der neu archivierten Ladevorgänge
+        """
+        added = 0
+        for serial in store.serials():
+            sessions = store.query_chargers([(serial, None)], date(1970, 1, 1), date.today())
+            added += self.write(serial, sessions)
+        return added
+
+
+def monthly_totals(sessions):
+    """Fasst Ladevorgänge je Wallbox und Monat zusammen (Anzahl und kWh)."""
+    month = sessions['Start'].dt.to_period('M').rename('Monat')
+    totals = sessions.groupby([sessions['Seriennummer'], month], observed=True)['Energie [kWh]']
+    return totals.agg(Ladevorgänge='count', kWh='sum').round({'kWh': 2})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parquet-Archiv der Ladevorgänge")
+    parser.add_argument('archive', help="Verzeichnis des Archivs")
+    parser.add_argument('--import-db', help="Alle Ladevorgänge aus dem lokalen Sitzungsspeicher übernehmen")
+    parser.add_argument('--year', type=int, help="Monatssummen eines Jahres ausgeben")
+    parser.add_argument('--serial', nargs='*', help="Nur diese Wallboxen (Standard: alle)")
+    parser.add_argument('--csv', help="Ladevorgänge des Jahres zusätzlich als CSV schreiben")
+    args = parser.parse_args(argv)
+
+    archive = SessionArchive(args.archive)
+    try:
+        if args.import_db:
+            added = archive.import_store(SessionStore(args.import_db))
+            print(f"{added} Ladevorgänge archiviert")
+
+        if args.year:
+            t0 = time.perf_counter()
+            sessions = archive.read(args.serial, date(args.year, 1, 1), date(args.year, 12, 31),
+                                    DEFAULT_COLUMNS + ['ID Chip'])
+            elapsed = time.perf_counter() - t0
+            print(monthly_totals(sessions).to_string())
+            print(f"\n{len(sessions)} Ladevorgänge in {elapsed * 1000:.1f} ms gelesen")
+            if args.csv:
+                sessions.to_csv(args.csv, sep=';', decimal=',', index=False, date_format='%d.%m.%Y %H:%M:%S')
+    except Exception as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
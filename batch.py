@@ -0,0 +1,462 @@
+"""
+Stapelverarbeitung ohne GUI: erstellt Berichte für viele Wallboxen und Mitarbeiter parallel.
+
+Die Wallboxen werden in einem Flotten-Manifest (JSON) beschrieben. Jeder Eintrag
+verwendet die Schlüssel der Einstellungsdatei, z.B.:
+
+    {
+        "defaults": {"api_type": "cloud", "price": "0.30"},
+        "jobs": [
+            {"serial_number": "123456", "cloud_api_key": "...",
+             "employee": "Max Mustermann", "license_plate": "B-XY 123"},
+            {"api_type": "local", "local_api_url": "http://192.168.1.100",
+             "employee": "Erika Musterfrau", "tariff": "tarif_ht_nt.json",
+             "report_mode": "sessions"}
+        ]
+    }
+
+Statt "price" kann "tariff" einen zeitabhängigen Tarif angeben, als dict oder als
+Pfad zu einer JSON-Datei (relativ zum Manifest, Format siehe tariffs.py).
+"report_mode" ist "daily" (Standard, eine Zeile pro Tag) oder "sessions"
+(eine Zeile pro Ladevorgang).
+
+Lädt ein Mitarbeiter an mehreren Wallboxen, listet "chargers" diese auf; der
+Bericht enthält dann die Ladevorgänge aller Wallboxen. "id_chips" beschränkt
+eine gemeinsam genutzte Wallbox auf die RFID-Chips des Mitarbeiters:
+
+    {"employee": "Max Mustermann", "license_plate": "B-XY 123", "chargers": [
+        {"serial_number": "123456", "cloud_api_key": "..."},
+        {"serial_number": "654321", "cloud_api_key": "...", "id_chips": ["Chip 7"]}
+    ]}
+
+Aufruf:
+    python batch.py flotte.json --month 2024-05 --workers 8 --timeout 300
+    python batch.py flotte.json --year 2024   # 12 Monatsberichte und eine Jahresübersicht je Wallbox
+
+Exit-Codes: 0 = alle Berichte erstellt, 1 = mindestens ein Bericht fehlgeschlagen,
+2 = ungültiger Aufruf oder ungültiges Manifest.
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import calendar
+import threading
+from datetime import date, datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Local Imports
+import goe_api
+import perf_log
+import report
+from report_model import REPORT_MODES, PERIODS
+from archive import open_archive
+from report_cache import ReportCache
+from session_store import SessionStore
+from tariffs import Tariff, load_tariff
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def load_manifest(path):
+    """Liest das Flotten-Manifest und ergänzt jeden Eintrag um die Standardwerte.
+
+    Returns:
+        Liste der Job-Konfigurationen
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    elif 'jobs' not in manifest:
+        # Einstellungsdatei der GUI: eine einzelne Wallbox
+        manifest = {'jobs': [manifest]}
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get('defaults', {})
+    jobs = []
+    for i, entry in enumerate(manifest.get('jobs', [])):
+        job = dict(defaults)
+        job.update(entry)
+        job.setdefault('api_type', 'local')
+        job.setdefault('price', '0.30')
+        if not all(goe_api.charger_key(charger) for charger in goe_api.charger_configs(job)):
+            raise ValueError(f"Eintrag {i + 1}: Seriennummer oder lokale API-URL erforderlich")
+        job.setdefault('report_mode', 'daily')
+        if job['report_mode'] not in REPORT_MODES:
+            raise ValueError(f"Eintrag {i + 1}: Unbekannte Berichtsart {job['report_mode']}")
+        if isinstance(job.get('tariff'), str):
+            job['tariff'] = load_tariff(os.path.join(base_dir, job['tariff']))
+        elif job.get('tariff'):
+            Tariff.from_dict(job['tariff'])
+        else:
+            report.parse_price(job['price'])
+        jobs.append(job)
+
+    if not jobs:
+        raise ValueError("Das Manifest enthält keine Einträge")
+    return jobs
+
+
+def report_prefixes(jobs):
+    """Vergibt jedem Job einen festen, eindeutigen Namensteil für seine Berichte."""
+    prefixes = []
+    used = set()
+    for job in jobs:
+        name = job.get('license_plate') or job.get('employee') or goe_api.charger_label(job)
+        slug = report.slugify(name, 'wallbox')
+        candidate = slug
+        suffix = 2
+        while candidate in used:
+            candidate = f"{slug}_{suffix}"
+            suffix += 1
+        used.add(candidate)
+        prefixes.append(f"goe_charger_bericht_{candidate}")
+    return prefixes
+
+
+def report_filenames(jobs, start_date, end_date, output_dir):
+    """Vergibt jedem Job einen festen, eindeutigen Dateinamen für den Bericht."""
+    return [os.path.join(output_dir, f"{prefix}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.pdf")
+            for prefix in report_prefixes(jobs)]
+
+
+class SharedExports:
+    """
+    Exporte eines Stapellaufs: Jobs mit derselben Wallbox teilen sich einen Export.
+    Wie beim ReportService wartet ein Job auf den laufenden Export einer anderen
+    Wallbox-Nutzung, statt selbst einen zu starten; jede Wallbox wird pro Lauf
+    höchstens einmal erfolgreich exportiert.
+    """
+
+    def __init__(self, store, client=None):
+        self.store = store
+        self.client = client
+        self._inflight = {}
+        self._done = set()
+        self._lock = threading.Lock()
+
+    def fetch(self, job, start_date, end_date, deadline=None, cancel_event=None):
+        """Liefert die Ladevorgänge eines Jobs wie goe_api.fetch_sessions.
+
+        Raises:
+            goe_api.Cancelled: wenn cancel_event gesetzt wird
+        """
+        for charger in goe_api.charger_configs(job):
+            self._refresh(charger, start_date, end_date, deadline, cancel_event)
+        return goe_api.query_sessions(job, start_date, end_date, self.store)
+
+    def _refresh(self, charger, start_date, end_date, deadline, cancel_event):
+        key = goe_api.charger_key(charger)
+        while True:
+            with self._lock:
+                if key in self._done or self.store.covers(key, end_date, start_date):
+                    perf_log.count('store_hits')
+                    return
+                future = self._inflight.get(key)
+                own = future is None
+                if own:
+                    future = Future()
+                    self._inflight[key] = future
+
+            if own:
+                try:
+                    goe_api.refresh_sessions(charger, self.store, deadline=deadline, client=self.client,
+                                             cancel_event=cancel_event, start_date=start_date)
+                    with self._lock:
+                        self._done.add(key)
+                    future.set_result(None)
+                except BaseException as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    with self._lock:
+                        self._inflight.pop(key, None)
+                return
+
+            perf_log.count('exports_coalesced')
+            while not wait([future], timeout=0.1).done:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise goe_api.Cancelled()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise Exception("Timeout beim Warten auf den Export")
+            error = future.exception()
+            # Wurde der Job mit dem Export abgebrochen, exportiert der nächste Wartende selbst
+            if error is not None and not isinstance(error, goe_api.Cancelled):
+                raise error
+
+
+def run_job(job, start_date, end_date, store, filename, timeout, client=None, render_options=None,
+            period=None, overview=False, pool=None, log=None, exports=None, cancel_event=None):
+    """Ruft die Daten einer Wallbox ab und erstellt den Bericht.
+
+    Mit period ('month', 'quarter', 'year') entsteht aus dem einen Abruf je ein
+    Bericht pro Zeitraum, optional mit Übersicht; zurückgegeben wird dann die
+    Liste der Dateinamen. Mit pool (siehe report.render_pool) wird der Bericht
+    in einem Worker-Prozess erstellt. Stufen und Zähler werden in log (PerfLog)
+    protokolliert. Mit exports (SharedExports) teilen sich Jobs derselben Wallbox
+    einen Export; wird cancel_event gesetzt, bricht der Job beim Export bzw.
+    vor dem nächsten Bericht mit goe_api.Cancelled ab.
+    """
+    with perf_log.Trace('batch_job', log, charger=goe_api.charger_label(job), employee=job.get('employee', ''),
+                        license_plate=job.get('license_plate', ''), start_date=start_date.isoformat(),
+                        end_date=end_date.isoformat()) as trace:
+        return _run_job(job, start_date, end_date, store, filename, timeout, client, render_options,
+                        period, overview, pool, trace, exports, cancel_event)
+
+
+def _run_job(job, start_date, end_date, store, filename, timeout, client, render_options, period, overview,
+             pool, trace, exports=None, cancel_event=None):
+    deadline = time.monotonic() + timeout
+
+    def check_cancelled(*_):
+        if cancel_event is not None and cancel_event.is_set():
+            raise goe_api.Cancelled()
+
+    if exports is not None:
+        sessions = exports.fetch(job, start_date, end_date, deadline, cancel_event)
+    else:
+        sessions = goe_api.fetch_sessions(job, start_date, end_date, store, deadline=deadline, client=client,
+                                          cancel_event=cancel_event)
+    check_cancelled()
+    spec = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'price': job['price'],
+        'tariff': job.get('tariff'),
+        'mode': job.get('report_mode', 'daily'),
+        'employee': job.get('employee', ''),
+        'license_plate': job.get('license_plate', ''),
+        'filename': filename
+    }
+    spec.update(render_options or {})
+    output_dir, name = os.path.split(filename)
+    if period:
+        spec['filename_prefix'] = name.rsplit(f"_{start_date:%Y%m%d}_", 1)[0]
+
+    args = (sessions, spec, period, output_dir or '.', overview)
+    if pool is not None:
+        # Die Stufen im Worker-Prozess erscheinen zusammengefasst als 'render'
+        with trace.stage('render'):
+            future = pool.submit(report.render_report, *args)
+            while not wait([future], timeout=0.1).done:
+                if cancel_event is not None and cancel_event.is_set():
+                    future.cancel()
+                    raise goe_api.Cancelled()
+            return future.result()
+    # Vor jedem Bericht eines Zeitraums prüfen, ob der Job abgebrochen wurde
+    return report.render_report(*args, progress_callback=check_cancelled)
+
+
+def run_batch(jobs, start_date, end_date, store, output_dir='.', workers=4, timeout=300, client=None,
+              render_options=None, period=None, overview=False, render_processes=0, log=None):
+    """Erstellt alle Berichte mit einem begrenzten Pool von Worker-Threads.
+
+    Args:
+        jobs: Job-Konfigurationen aus dem Manifest
+        start_date: Erster Tag des Zeitraums (date)
+        end_date: Letzter Tag des Zeitraums (date, inklusive)
+        store: SessionStore für die lokal gespeicherten Ladevorgänge
+        output_dir: Zielverzeichnis der Berichte
+        workers: Anzahl gleichzeitiger Jobs
+        timeout: Maximale Laufzeit eines Jobs in Sekunden; danach wird der Job
+            abgebrochen und nicht weiter abgewartet
+        client: GoeApiClient, den alle Jobs gemeinsam nutzen
+        render_options: Zusätzliche Angaben für den Bericht, z.B. 'chart_format' und 'chart_dpi'
+        period: Optional je ein Bericht pro 'month', 'quarter' oder 'year'
+        overview: Bei period zusätzlich eine Übersicht pro Job erstellen
+        render_processes: Anzahl der Prozesse für die PDF-Erstellung; 0 erstellt
+            die Berichte in den Worker-Threads
+        log: PerfLog für die Laufzeitmessung der Jobs
+
+    Returns:
+        Liste mit einem Ergebnis (dict) pro Job, in der Reihenfolge des Manifests
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    client = client or goe_api.GoeApiClient(pool_size=max(10, workers))
+    filenames = report_filenames(jobs, start_date, end_date, output_dir)
+    results = [
+        {'charger': goe_api.charger_label(job), 'employee': job.get('employee', ''),
+         'license_plate': job.get('license_plate', ''), 'status': 'pending',
+         'file': None, 'error': None, 'duration': None}
+        for job in jobs
+    ]
+    started = {}
+    lock = threading.Lock()
+    exports = SharedExports(store, client)
+    cancel_events = [threading.Event() for _ in jobs]
+
+    def task(i):
+        with lock:
+            started[i] = time.monotonic()
+        return run_job(jobs[i], start_date, end_date, store, filenames[i], timeout, client, render_options,
+                       period, overview, pool, log, exports, cancel_events[i])
+
+    # Abruf in Threads (wartet auf das Netz), PDF-Erstellung optional auf allen Kernen
+    pool = report.render_pool(render_processes) if render_processes else None
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(task, i): i for i in range(len(jobs))}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                i = futures[future]
+                result = results[i]
+                result['duration'] = round(now - started.get(i, now), 2)
+                try:
+                    result['file'] = future.result()
+                    result['status'] = 'ok'
+                except Exception as e:
+                    result['status'] = 'failed'
+                    result['error'] = str(e)
+
+            # Jobs, die ihr Zeitlimit überschritten haben, nicht weiter abwarten
+            for future in list(pending):
+                i = futures[future]
+                with lock:
+                    begin = started.get(i)
+                if begin is not None and now - begin > timeout:
+                    pending.discard(future)
+                    cancel_events[i].set()
+                    results[i]['status'] = 'timeout'
+                    results[i]['error'] = f"Zeitlimit von {timeout} s überschritten"
+                    results[i]['duration'] = round(now - begin, 2)
+    finally:
+        for future in pending:
+            future.cancel()
+            cancel_events[futures[future]].set()
+        executor.shutdown(wait=False)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return results
+
+
+def print_summary(results, stream=sys.stdout):
+    """Gibt eine Zusammenfassung der Stapelverarbeitung aus."""
+    for result in results:
+        label = result['license_plate'] or result['employee'] or result['charger']
+        detail = result['file'] if result['status'] == 'ok' else result['error']
+        if isinstance(detail, list):
+            detail = ', '.join(detail)
+        stream.write(f"{result['status']:<8} {result['duration'] or 0:>7.2f}s  {label}: {detail}\n")
+
+    ok = sum(1 for r in results if r['status'] == 'ok')
+    stream.write(f"\n{ok} von {len(results)} Berichten erstellt, {len(results) - ok} fehlgeschlagen\n")
+
+
+def month_range(month):
+    """Wandelt 'JJJJ-MM' in den ersten und letzten Tag des Monats um."""
+    year, month = (int(part) for part in month.split('-'))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def date_range(args):
+    """Ermittelt den Zeitraum aus --start/--end, --month oder --year (Standard: Vormonat).
+
+    Returns:
+        (erster Tag, letzter Tag) als date
+    """
+    if args.start or args.end:
+        if not (args.start and args.end):
+            raise ValueError("--start und --end müssen gemeinsam angegeben werden")
+        start_date, end_date = date.fromisoformat(args.start), date.fromisoformat(args.end)
+    elif args.month:
+        start_date, end_date = month_range(args.month)
+    elif args.year:
+        start_date, end_date = date(args.year, 1, 1), date(args.year, 12, 31)
+    else:
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+        start_date, end_date = last_month.replace(day=1), last_month
+    if start_date > end_date:
+        raise ValueError("Das Startdatum muss vor dem Enddatum liegen!")
+    return start_date, end_date
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="go-e Charger Berichte für eine ganze Flotte erstellen")
+    parser.add_argument('manifest', help="Flotten-Manifest (JSON)")
+    parser.add_argument('--month', help="Abrechnungsmonat im Format JJJJ-MM (Standard: Vormonat)")
+    parser.add_argument('--year', type=int, help="Abrechnungsjahr (je ein Bericht pro Monat und eine Übersicht)")
+    parser.add_argument('--start', help="Startdatum im Format JJJJ-MM-TT")
+    parser.add_argument('--end', help="Enddatum im Format JJJJ-MM-TT")
+    parser.add_argument('--workers', type=int, default=4, help="Anzahl paralleler Jobs")
+    parser.add_argument('--timeout', type=float, default=300, help="Zeitlimit pro Job in Sekunden")
+    parser.add_argument('--output-dir', default='.', help="Zielverzeichnis der Berichte")
+    parser.add_argument('--chart-format', choices=['raster', 'jpeg', 'vector'], default='raster',
+                        help="Format des Verbrauchsdiagramms")
+    parser.add_argument('--chart-dpi', type=int, default=300, help="Auflösung des Verbrauchsdiagramms")
+    parser.add_argument('--split-by', choices=list(PERIODS),
+                        help="Je ein Bericht pro Monat, Quartal oder Jahr aus einem Abruf")
+    parser.add_argument('--overview', action='store_true',
+                        help="Mit --split-by zusätzlich eine Übersicht pro Wallbox erstellen")
+    parser.add_argument('--render-processes', type=int, default=0,
+                        help="PDF-Erstellung auf N Prozesse verteilen (0 = in den Worker-Threads, -1 = alle Kerne)")
+    parser.add_argument('--cache', help="Fertige Berichte hier zwischenspeichern; unveränderte werden nur kopiert")
+    parser.add_argument('--cache-mb', type=int, default=200, help="Höchstgröße des Berichts-Zwischenspeichers in MB")
+    parser.add_argument('--db', default='goe_charger_sessions.sqlite', help="Lokaler Sitzungsspeicher")
+    parser.add_argument('--archive', help="Neue Ladevorgänge zusätzlich im Parquet-Archiv ablegen (benötigt pyarrow)")
+    parser.add_argument('--summary', help="Zusammenfassung zusätzlich als JSON-Datei schreiben")
+    parser.add_argument('--perf-log', help="Laufzeitmessung je Job als JSON Lines anhängen")
+    parser.add_argument('--metrics', help="Laufzeitmessung als Prometheus-Metriken (Textformat) schreiben")
+    parser.add_argument('--cloud-url', default=goe_api.CLOUD_API_URL,
+                        help="URL-Vorlage der Cloud API, z.B. für den Stub in benchmarks/goe_stub_server.py")
+    parser.add_argument('--data-url', default=goe_api.DATA_API_URL, help="Basis-URL der Export-API")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        start_date, end_date = date_range(args)
+        if args.year and not (args.start or args.end or args.month):
+            # Ganzes Jahr: je ein Bericht pro Monat und eine Übersicht
+            args.split_by = args.split_by or 'month'
+            args.overview = True
+        if args.workers < 1:
+            raise ValueError("--workers muss mindestens 1 sein")
+        jobs = load_manifest(args.manifest)
+        store = SessionStore(args.db, open_archive(args.archive))
+    except (OSError, ValueError, ImportError) as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return EXIT_USAGE
+
+    log = perf_log.PerfLog(args.perf_log, keep=bool(args.metrics)) if (args.perf_log or args.metrics) else None
+    render_options = {'chart_format': args.chart_format, 'chart_dpi': args.chart_dpi}
+    if args.cache:
+        render_options['cache'] = ReportCache(args.cache, args.cache_mb * 1024 * 1024)
+    client = goe_api.GoeApiClient(pool_size=max(10, args.workers), cloud_url=args.cloud_url, data_url=args.data_url)
+    results = run_batch(jobs, start_date, end_date, store, args.output_dir, args.workers, args.timeout, client,
+                        render_options=render_options,
+                        period=args.split_by, overview=args.overview,
+                        render_processes=(os.cpu_count() if args.render_processes < 0 else args.render_processes),
+                        log=log)
+    print_summary(results)
+
+    if args.metrics:
+        log.write_prometheus(args.metrics)
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump({
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'results': results
+            }, f, indent=2, ensure_ascii=False)
+
+    return EXIT_OK if all(r['status'] == 'ok' for r in results) else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
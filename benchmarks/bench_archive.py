@@ -0,0 +1,71 @@
+"""
+Benchmark: ein Jahr Ladehistorie einer Flotte aus dem Parquet-Archiv lesen.
+
+Legt für N Wallboxen mehrere Jahre synthetische Ladevorgänge im lokalen Speicher
+(SQLite) und im Archiv an und misst, wie schnell ein Jahr aller Wallboxen aus
+beiden gelesen wird – einmal mit allen Spalten, einmal nur mit Start und Energie.
+
+Aufruf:
+    python benchmarks/bench_archive.py --chargers 50 --years 3
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local Imports
+from archive import SessionArchive
+from session_store import SessionStore
+from synthetic_export import synthetic_sessions
+
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für das Parquet-Archiv")
+    parser.add_argument('--chargers', type=int, default=50)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    first_year = date.today().year - args.years
+    rows = args.years * 365 * 2  # etwa zwei Ladevorgänge pro Tag
+
+    with tempfile.TemporaryDirectory() as workdir:
+        archive = SessionArchive(os.path.join(workdir, 'archiv'))
+        store = SessionStore(os.path.join(workdir, 'sessions.sqlite'), archive)
+        serials = [f"{100000 + i}" for i in range(args.chargers)]
+
+        t0 = time.perf_counter()
+        for i, serial in enumerate(serials):
+            df = synthetic_sessions(rows, start=f"{first_year}-01-01", serial=serial, seed=i,
+                                    span_days=args.years * 365)
+            store.add_sessions(serial, df[['Start', 'Ende', 'Energie [kWh]', 'ID Chip']])
+        print(f"{args.chargers} Wallboxen, {args.chargers * rows} Ladevorgänge angelegt "
+              f"in {time.perf_counter() - t0:.1f} s")
+
+        start, end = date(first_year, 1, 1), date(first_year, 12, 31)
+        sources = [(serial, None) for serial in serials]
+        archive.read(serials[:1], start, end)  # pyarrow laden
+
+        sqlite, t_sqlite = timed(store.query_chargers, sources, start, end)
+        full, t_full = timed(archive.read, None, start, end, ['Start', 'Ende', 'Energie [kWh]', 'ID Chip'])
+        pruned, t_pruned = timed(archive.read, None, start, end, ['Start', 'Energie [kWh]'])
+
+    print(f"Jahr {first_year}: {len(full)} Ladevorgänge")
+    print(f"SQLite                     {t_sqlite * 1000:>8.1f} ms   ({len(sqlite)} Zeilen)")
+    print(f"Archiv, alle Spalten       {t_full * 1000:>8.1f} ms")
+    print(f"Archiv, Start und Energie  {t_pruned * 1000:>8.1f} ms   ({len(pruned)} Zeilen)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: Diagrammerstellung pro Bericht.
+
+Vergleicht das frühere Vorgehen (pyplot, savefig mit 300 dpi in temp_chart.png,
+Einlesen über pdf.image) mit dem ChartRenderer in allen Formaten. Gemessen wird
+die Zeit vom Diagramm bis zum eingebetteten Bild im PDF.
+
+Aufruf:
+    python benchmarks/bench_chart.py --reports 20 --days 31
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.dates import DateFormatter
+
+# Local Imports
+from chart import ChartRenderer
+from report import PDF
+
+
+def legacy_chart(pdf, dates, values, workdir):
+    plt.figure(figsize=(10, 4))
+    plt.bar(dates, values, width=0.8, color='#34495e', alpha=0.7)
+    plt.grid(True, linestyle='--', alpha=0.3, axis='y')
+    plt.title('Stromverbrauch im Zeitverlauf')
+    plt.xlabel('Datum')
+    plt.ylabel('Verbrauch (kWh)')
+    plt.gca().xaxis.set_major_formatter(DateFormatter('%d.%m.%Y'))
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    chart_filename = os.path.join(workdir, 'temp_chart.png')
+    plt.savefig(chart_filename, dpi=300, bbox_inches='tight')
+    plt.close()
+    pdf.image(chart_filename, x=10, y=pdf.get_y(), w=190)
+    os.remove(chart_filename)
+
+
+def measure(name, draw, reports, dates, values):
+    times = []
+    size = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        filename = os.path.join(workdir, 'chart.pdf')
+        for _ in range(reports):
+            pdf = PDF(filename)
+            pdf.add_page()
+            t0 = time.perf_counter()
+            draw(pdf, dates, values)
+            times.append(time.perf_counter() - t0)
+            size = os.path.getsize(pdf.output())
+    # Erster Durchlauf enthält einmalige Initialisierung (Schriften, Figure-Vorlage)
+    steady = times[1:] or times
+    print(f"{name:<16} erster {times[0] * 1000:>8.1f} ms   danach {np.median(steady) * 1000:>8.1f} ms   "
+          f"PDF {size / 1024:>7.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die Diagrammerstellung")
+    parser.add_argument('--reports', type=int, default=20)
+    parser.add_argument('--days', type=int, default=31)
+    args = parser.parse_args()
+
+    dates = pd.date_range('2024-01-01', periods=args.days, freq='D').to_numpy()
+    values = np.random.default_rng(0).uniform(0, 40, args.days)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        measure('pyplot+png 300', lambda pdf, d, v: legacy_chart(pdf, d, v, workdir), args.reports, dates, values)
+    for fmt, dpi in (('raster', 300), ('raster', 150), ('jpeg', 300), ('vector', None)):
+        renderer = ChartRenderer(dpi=dpi or 300, fmt=fmt)
+        measure(f"{fmt} {dpi or ''}".strip(), lambda pdf, d, v: renderer.draw(pdf, d, v, 10, pdf.get_y(), 190),
+                args.reports, dates, values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: Einlesen eines großen go-e CSV-Exports.
+
+Vergleicht das frühere Einlesen (StringIO, Standard-Datentypen, Datumsumwandlung
+und Filter nach dem vollständigen Laden) mit dem blockweisen Einlesen aus
+sessions.parse_sessions. Jede Variante läuft in einem eigenen Prozess, damit der
+maximale Speicherbedarf (Peak RSS) getrennt gemessen werden kann.
+
+Aufruf:
+    python benchmarks/bench_csv_parse.py --rows 500000
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import date
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    """Maximaler Speicherbedarf des Prozesses in MB (None, wenn nicht messbar)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def parse_legacy(csv_data, start_date, end_date):
+    import pandas as pd
+    df = pd.read_csv(StringIO(csv_data), sep=';', decimal=',')
+    df['Start'] = pd.to_datetime(df['Start'], format='%d.%m.%Y %H:%M:%S')
+    df['Ende'] = pd.to_datetime(df['Ende'], format='%d.%m.%Y %H:%M:%S')
+    mask = (df['Start'].dt.date >= start_date) & (df['Ende'].dt.date <= end_date)
+    return df[mask]
+
+
+def parse_streaming(csv_data, start_date, end_date):
+    from sessions import parse_sessions
+    return parse_sessions(csv_data, start_date=start_date, end_date=end_date)
+
+
+def run_variant(variant, export_file):
+    with open(export_file, 'r', encoding='utf-8') as f:
+        csv_data = f.read()
+    rows = csv_data.count('\n') - 1
+    baseline = peak_rss_mb()
+    start_date, end_date = date(2016, 3, 1), date(2016, 3, 31)
+
+    parse = parse_legacy if variant == 'legacy' else parse_streaming
+    t0 = time.perf_counter()
+    df = parse(csv_data, start_date, end_date)
+    elapsed = time.perf_counter() - t0
+
+    return {
+        'variant': variant,
+        'rows': rows,
+        'csv_mb': round(len(csv_data) / 1024 ** 2, 1),
+        'matched': len(df),
+        'parse_s': round(elapsed, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if baseline is not None else None,
+        'baseline_rss_mb': round(baseline, 1) if baseline is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für das Einlesen des CSV-Exports")
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--variant', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--export-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.export_file)))
+        return
+
+    from synthetic_export import synthetic_export
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export_file = os.path.join(tmp, 'export.csv')
+        with open(export_file, 'w', encoding='utf-8') as f:
+            f.write(synthetic_export(args.rows))
+
+        print(f"{'Variante':<10} {'Zeilen':>8} {'CSV MB':>7} {'Treffer':>8} {'Zeit s':>7} "
+              f"{'Peak RSS MB':>12} {'vor Parse MB':>13}")
+        for variant in ('legacy', 'streaming'):
+            output = subprocess.run([sys.executable, __file__, '--variant', variant, '--export-file', export_file],
+                                    check=True, capture_output=True, text=True).stdout
+            r = json.loads(output)
+            print(f"{r['variant']:<10} {r['rows']:>8} {r['csv_mb']:>7} {r['matched']:>8} {r['parse_s']:>7} "
+                  f"{r['peak_rss_mb'] or '-':>12} {r['baseline_rss_mb'] or '-':>13}")
+
+
+if __name__ == "__main__":
+    main()
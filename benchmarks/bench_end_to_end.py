@@ -0,0 +1,190 @@
+"""
+Benchmark: kompletter Ablauf vom Export bis zum PDF gegen den lokalen go-e Stub.
+
+Misst für verschiedene Exportgrößen jede Stufe einzeln:
+
+    fetch        DLL-URL, Ticket und Statusabfrage bis zum fertigen CSV (über HTTP)
+    parse        Einlesen des CSV-Exports (parse_sessions)
+    store        Übernahme in den lokalen Speicher und Abfrage des Berichtsmonats
+    aggregation  Berichtsmodell über alle Ladevorgänge des Exports
+    chart        Verbrauchsdiagramm des Berichtsmonats
+    pdf          PDF-Bericht des Berichtsmonats (ohne Diagramm, siehe chart)
+
+Mit --save werden die Ergebnisse als Referenz gespeichert, mit --baseline wird
+gegen eine Referenz verglichen: Der Exit-Code ist 1, wenn eine Stufe um mehr
+als --tolerance langsamer geworden ist.
+
+Aufruf:
+    python benchmarks/bench_end_to_end.py --sizes 100 1000 10000 100000 1000000
+    python benchmarks/bench_end_to_end.py --save referenz.json
+    python benchmarks/bench_end_to_end.py --baseline referenz.json --tolerance 1.5
+    python benchmarks/bench_end_to_end.py --scenarios
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Local Imports
+import goe_api
+import report
+from chart import get_renderer
+from report_model import build_report_model
+from sessions import parse_sessions
+from session_store import SessionStore
+from tariffs import Tariff
+from goe_stub_server import StubGoeServer
+
+
+STAGES = ('fetch', 'parse', 'store', 'aggregation', 'chart', 'pdf')
+DEFAULT_SIZES = (100, 1000, 10000, 100000, 1000000)
+
+# Unterschiede unterhalb dieser Schwelle (Sekunden) gelten nicht als Regression
+NOISE_FLOOR = 0.05
+
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def run_size(rows, workdir, chart_format, chart_dpi):
+    """Misst alle Stufen für einen Export mit rows Ladevorgängen.
+
+    Returns:
+        dict Stufe -> Sekunden
+    """
+    with StubGoeServer(rows=rows, export_seconds=0, progress_steps=1) as stub:
+        serial = '100000'
+        config = stub.charger_config(serial)
+        stub.export(serial)  # Export vorab erzeugen, gemessen wird nur die Übertragung
+        client = goe_api.GoeApiClient(timeout=(5, 300), **stub.client_options())
+
+        times = {}
+
+        def fetch():
+            ticket = client.get_ticket(client.get_export_url(config))
+            return client.poll_export(ticket)
+
+        csv_data, times['fetch'] = timed(fetch)
+        client.close()
+
+    sessions, times['parse'] = timed(parse_sessions, csv_data)
+    del csv_data
+
+    # Berichtsmonat: der letzte vollständige Monat
+    end_date = date.today().replace(day=1) - timedelta(days=1)
+    start_date = end_date.replace(day=1)
+
+    store = SessionStore(os.path.join(workdir, f"bench_{rows}.sqlite"))
+
+    def store_and_query():
+        store.add_sessions(serial, sessions)
+        return store.query(serial, start_date, end_date)
+
+    month, times['store'] = timed(store_and_query)
+
+    tariff = Tariff.flat('0.30')
+    _, times['aggregation'] = timed(build_report_model, sessions, tariff, 'daily')
+
+    model = build_report_model(month, tariff, 'daily')
+    renderer = get_renderer(chart_dpi, chart_format)
+    if chart_format == 'vector':
+        times['chart'] = 0.0
+    else:
+        renderer.image_info(model['dates'], model['energy_kwh'])  # Figure-Vorlage aufbauen
+        _, times['chart'] = timed(renderer.image_info, model['dates'], model['energy_kwh'])
+
+    spec = {'start_date': start_date, 'end_date': end_date, 'price': '0.30', 'chart_format': 'vector',
+            'filename': os.path.join(workdir, f"bench_{rows}.pdf")}
+    _, times['pdf'] = timed(report.generate_pdf, month, spec)
+
+    return times
+
+
+def run_scenarios(rows=1000):
+    """Misst den Abruf bei eingeschalteten Fehlern des Stubs."""
+    scenarios = [
+        ('normal', (), {}),
+        ('local_down', ('local_down',), {}),
+        ('rate_limit', ('rate_limit',), {}),
+        ('ticket_error', ('ticket_error',), {}),
+        ('timeout', ('timeout',), {'deadline': 3}),
+    ]
+    print(f"\nFehlerszenarien ({rows} Ladevorgänge, Export 0,5 s)")
+    for name, failures, options in scenarios:
+        with StubGoeServer(rows=rows, export_seconds=0.5, failures=failures) as stub:
+            client = goe_api.GoeApiClient(timeout=(1, 30), **stub.client_options())
+            deadline = time.monotonic() + options['deadline'] if 'deadline' in options else None
+            t0 = time.perf_counter()
+            try:
+                result = f"{len(client.export_sessions(stub.charger_config('100000'), deadline=deadline))} Ladevorgänge"
+            except Exception as e:
+                result = str(e)
+            print(f"{name:<14} {time.perf_counter() - t0:>7.2f} s   {result}")
+            client.close()
+
+
+def compare(results, baseline, tolerance):
+    """Vergleicht mit einer Referenz und liefert die Liste der Regressionen."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, seconds in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * tolerance and seconds - reference > NOISE_FLOOR:
+                regressions.append(f"{size} Ladevorgänge, {stage}: {seconds:.3f} s statt {reference:.3f} s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-End-Benchmark gegen den lokalen go-e Stub")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--chart-format', choices=['raster', 'jpeg', 'vector'], default='raster')
+    parser.add_argument('--chart-dpi', type=int, default=300)
+    parser.add_argument('--save', help="Ergebnisse als Referenz (JSON) speichern")
+    parser.add_argument('--baseline', help="Referenz (JSON) zum Vergleich")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Erlaubter Faktor gegenüber der Referenz")
+    parser.add_argument('--scenarios', action='store_true', help="Zusätzlich Fehlerszenarien messen")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'Ladevorgänge':>12}" + ''.join(f"{stage:>13}" for stage in STAGES) + f"{'gesamt':>13}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            times = run_size(rows, workdir, args.chart_format, args.chart_dpi)
+            results[str(rows)] = {stage: round(times[stage], 4) for stage in STAGES}
+            print(f"{rows:>12}" + ''.join(f"{times[stage] * 1000:>10.1f} ms" for stage in STAGES)
+                  + f"{sum(times.values()) * 1000:>10.1f} ms", flush=True)
+
+    if args.scenarios:
+        run_scenarios()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressionen:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nKeine Regression gegenüber der Referenz")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
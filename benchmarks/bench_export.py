@@ -0,0 +1,78 @@
+"""
+Benchmark: Exporte auf den benötigten Zeitraum beschränken.
+
+Misst gegen den lokalen Stub mit einer alten, viel genutzten Wallbox (--rows
+Ladevorgänge über --years Jahre), wie lange ein Abruf dauert und wie viele Bytes
+übertragen werden:
+
+    gesamte Historie    ein Export ohne Zeitraum (bisheriges Vorgehen)
+    Monatsbericht       erster Abruf für den Vormonat mit leerem Speicher
+    Vorababruf          erneuter Abruf am Folgetag (nur neue Ladevorgänge)
+    drei Jahre          Bericht über drei Jahre, in Jahresabschnitten parallel
+
+Mit --unscoped ignoriert der Stub die Zeiträume (ältere Export-API); der Client
+fällt dann auf einen Export der gesamten Historie zurück.
+
+Aufruf:
+    python benchmarks/bench_export.py --rows 100000 --years 10 --export-seconds 4
+"""
+
+# Standard Library Imports
+import os
+import sys
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Local Imports
+import goe_api
+import perf_log
+from session_store import SessionStore
+from goe_stub_server import StubGoeServer
+
+
+def measure(name, func):
+    with perf_log.Trace(name) as trace:
+        func()
+    counters = trace.record['counters']
+    print(f"{name:<20} {trace.record['duration']:>7.2f} s {counters.get('bytes_downloaded', 0) / 1024:>10.1f} KiB "
+          f"{counters.get('csv_bytes', 0) / 1024:>10.1f} KiB {counters.get('export_shards', 1):>8} "
+          f"{counters.get('polls', 0):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für Exporte eines Zeitraums")
+    parser.add_argument('--rows', type=int, default=100000, help="Ladevorgänge der Wallbox")
+    parser.add_argument('--years', type=int, default=10, help="Jahre Ladehistorie")
+    parser.add_argument('--export-seconds', type=float, default=4.0, help="Dauer eines vollständigen Exports")
+    parser.add_argument('--unscoped', action='store_true', help="Stub ignoriert from/to")
+    args = parser.parse_args()
+
+    failures = ('unscoped',) if args.unscoped else ()
+    with StubGoeServer(rows=args.rows, export_seconds=args.export_seconds, span_days=365 * args.years,
+                       failures=failures) as stub, tempfile.TemporaryDirectory() as workdir:
+        config = stub.charger_config('123456')
+        stub.export('123456')  # Export vorab erzeugen, gemessen wird nur der Abruf
+        client = goe_api.GoeApiClient(**stub.client_options())
+        store = SessionStore(os.path.join(workdir, 'sessions.sqlite'))
+
+        today = date.today()
+        month_end = today.replace(day=1) - timedelta(days=1)
+        month_start = month_end.replace(day=1)
+
+        print(f"{args.rows} Ladevorgänge über {args.years} Jahre, vollständiger Export {args.export_seconds:g} s"
+              f"{', Zeiträume werden ignoriert' if args.unscoped else ''}")
+        print(f"{'Abruf':<20} {'Dauer':>9} {'übertragen':>14} {'CSV':>14} {'Exporte':>8} {'Abfragen':>6}")
+        measure('gesamte Historie', lambda: goe_api.GoeApiClient(**stub.client_options()).export_sessions(config))
+        measure('Monatsbericht', lambda: goe_api.fetch_sessions(config, month_start, month_end, store,
+                                                                 client=client))
+        measure('Vorababruf', lambda: goe_api.refresh_sessions(config, store, client=client))
+        three_years = date(today.year - 3, today.month, 1)
+        measure('drei Jahre', lambda: goe_api.fetch_sessions(config, three_years, month_end, store, client=client))
+
+
+if __name__ == "__main__":
+    main()
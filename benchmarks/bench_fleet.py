@@ -0,0 +1,123 @@
+"""
+Benchmark: Flottenübersicht über viele Wallboxen und mehrere Jahre.
+
+Legt einen Sitzungsspeicher (und optional ein Parquet-Archiv) mit --chargers
+Wallboxen und --years Jahren synthetischer Ladevorgänge an und misst die
+Flottenübersicht (Lesen, Kennzahlen, PDF und CSV). Zum Vergleich wird für
+--sample Einträge wie in batch.py je ein eigener Bericht über den gesamten
+Zeitraum erstellt und auf alle Einträge hochgerechnet.
+
+Das Manifest enthält neben Einträgen mit einer Wallbox auch Mitarbeiter mit
+zwei Wallboxen und eine gemeinsam genutzte Wallbox mit ID-Chips.
+
+Aufruf:
+    python benchmarks/bench_fleet.py --chargers 200 --years 3 --archive
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Local Imports
+import fleet
+import report
+from batch import load_manifest
+from session_store import SessionStore
+from synthetic_export import synthetic_sessions
+
+
+def fleet_manifest(chargers):
+    """Manifest mit einem Eintrag je Wallbox; einige Mitarbeiter haben zwei Wallboxen."""
+    jobs = []
+    serials = [f"{100000 + i}" for i in range(chargers)]
+    shared, serials = serials[0], serials[1:]
+    for i, chip in enumerate(['Chip 1', 'Chip 2']):
+        jobs.append({'employee': f"Mitarbeiter Büro {i + 1}", 'license_plate': f"B-GO {i + 1}",
+                     'serial_number': shared, 'id_chips': [chip]})
+    while serials:
+        i = len(jobs)
+        if i % 10 == 0 and len(serials) > 1:
+            chargers_of_job = [{'serial_number': serials.pop(0)}, {'serial_number': serials.pop(0)}]
+            jobs.append({'employee': f"Mitarbeiter {i}", 'license_plate': f"M-GO {i}", 'chargers': chargers_of_job,
+                         'tariff': {'prices': [{'ht': '0,34', 'nt': '0,24'}], 'ht_hours': ['06:00', '22:00']}})
+        else:
+            jobs.append({'employee': f"Mitarbeiter {i}", 'license_plate': f"M-GO {i}",
+                         'serial_number': serials.pop(0), 'price': '0.30', 'power_kw': 22 if i % 3 else 11})
+    return {'jobs': jobs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die Flottenübersicht")
+    parser.add_argument('--chargers', type=int, default=200, help="Anzahl der Wallboxen")
+    parser.add_argument('--years', type=int, default=3, help="Jahre Ladehistorie")
+    parser.add_argument('--per-day', type=float, default=1.5, help="Ladevorgänge je Wallbox und Tag")
+    parser.add_argument('--sample', type=int, default=5, help="Einzelberichte zum Vergleich")
+    parser.add_argument('--archive', action='store_true', help="Zusätzlich aus dem Parquet-Archiv lesen")
+    args = parser.parse_args()
+
+    end_date = date(2024, 12, 31)
+    start_date = date(end_date.year - args.years + 1, 1, 1)
+    span_days = (end_date - start_date).days + 1
+    rows = int(span_days * args.per_day)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        manifest = os.path.join(workdir, 'flotte.json')
+        with open(manifest, 'w', encoding='utf-8') as f:
+            json.dump(fleet_manifest(args.chargers), f)
+        jobs = load_manifest(manifest)
+
+        archive = None
+        if args.archive:
+            from archive import open_archive
+            archive = open_archive(os.path.join(workdir, 'archiv'))
+        store = SessionStore(os.path.join(workdir, 'sessions.sqlite'))
+        t0 = time.perf_counter()
+        for i in range(args.chargers):
+            serial = f"{100000 + i}"
+            sessions = synthetic_sessions(rows, start=start_date.isoformat(), serial=serial, seed=i,
+                                          span_days=span_days)
+            sessions = sessions[sessions['Ende'] < datetime(end_date.year + 1, 1, 1)]
+            store.add_sessions(serial, sessions, fetched_at=datetime(end_date.year + 1, 1, 2))
+            if archive is not None:
+                archive.write(serial, sessions)
+        print(f"{args.chargers} Wallboxen, {len(jobs)} Einträge, je {rows} Ladevorgänge über {args.years} Jahre "
+              f"(Testdaten in {time.perf_counter() - t0:.1f} s angelegt)")
+
+        print(f"{'Quelle':<12} {'Lesen s':>8} {'Kennzahlen s':>13} {'PDF s':>7} {'CSV s':>7} {'gesamt s':>9} "
+              f"{'Ladevorgänge':>13}")
+        for name, source in [('Speicher', {'store': store})] + ([('Archiv', {'archive': archive})] if archive else []):
+            t0 = time.perf_counter()
+            sessions = fleet.load_fleet_sessions(jobs, start_date, end_date, **source)
+            t1 = time.perf_counter()
+            summary = fleet.fleet_summary(sessions, jobs, start_date, end_date, 'employee')
+            t2 = time.perf_counter()
+            fleet.write_fleet_pdf(summary, os.path.join(workdir, f"flotte_{name}.pdf"))
+            t3 = time.perf_counter()
+            fleet.write_fleet_csv(summary, os.path.join(workdir, f"flotte_{name}.csv"))
+            t4 = time.perf_counter()
+            print(f"{name:<12} {t1 - t0:>8.2f} {t2 - t1:>13.2f} {t3 - t2:>7.2f} {t4 - t3:>7.2f} {t4 - t0:>9.2f} "
+                  f"{summary['totals']['sessions']:>13}")
+
+        # Bisher: ein Bericht je Eintrag über den gesamten Zeitraum
+        sample = jobs[2:2 + args.sample]
+        t0 = time.perf_counter()
+        for i, job in enumerate(sample):
+            sessions = store.query_chargers([(job['serial_number'], None)], start_date, end_date)
+            report.generate_pdf(sessions, {'start_date': start_date, 'end_date': end_date, 'price': job['price'],
+                                           'mode': 'daily', 'chart_format': 'vector',
+                                           'filename': os.path.join(workdir, f"einzel_{i}.pdf")})
+        seconds = (time.perf_counter() - t0) / max(len(sample), 1)
+        print(f"Einzelberichte: {seconds:.2f} s je Eintrag, hochgerechnet {seconds * len(jobs):.1f} s "
+              f"für {len(jobs)} Einträge")
+
+
+if __name__ == "__main__":
+    main()
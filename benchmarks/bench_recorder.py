@@ -0,0 +1,102 @@
+"""
+Benchmark: Ladevorgänge aus der lokalen Aufzeichnung (recorder.py) rekonstruieren.
+
+Erzeugt ein Jahr Messwerte einer Wallbox im Abstand von --interval Sekunden –
+ohne das Weglassen unveränderter Messwerte, also der ungünstigste Fall – und
+misst, wie schnell daraus die Ladevorgänge eines Monats und des ganzen Jahres
+rekonstruiert werden. Danach zeichnet der Recorder --live Sekunden lang die
+simulierten Wallboxen des Stubs auf; die rekonstruierten Ladevorgänge werden mit
+den abgeschlossenen Zyklen des Stubs verglichen.
+
+Aufruf:
+    python benchmarks/bench_recorder.py --interval 10 --live 5 --chargers 4
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Third Party Imports
+import numpy as np
+
+# Local Imports
+import goe_api
+import recorder
+from goe_stub_server import StubGoeServer
+
+
+def synthetic_samples(year, interval, seed=0):
+    """Messwerte eines Jahres: jeden Abend angesteckt, 2-4 h Laden mit 11 kW, morgens abgesteckt."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(f"{year}-01-01", 'ms').astype('int64')
+    times = start + np.arange(0, 365 * 86400, interval, dtype='int64') * 1000
+    seconds_of_day = (times - start) // 1000 % 86400
+    day = (times - start) // 86400000
+    plugged = (seconds_of_day >= 18 * 3600) | (seconds_of_day < 7 * 3600)
+    charge_seconds = rng.uniform(2, 4, 366) * 3600
+    # Ladezeit des Abends, der zum Messwert gehört (nachts zählt der Vortag)
+    evening = np.where(seconds_of_day < 7 * 3600, day - 1, day)
+    since_plug = (seconds_of_day - 18 * 3600) % 86400
+    charging = plugged & (since_plug < charge_seconds[np.maximum(evening, 0)])
+    car = np.where(charging, 2, np.where(plugged, 4, 1)).astype('uint8')
+    eto = np.cumsum(np.where(charging, 11000 * interval // 3600, 0)).astype('uint32')
+
+    samples = np.zeros(len(times), dtype=recorder.SAMPLE_DTYPE)
+    samples['time'], samples['eto'], samples['car'] = times, eto, car
+    return samples
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die lokale Aufzeichnung")
+    parser.add_argument('--interval', type=int, default=10, help="Abstand der Messwerte in Sekunden")
+    parser.add_argument('--live', type=float, default=5.0, help="Dauer der Aufzeichnung gegen den Stub in Sekunden")
+    parser.add_argument('--chargers', type=int, default=4)
+    args = parser.parse_args()
+
+    year = date.today().year - 1
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, 'telemetrie')
+        samples = synthetic_samples(year, args.interval)
+        recorder.write_samples(root, '123456', samples)
+        size = sum(os.path.getsize(os.path.join(root, '123456', f"{month}.bin"))
+                   for month in recorder.recorded_months(root, '123456'))
+        print(f"{len(samples)} Messwerte ({args.interval} s Abstand), {size / 1e6:.1f} MB auf der Platte")
+
+        month, t_month = timed(recorder.recorded_sessions, root, '123456', date(year, 5, 1), date(year, 5, 31))
+        full, t_full = timed(recorder.recorded_sessions, root, '123456', date(year, 1, 1), date(year, 12, 31))
+        print(f"Mai {year}:  {len(month):>4} Ladevorgänge in {t_month * 1000:6.1f} ms")
+        print(f"Jahr {year}: {len(full):>4} Ladevorgänge in {t_full * 1000:6.1f} ms, "
+              f"{full['Energie [kWh]'].sum():.0f} kWh")
+
+        if args.live > 0:
+            serials = [f"{100000 + i}" for i in range(args.chargers)]
+            with StubGoeServer(cycle_seconds=1.0, cycle_wh=5000) as stub:
+                client = goe_api.GoeApiClient(**stub.client_options())
+                live = recorder.TelemetryRecorder([stub.charger_config(serial) for serial in serials],
+                                                  os.path.join(workdir, 'live'), interval=0.02, heartbeat=1.0,
+                                                  flush_samples=64, flush_seconds=1.0, client=client)
+                with live:
+                    time.sleep(args.live)
+                cycles = stub.completed_cycles()
+            buffer_bytes = sum(buffer.data.nbytes for buffer in live.buffers.values()) // len(serials)
+            found = [len(recorder.recorded_sessions(os.path.join(workdir, 'live'), serial)) for serial in serials]
+            print(f"Stub, {args.chargers} Wallboxen, {args.live:g} s: {cycles} Zyklen, "
+                  f"rekonstruiert {min(found)}-{max(found)} Ladevorgänge pro Wallbox "
+                  f"(ohne den bei Start laufenden), Puffer {buffer_bytes / 1024:.0f} KiB pro Wallbox")
+
+
+if __name__ == "__main__":
+    main()
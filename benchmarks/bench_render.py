@@ -0,0 +1,64 @@
+"""
+Benchmark: PDF-Erstellung für eine ganze Flotte.
+
+Erstellt N Monatsberichte aus synthetischen Ladevorgängen einmal nacheinander
+in einem Prozess und einmal über report.render_reports auf mehreren Kernen.
+
+Aufruf:
+    python benchmarks/bench_render.py --reports 48 --processes 4
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local Imports
+import report
+from synthetic_export import synthetic_sessions
+
+
+def tasks_for(reports, workdir, chart_format):
+    sessions = synthetic_sessions(60, start='2024-05-01')[['Start', 'Ende', 'Energie [kWh]']]
+    return [
+        (sessions, {
+            'start_date': date(2024, 5, 1), 'end_date': date(2024, 5, 31), 'price': '0.30',
+            'license_plate': f"B-XY {i}", 'chart_format': chart_format,
+            'filename': os.path.join(workdir, f"bericht_{i}.pdf")
+        })
+        for i in range(reports)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die PDF-Erstellung vieler Berichte")
+    parser.add_argument('--reports', type=int, default=48)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--chart-format', choices=['raster', 'jpeg', 'vector'], default='raster')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tasks = tasks_for(args.reports, workdir, args.chart_format)
+
+        t0 = time.perf_counter()
+        for sessions, spec in tasks:
+            report.generate_pdf(sessions, spec)
+        serial = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        report.render_reports(tasks, args.processes)
+        parallel = time.perf_counter() - t0
+
+    print(f"{args.reports} Berichte ({args.chart_format})")
+    print(f"ein Prozess      {serial:>7.2f} s   {serial / args.reports * 1000:>7.1f} ms/Bericht")
+    print(f"{args.processes:>2} Prozesse      {parallel:>7.2f} s   {parallel / args.reports * 1000:>7.1f} ms/Bericht   "
+          f"(inkl. Start der Worker)")
+
+
+if __name__ == "__main__":
+    main()
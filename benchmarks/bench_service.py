@@ -0,0 +1,103 @@
+"""
+Benchmark: Berichtsdienst mit vielen gleichzeitigen Benutzern gegen den lokalen go-e Stub.
+
+Startet den Stub und den Berichtsdienst (service.py) im selben Prozess. N Benutzer
+fordern gleichzeitig Berichte an – alle für denselben Monat, verteilt auf
+--chargers Wallboxen. Gemessen werden die Dauer bis zum fertigen PDF und die
+Anzahl der Exporte beim Stub: Dank Zusammenführung gleichzeitiger Anfragen sollte
+jede Wallbox genau einmal exportiert werden.
+
+Aufruf:
+    python benchmarks/bench_service.py --users 10 --chargers 1
+    python benchmarks/bench_service.py --users 40 --chargers 4 --export-seconds 5 --render-processes 2
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import date, timedelta
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Local Imports
+import goe_api
+import service
+from session_store import SessionStore
+from goe_stub_server import StubGoeServer
+
+
+def call(base_url, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = Request(base_url + path, data=data, headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für den Berichtsdienst")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--chargers', type=int, default=1)
+    parser.add_argument('--rows', type=int, default=5000, help="Ladevorgänge pro Wallbox")
+    parser.add_argument('--export-seconds', type=float, default=2.0, help="Dauer eines Exports beim Stub")
+    parser.add_argument('--render-processes', type=int, default=0)
+    args = parser.parse_args()
+
+    month_end = date.today().replace(day=1) - timedelta(days=1)
+    month = f"{month_end:%Y-%m}"
+    serials = [f"{100000 + i}" for i in range(args.chargers)]
+
+    with StubGoeServer(rows=args.rows, export_seconds=args.export_seconds) as stub, \
+            tempfile.TemporaryDirectory() as workdir:
+        jobs = [dict(stub.charger_config(serial), price='0.30', report_mode='daily',
+                     employee=f"Mitarbeiter {serial}") for serial in serials]
+        client = goe_api.GoeApiClient(**stub.client_options())
+        report_service = service.ReportService(
+            jobs, SessionStore(os.path.join(workdir, 'sessions.sqlite')), os.path.join(workdir, 'berichte'),
+            workers=args.users, render_processes=args.render_processes, client=client,
+            render_options={'chart_format': 'vector'})
+        server = service.make_server(report_service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        results = [None] * args.users
+
+        def user(i):
+            t0 = time.perf_counter()
+            job = call(base_url, '/reports', {'serial': serials[i % len(serials)], 'month': month,
+                                              'license_plate': f"B-XY {i}"})
+            while job['status'] not in ('done', 'failed'):
+                time.sleep(0.05)
+                job = call(base_url, f"/reports/{job['id']}")
+            results[i] = (time.perf_counter() - t0, job)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - t0
+
+        server.shutdown()
+        server.server_close()
+        report_service.close()
+        exports = sum(1 for _, path, _ in stub.requests if path == '/api/v1/get_ticket')
+
+    durations = sorted(duration for duration, _ in results)
+    failed = [job['error'] for _, job in results if job['status'] != 'done']
+    print(f"{args.users} Benutzer, {args.chargers} Wallbox(en), Export {args.export_seconds:.1f} s")
+    print(f"Exporte beim Stub:   {exports} (ohne Zusammenführung {args.users})")
+    print(f"Dauer bis PDF:       Median {durations[len(durations) // 2]:.2f} s, "
+          f"Maximum {durations[-1]:.2f} s, gesamt {total:.2f} s")
+    print(f"Fehlgeschlagen:      {len(failed)}" + (f" ({failed[0]})" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: Startzeit der GUI.
+
+Misst mit 'python -X importtime', wie lange der Import von main.py dauert und
+welche Module dabei geladen werden. Mit --check wird ein Fehler gemeldet, wenn
+eine der schweren Abhängigkeiten (pandas, matplotlib, fpdf, requests, numpy)
+schon beim Start geladen wird oder der Import das Zeitbudget überschreitet.
+Ist ein Display verfügbar, wird zusätzlich die Zeit bis zum ersten Zeichnen
+des Fensters gemessen.
+
+Aufruf:
+    python benchmarks/bench_startup.py --runs 5 --check --max-ms 500
+"""
+
+# Standard Library Imports
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'matplotlib', 'fpdf', 'requests', 'numpy')
+
+WINDOW_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import tkinter as tk
+import main
+root = tk.Tk()
+app = main.GoeChargerApp(root)
+root.update()
+print(time.perf_counter() - t0)
+root.destroy()
+"""
+
+
+def import_profile():
+    """Führt 'import main' mit -X importtime aus.
+
+    Returns:
+        (Gesamtdauer in ms, dict Modul -> kumulierte Dauer in ms)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        indent = len(name) - len(name.lstrip())
+        entries.append((name.strip(), indent, int(cumulative) / 1000))
+
+    # Unterbaum von main: eingerückte Einträge direkt vor der Zeile von main
+    # (Importe des Interpreters beim Start, z.B. site, bleiben außen vor)
+    modules = {}
+    names = [name for name, _, _ in entries]
+    if 'main' in names:
+        end = names.index('main')
+        modules['main'] = entries[end][2]
+        for name, indent, cumulative in reversed(entries[:end]):
+            if indent == 1:
+                break
+            modules[name] = cumulative
+    return modules.get('main', 0.0), modules
+
+
+def window_time():
+    """Zeit bis zum ersten Zeichnen des Hauptfensters in ms (None ohne Display)."""
+    result = subprocess.run([sys.executable, '-c', WINDOW_SCRIPT], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip()) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die Startzeit der GUI")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--check', action='store_true', help="Bei Überschreitung mit Exit-Code 1 beenden")
+    parser.add_argument('--max-ms', type=float, default=500, help="Zeitbudget für 'import main' in ms")
+    args = parser.parse_args()
+
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        total, modules = import_profile()
+        totals.append(total)
+    median = statistics.median(totals)
+
+    print(f"import main: Median {median:.1f} ms über {args.runs} Läufe")
+    top_level = sorted(((ms, name) for name, ms in modules.items() if name != 'main'), reverse=True)[:8]
+    for ms, name in top_level:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    window = window_time()
+    if window is not None:
+        print(f"Fenster gezeichnet nach {window:.1f} ms")
+
+    loaded_heavy = sorted(name for name in modules if name.split('.')[0] in HEAVY_MODULES
+                          and '.' not in name)
+    if loaded_heavy:
+        print(f"Beim Start geladen: {', '.join(loaded_heavy)}")
+
+    if args.check and (loaded_heavy or median > args.max_ms):
+        print("Startzeit-Prüfung fehlgeschlagen")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Benchmark: Berichte mit sehr großen Tabellen (ein Ladevorgang pro Zeile).
+
+Erstellt für jede Zeilenzahl einen Bericht im Modus 'sessions' und misst Dauer,
+Speicherspitze und Größe des PDFs. Jede Messung läuft in einem eigenen Prozess,
+damit die Speicherspitze nicht von der vorherigen Messung stammt. Bis
+--legacy-max Zeilen wird zum Vergleich die frühere Tabelle gemessen (FPDF mit
+set_fill_color/set_x/cell pro Zeile und dem ganzen Dokument im Speicher).
+
+Aufruf:
+    python benchmarks/bench_table.py --rows 10000 100000 1000000 --legacy-max 100000
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_table(model, filename):
+    """Die frühere Tabelle: jede Zelle über FPDF, Ausgabe erst am Ende."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(52, 73, 94)
+    pdf.set_text_color(255, 255, 255)
+    widths = [(pdf.w - 20) * share for _, share in model['columns']]
+    pdf.set_x(10)
+    for i, (title, _) in enumerate(model['columns']):
+        pdf.cell(widths[i], 7, title, 1, int(i == len(widths) - 1), 'C', fill=True)
+    pdf.set_font("Arial", '', 10)
+    pdf.set_text_color(0, 0, 0)
+    row_colors = [(255, 255, 255), (245, 245, 245)]
+    for i, row in enumerate(model['rows']):
+        pdf.set_fill_color(*row_colors[i % 2])
+        pdf.set_x(10)
+        for j, value in enumerate(row):
+            pdf.cell(widths[j], 7, value, 1, int(j == len(row) - 1), 'C', fill=True)
+    pdf.output(filename)
+    return pdf.page
+
+
+def measure(rows, variant, workdir):
+    """Erstellt einen Bericht im aktuellen Prozess.
+
+    Returns:
+        dict mit Messwerten
+    """
+    import report
+    from report_model import build_report_model
+    from tariffs import tariff_from_spec
+    from synthetic_export import synthetic_sessions
+
+    sessions = synthetic_sessions(rows, start='2015-01-01', span_days=max(365, rows // 8))
+    sessions = sessions[['Start', 'Ende', 'Energie [kWh]']]
+    spec = {'start_date': date(2015, 1, 1), 'end_date': sessions['Ende'].max().date(), 'price': '0.30',
+            'mode': 'sessions', 'chart_format': 'vector', 'filename': os.path.join(workdir, f"{variant}_{rows}.pdf")}
+    model = build_report_model(sessions, tariff_from_spec(spec), 'sessions')
+    del sessions
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    if variant == 'legacy':
+        pages = legacy_table(model, spec['filename'])
+    else:
+        report.render_pdf(model, spec)
+        pages = None
+    seconds = time.perf_counter() - t0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if pages is None:
+        import pymupdf
+        with pymupdf.open(spec['filename']) as document:
+            pages = document.page_count
+    return {'variant': variant, 'rows': rows, 'seconds': round(seconds, 2), 'pages': pages,
+            'peak_mb': round(peak / 1024), 'render_mb': round((peak - before) / 1024),
+            'pdf_mb': round(os.path.getsize(spec['filename']) / 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für große Berichtstabellen")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help="Frühere Tabelle nur bis zu so vielen Zeilen messen (0 = nie)")
+    parser.add_argument('--child', nargs=2, metavar=('ROWS', 'VARIANT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with tempfile.TemporaryDirectory() as workdir:
+            print(json.dumps(measure(int(args.child[0]), args.child[1], workdir)))
+        return
+
+    print(f"{'Variante':<10} {'Zeilen':>8} {'Dauer s':>8} {'Seiten':>7} {'Spitze MB':>10} "
+          f"{'Bericht MB':>11} {'PDF MB':>7}")
+    for rows in args.rows:
+        variants = ['stream'] + (['legacy'] if rows <= args.legacy_max else [])
+        for variant in variants:
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(rows), variant],
+                                    cwd=ROOT, capture_output=True, text=True, check=True)
+            r = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{r['variant']:<10} {r['rows']:>8} {r['seconds']:>8} {r['pages']:>7} {r['peak_mb']:>10} "
+                  f"{r['render_mb']:>11} {r['pdf_mb']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Lokaler Stub der go-e APIs für Tests und Benchmarks ohne Wallbox.
+
+Bildet den Ablauf des CSV-Exports nach:
+
+    /charger/<serial>/api/status?filter=dll   lokale API einer Wallbox
+    /charger/<serial>/api/status?filter=eto,car   Zählerstand und Fahrzeugstatus (Recorder)
+    /cloud/<serial>/api/status?filter=dll     Cloud API (Bearer-Token erforderlich)
+    /api/v1/get_ticket?e=<serial>[&from=<ms>&to=<ms>]   Export-Ticket anfordern
+    /api/v1/get_status?ticket=<ticket>        Fortschritt bzw. fertiger CSV-Export
+
+Die Ladevorgänge jeder Wallbox werden synthetisch erzeugt (synthetic_sessions) und
+enden am Vortag. Mit from/to (Millisekunden seit 1970) enthält der Export nur die
+Ladevorgänge, die in diesem Zeitraum begonnen haben.
+Ein vollständiger Export ist nach export_seconds fertig, ein Export eines
+Zeitraums entsprechend seinem Anteil an den Ladevorgängen früher (mindestens nach
+einem Zehntel); bis dahin liefert get_status in progress_steps Stufen steigende
+'progressBars'. Jede Antwort kann um delay Sekunden verzögert werden. Fragt der
+Client komprimierte Antworten an (Accept-Encoding: gzip), wird mit gzip komprimiert.
+
+Für den Recorder simuliert der Stub pro Wallbox fortlaufende Ladevorgänge: In
+jedem Zyklus von cycle_seconds ist das Fahrzeug in der ersten Hälfte angesteckt
+(zuerst ladend, dann fertig) und lädt dabei cycle_wh Wh.
+
+Fehler lassen sich gezielt einschalten (auch während der Laufzeit über
+stub.failures):
+
+    local_down     lokale API nicht erreichbar (Verbindung wird ohne Antwort geschlossen)
+    cloud_down     Cloud API antwortet mit 503
+    ticket_error   get_ticket antwortet mit 500
+    timeout        der Export wird nie fertig
+    rate_limit     jede zweite Anfrage wird mit 429 beantwortet
+    unscoped       from/to werden ignoriert, jeder Export enthält die gesamte Historie
+
+Aufruf (startet den Stub, bis er mit Strg+C beendet wird):
+    python benchmarks/goe_stub_server.py --port 8080 --rows 5000 --serials 111111 222222
+    python benchmarks/goe_stub_server.py --fail local_down --delay 0.05
+"""
+
+# Standard Library Imports
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Third Party Imports
+import pandas as pd
+
+# Local Imports
+from synthetic_export import synthetic_sessions, export_csv
+
+
+FAILURES = ('local_down', 'cloud_down', 'ticket_error', 'timeout', 'rate_limit', 'unscoped')
+
+
+class StubGoeServer:
+    """
+    go-e API-Stub in einem Hintergrund-Thread.
+    Protokolliert alle Anfragen, damit Tests Abrufmuster und Abstände prüfen können.
+    """
+
+    def __init__(self, rows=1000, export_seconds=0.5, host='127.0.0.1', port=0, api_key='stub-key',
+                 progress_steps=10, delay=0.0, failures=(), span_days=3650, cycle_seconds=60.0, cycle_wh=8000):
+        """Initialisiert den Stub.
+
+        Args:
+            rows: Anzahl der Ladevorgänge pro Wallbox
+            export_seconds: Dauer eines Exports bis zur Fertigstellung
+            host, port: Adresse des Servers (Port 0 = freien Port wählen)
+            api_key: Erwarteter Cloud API Key
+            progress_steps: Anzahl der Fortschrittsstufen bis zur Fertigstellung
+            delay: Verzögerung jeder Antwort in Sekunden
+            failures: Eingeschaltete Fehler (siehe FAILURES)
+            span_days: Höchstens so viele Tage Ladehistorie (größere Exporte werden gestaucht)
+            cycle_seconds: Dauer eines simulierten Ladezyklus für die lokale Statusabfrage
+            cycle_wh: Geladene Energie pro Zyklus in Wh
+        """
+        unknown = set(failures) - set(FAILURES)
+        if unknown:
+            raise ValueError(f"Unbekannte Fehler: {', '.join(sorted(unknown))}")
+        self.rows = rows
+        self.export_seconds = export_seconds
+        self.api_key = api_key
+        self.progress_steps = max(1, progress_steps)
+        self.delay = delay
+        self.failures = set(failures)
+        self.span_days = span_days
+        self.cycle_seconds = cycle_seconds
+        self.cycle_wh = cycle_wh
+        self._started = time.monotonic()
+        self.requests = []
+        self._frames = {}
+        self._exports = {}
+        self._tickets = {}
+        self._rate_counter = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_options(self):
+        """Liefert die Parameter für GoeApiClient (cloud_url, data_url), die auf den Stub zeigen."""
+        return {'cloud_url': f"{self.base_url}/cloud/{{serial}}", 'data_url': f"{self.base_url}/api/v1"}
+
+    def charger_config(self, serial, api_type='local'):
+        """Liefert eine API-Konfiguration für eine Wallbox des Stubs."""
+        return {
+            'api_type': api_type,
+            'local_api_url': f"{self.base_url}/charger/{serial}",
+            'cloud_api_key': self.api_key,
+            'serial_number': serial
+        }
+
+    def sessions(self, serial):
+        """Liefert die Ladevorgänge einer Wallbox (einmal erzeugt, danach aus dem Cache)."""
+        with self._lock:
+            df = self._frames.get(serial)
+        if df is None:
+            # Ladehistorie so verschieben, dass der letzte Ladevorgang gestern endet
+            seed = int(serial) % 2**32 if serial.isdigit() else 0
+            df = synthetic_sessions(self.rows, serial=serial, seed=seed, span_days=self.span_days)
+            shift = pd.Timestamp.now().normalize() - df['Ende'].max().ceil('D')
+            df['Start'] += shift
+            df['Ende'] += shift
+            with self._lock:
+                self._frames[serial] = df
+        return df
+
+    def _window_mask(self, df, window):
+        start_ms, end_ms = window
+        mask = pd.Series(True, index=df.index)
+        if start_ms is not None:
+            mask &= df['Start'] >= pd.Timestamp.fromtimestamp(start_ms / 1000)
+        if end_ms is not None:
+            mask &= df['Start'] < pd.Timestamp.fromtimestamp(end_ms / 1000)
+        return mask
+
+    def export(self, serial, window=(None, None)):
+        """Liefert den CSV-Export einer Wallbox, optional nur für window = (from, to) in Millisekunden."""
+        if window != (None, None):
+            df = self.sessions(serial)
+            return export_csv(df[self._window_mask(df, window)])
+        with self._lock:
+            csv_data = self._exports.get(serial)
+        if csv_data is None:
+            csv_data = export_csv(self.sessions(serial))
+            with self._lock:
+                self._exports[serial] = csv_data
+        return csv_data
+
+    def telemetry(self, serial, now=None):
+        """Liefert den simulierten Zählerstand (Wh) und Fahrzeugstatus einer Wallbox."""
+        elapsed = (time.monotonic() if now is None else now) - self._started
+        cycles, phase = divmod(elapsed / self.cycle_seconds, 1.0)
+        # Erstes Viertel lädt, zweites Viertel fertig, zweite Hälfte ohne Fahrzeug
+        charged = min(phase / 0.25, 1.0) if phase < 0.5 else 1.0
+        car = 2 if phase < 0.25 else 4 if phase < 0.5 else 1
+        base = int(serial) % 100000 * 10 if serial.isdigit() else 0
+        return {'eto': base + int((cycles + charged) * self.cycle_wh), 'car': car}
+
+    def completed_cycles(self, now=None):
+        """Anzahl der bisher abgeschlossenen Ladevorgänge jeder simulierten Wallbox."""
+        elapsed = (time.monotonic() if now is None else now) - self._started
+        cycles, phase = divmod(elapsed / self.cycle_seconds, 1.0)
+        return int(cycles) + (phase >= 0.5)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _status(self, path, query, headers):
+        """Beantwortet eine Anfrage: (HTTP-Status, JSON-Antwort)."""
+        parts = path.strip('/').split('/')
+
+        if 'rate_limit' in self.failures:
+            with self._lock:
+                self._rate_counter += 1
+                limited = self._rate_counter % 2 == 0
+            if limited:
+                return 429, {'error': 'too many requests'}
+
+        if len(parts) == 4 and parts[0] in ('charger', 'cloud') and parts[2:] == ['api', 'status']:
+            if parts[0] == 'charger' and 'local_down' in self.failures:
+                return None, None
+            if parts[0] == 'cloud' and 'cloud_down' in self.failures:
+                return 503, {'error': 'service unavailable'}
+            if parts[0] == 'cloud' and headers.get('Authorization') != f"Bearer {self.api_key}":
+                return 401, {'error': 'unauthorized'}
+            if parts[0] == 'charger' and query.get('filter', [''])[0] != 'dll':
+                return 200, self.telemetry(parts[1])
+            return 200, {'dll': f"{self.base_url}/export?e={parts[1]}"}
+
+        if path == '/api/v1/get_ticket':
+            if 'ticket_error' in self.failures:
+                return 500, {'error': 'internal error'}
+            serial = query.get('e', [''])[0]
+            window = (None, None)
+            duration = self.export_seconds
+            if 'unscoped' not in self.failures:
+                window = tuple(int(query[name][0]) if name in query else None for name in ('from', 'to'))
+            if window != (None, None):
+                df = self.sessions(serial)
+                share = self._window_mask(df, window).sum() / max(len(df), 1)
+                duration = self.export_seconds * max(share, 0.1)
+            ticket = f"{serial}-{time.monotonic_ns()}"
+            with self._lock:
+                self._tickets[ticket] = (serial, window, time.monotonic(), duration)
+            return 200, {'ticket': ticket}
+
+        if path == '/api/v1/get_status':
+            with self._lock:
+                entry = self._tickets.get(query.get('ticket', [''])[0])
+            if entry is None:
+                return 404, {'error': 'unknown ticket'}
+            serial, window, started, duration = entry
+            elapsed = time.monotonic() - started
+            if elapsed < duration or 'timeout' in self.failures:
+                step = int(self.progress_steps * min(elapsed / duration, 0.99)) if duration else 0
+                progress = round(100 * step / self.progress_steps, 1)
+                return 200, {'status': {'message': 'Task running',
+                                        'progressBars': [{'name': 'Export', 'progress': progress}]}}
+            return 200, {'status': {'message': 'Task finished', 'csv': self.export(serial, window),
+                                    'progressBars': [{'name': 'Export', 'progress': 100}]}}
+
+        return 404, {'error': 'not found'}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                with stub._lock:
+                    stub.requests.append((time.time(), url.path, url.query))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                code, body = stub._status(url.path, parse_qs(url.query), self.headers)
+                if code is None:
+                    # Nicht erreichbar: Verbindung ohne Antwort schließen
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                data = json.dumps(body).encode('utf-8')
+                compress = 'gzip' in self.headers.get('Accept-Encoding', '') and len(data) > 1024
+                if compress:
+                    data = gzip.compress(data, compresslevel=6)
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                if compress:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Stub der go-e APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--rows', type=int, default=1000, help="Ladevorgänge pro Wallbox")
+    parser.add_argument('--export-seconds', type=float, default=2.0, help="Dauer eines Exports")
+    parser.add_argument('--progress-steps', type=int, default=10, help="Fortschrittsstufen eines Exports")
+    parser.add_argument('--delay', type=float, default=0.0, help="Verzögerung jeder Antwort in Sekunden")
+    parser.add_argument('--fail', nargs='*', choices=FAILURES, default=[], help="Eingeschaltete Fehler")
+    parser.add_argument('--cycle-seconds', type=float, default=60.0,
+                        help="Dauer eines simulierten Ladezyklus für die lokale Statusabfrage")
+    parser.add_argument('--serials', nargs='*', default=['111111'], help="Seriennummern für die Beispielkonfiguration")
+    args = parser.parse_args()
+
+    stub = StubGoeServer(args.rows, args.export_seconds, args.host, args.port,
+                         progress_steps=args.progress_steps, delay=args.delay, failures=args.fail,
+                         cycle_seconds=args.cycle_seconds)
+    options = stub.client_options()
+    print(f"go-e Stub läuft auf {stub.base_url}")
+    print(f"Cloud-URL: {options['cloud_url']}   Daten-URL: {options['data_url']}")
+    print(json.dumps({'jobs': [stub.charger_config(serial) for serial in args.serials]}, indent=2))
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Erzeugt synthetische CSV-Exporte im Format der go-e Wallbox für Benchmarks.
+"""
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+
+EXPORT_COLUMNS = [
+    'Sitzungsnummer', 'Seriennummer', 'ID Chip', 'ID Chip UUID', 'Start', 'Ende', 'Dauer',
+    'Energie [kWh]', 'Zählerstand Start [kWh]', 'Zählerstand Ende [kWh]'
+]
+
+
+def synthetic_sessions(rows, start='2015-01-01', serial='000000', seed=0, span_days=None):
+    """Erzeugt zufällige, zeitlich aufsteigende Ladevorgänge.
+
+    Args:
+        span_days: Optional höchstens so viele Tage Ladehistorie; größere Exporte
+            werden zeitlich gestaucht (mehr Ladevorgänge pro Tag)
+
+    Returns:
+        DataFrame mit allen Spalten des go-e Exports
+    """
+    rng = np.random.default_rng(seed)
+    gaps = rng.integers(30 * 60, 12 * 3600, rows)
+    durations = rng.integers(10 * 60, 10 * 3600, rows)
+    energy = np.round(durations / 3600 * rng.uniform(1.4, 11.0, rows), 3)
+
+    offsets = np.cumsum(gaps + np.r_[0, durations[:-1]])
+    if span_days and rows and offsets[-1] + durations[-1] > span_days * 86400:
+        factor = span_days * 86400 / (offsets[-1] + durations[-1])
+        offsets = (offsets * factor).astype('int64')
+        durations = np.maximum((durations * factor).astype('int64'), 1)
+    starts = pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s')
+    ends = starts + pd.to_timedelta(durations, unit='s')
+    meter = np.cumsum(energy)
+
+    return pd.DataFrame({
+        'Sitzungsnummer': np.arange(1, rows + 1),
+        'Seriennummer': serial,
+        'ID Chip': rng.choice(['Chip 1', 'Chip 2', 'Gast'], rows),
+        'ID Chip UUID': rng.choice(['a1b2c3d4', 'e5f6a7b8', ''], rows),
+        'Start': starts,
+        'Ende': ends,
+        'Dauer': pd.to_timedelta(durations, unit='s').astype(str),
+        'Energie [kWh]': energy,
+        'Zählerstand Start [kWh]': np.round(meter - energy, 3),
+        'Zählerstand Ende [kWh]': np.round(meter, 3),
+    }, columns=EXPORT_COLUMNS)
+
+
+def synthetic_export(rows, start='2015-01-01', serial='000000', seed=0):
+    """Erzeugt einen CSV-Export wie im 'csv'-Feld der get_status-Antwort."""
+    return export_csv(synthetic_sessions(rows, start, serial, seed))
+
+
+def export_csv(df):
+    """Schreibt Ladevorgänge im CSV-Format des go-e Exports."""
+    return df.to_csv(sep=';', decimal=',', index=False, date_format='%d.%m.%Y %H:%M:%S')
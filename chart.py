@@ -0,0 +1,189 @@
+"""
+Verbrauchsdiagramm für den PDF-Bericht.
+
+Das Diagramm wird über die objektorientierte Matplotlib-API (Figure/Agg) im
+Speicher gerendert und direkt als Bild in das PDF übernommen – ohne temporäre
+Datei und ohne den globalen pyplot-Zustand. Alternativ wird es als
+Vektorgrafik direkt mit den Zeichenfunktionen von FPDF gezeichnet.
+"""
+
+# Standard Library Imports
+import zlib
+import threading
+from io import BytesIO
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import DateFormatter
+from matplotlib.ticker import MaxNLocator
+
+
+CHART_FORMATS = ('raster', 'jpeg', 'vector')
+BAR_COLOR = '#34495e'
+FIGSIZE = (10, 4)
+
+
+class ChartRenderer:
+    """
+    Rendert das Verbrauchsdiagramm für beliebig viele Berichte.
+    Die Figure wird pro Thread einmal aufgebaut und für jeden Bericht wiederverwendet.
+    """
+
+    def __init__(self, dpi=300, fmt='raster', figsize=FIGSIZE):
+        """Initialisiert den Renderer.
+
+        Args:
+            dpi: Auflösung der Rastergrafik
+            fmt: 'raster' (verlustfrei), 'jpeg' oder 'vector' (FPDF-Zeichenbefehle)
+            figsize: Größe des Diagramms in Zoll (Breite, Höhe)
+        """
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unbekanntes Diagrammformat: {fmt}")
+        self.dpi = dpi
+        self.fmt = fmt
+        self.figsize = figsize
+        self._local = threading.local()
+
+    def _template(self):
+        """Liefert die Figure-Vorlage des aktuellen Threads."""
+        template = getattr(self._local, 'template', None)
+        if template is None:
+            fig = Figure(figsize=self.figsize, dpi=self.dpi)
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
+
+            # Deutsche Formatierung
+            ax.set_title('Stromverbrauch im Zeitverlauf')
+            ax.set_xlabel('Datum')
+            ax.set_ylabel('Verbrauch (kWh)')
+            ax.grid(True, linestyle='--', alpha=0.3, axis='y')
+            ax.xaxis.set_major_formatter(DateFormatter('%d.%m.%Y'))
+
+            # Feste Ränder statt tight_layout/bbox_inches='tight' bei jedem Bericht
+            fig.subplots_adjust(left=0.08, right=0.98, top=0.92, bottom=0.25)
+
+            template = {'fig': fig, 'canvas': canvas, 'ax': ax, 'bars': None}
+            self._local.template = template
+        return template
+
+    def render_rgb(self, dates, values):
+        """Rendert das Diagramm und liefert die Pixel als RGB-Array (Höhe, Breite, 3)."""
+        template = self._template()
+        ax = template['ax']
+
+        # Balken des vorherigen Berichts entfernen
+        if template['bars'] is not None:
+            template['bars'].remove()
+        template['bars'] = ax.bar(dates, values, width=0.8, color=BAR_COLOR, alpha=0.7)
+        ax.relim()
+        ax.autoscale_view()
+        for label in ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+
+        template['canvas'].draw()
+        rgba = np.asarray(template['canvas'].buffer_rgba())
+        return rgba[:, :, :3]
+
+    def image_info(self, dates, values):
+        """Rendert das Diagramm als Bildobjekt im Format von FPDF (ohne Umweg über eine Datei)."""
+        rgb = self.render_rgb(dates, values)
+        height, width = rgb.shape[:2]
+        info = {'w': width, 'h': height, 'cs': 'DeviceRGB', 'bpc': 8}
+
+        if self.fmt == 'jpeg':
+            from PIL import Image
+            buffer = BytesIO()
+            Image.fromarray(np.ascontiguousarray(rgb)).save(buffer, format='JPEG', quality=90)
+            info.update({'f': 'DCTDecode', 'data': buffer.getvalue()})
+        else:
+            info.update({'f': 'FlateDecode', 'data': zlib.compress(np.ascontiguousarray(rgb).tobytes(), 6)})
+        return info
+
+    def draw(self, pdf, dates, values, x, y, w):
+        """Zeichnet das Diagramm in das PDF.
+
+        Args:
+            pdf: FPDF-Dokument
+            dates: Datumswerte (datetime64)
+            values: Verbrauch in kWh
+            x, y: Position der linken oberen Ecke in mm
+            w: Breite in mm
+
+        Returns:
+            Höhe des Diagramms in mm
+        """
+        h = w * self.figsize[1] / self.figsize[0]
+        if self.fmt == 'vector':
+            self._draw_vector(pdf, np.asarray(dates), np.asarray(values, dtype='float64'), x, y, w, h)
+        else:
+            pdf.embed_image(self.image_info(dates, values), x=x, y=y, w=w, h=h)
+        return h
+
+    def _draw_vector(self, pdf, dates, values, x, y, w, h):
+        """Zeichnet das Balkendiagramm mit den Linien- und Flächenbefehlen von FPDF."""
+        # Zeichenbereich innerhalb der Ränder (entspricht subplots_adjust der Rastergrafik)
+        left, right = x + w * 0.08, x + w * 0.98
+        top, bottom = y + h * 0.08, y + h * 0.75
+        plot_w, plot_h = right - left, bottom - top
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font('Arial', '', 9)
+        pdf.set_xy(x, y)
+        pdf.cell(w, h * 0.07, 'Stromverbrauch im Zeitverlauf', 0, 0, 'C')
+
+        # Y-Achse mit gerundeten Teilstrichen
+        y_max = float(values.max()) if len(values) else 1.0
+        ticks = MaxNLocator(nbins=5).tick_values(0, y_max or 1.0)
+        ticks = ticks[ticks >= 0]
+        scale = plot_h / ticks[-1]
+
+        pdf.set_font('Arial', '', 7)
+        pdf.set_draw_color(220, 220, 220)
+        for tick in ticks:
+            ty = bottom - tick * scale
+            pdf.line(left, ty, right, ty)
+            pdf.set_xy(x, ty - 2)
+            pdf.cell(left - x - 1, 4, f"{tick:g}", 0, 0, 'R')
+
+        # Balken, einer pro Tag
+        if len(dates):
+            days = dates.astype('datetime64[D]').astype('int64')
+            first, last = days.min() - 0.5, days.max() + 0.5
+            day_w = plot_w / (last - first)
+            pdf.set_fill_color(52, 73, 94)
+            for day, value in zip(days, values):
+                bar_h = value * scale
+                pdf.rect(left + (day - 0.4 - first) * day_w, bottom - bar_h, 0.8 * day_w, bar_h, 'F')
+
+            # Datumsbeschriftung für höchstens acht Tage
+            for day in np.unique(np.linspace(days.min(), days.max(), min(8, len(np.unique(days)))).round()):
+                label = pd.Timestamp(int(day), unit='D').strftime('%d.%m.%Y')
+                pdf.set_xy(left + (day - first) * day_w - 10, bottom + 1)
+                pdf.cell(20, 4, label, 0, 0, 'C')
+
+        # Achsen und Beschriftung
+        pdf.set_draw_color(0, 0, 0)
+        pdf.line(left, bottom, right, bottom)
+        pdf.line(left, top, left, bottom)
+        pdf.set_font('Arial', '', 8)
+        pdf.set_xy(left, bottom + 7)
+        pdf.cell(plot_w, 4, 'Datum', 0, 0, 'C')
+        pdf.set_xy(x, top - 5)
+        pdf.cell(left - x, 4, 'kWh', 0, 0, 'R')
+
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(dpi=300, fmt='raster'):
+    """Liefert einen gemeinsam genutzten Renderer für Auflösung und Format."""
+    with _renderers_lock:
+        renderer = _renderers.get((dpi, fmt))
+        if renderer is None:
+            renderer = _renderers[(dpi, fmt)] = ChartRenderer(dpi, fmt)
+        return renderer
@@ -0,0 +1,399 @@
+"""
+Flottenauswertung: Kennzahlen über alle Wallboxen und Mitarbeiter eines Flotten-Manifests.
+
+Die Ladevorgänge aller Einträge werden in einem Durchgang aus dem lokalen
+Speicher bzw. dem Parquet-Archiv gelesen, über Wallbox und ggf. ID-Chip den
+Einträgen zugeordnet und spaltenweise ausgewertet – je Mitarbeiter, Kennzeichen
+oder Wallbox:
+
+    Ladevorgänge, kWh, Kosten, durchschnittliche und größte Energie je Ladevorgang,
+    Standzeit (Start bis Ende) und davon geschätzte Zeit ohne Laden,
+    Verbrauch je Monat und Veränderung gegenüber dem Vormonat
+
+Die Zeit ohne Laden wird aus der Energie und der Ladeleistung des Eintrags
+geschätzt ('power_kw' im Manifest, Standard 11 kW). Kosten werden wie im Bericht
+pro Ladevorgang mit dem Preis bzw. Tarif des Eintrags berechnet und auf Cent
+gerundet. Das Ergebnis ist eine Flottenübersicht als PDF und/oder CSV statt
+eines Berichts pro Wallbox.
+
+Die Ladevorgänge müssen im lokalen Speicher vorliegen (z.B. über prefetch.py
+oder batch.py); Wallboxen, deren Zeitraum dort nicht vollständig ist, werden
+gemeldet.
+
+Aufruf:
+    python fleet.py flotte.json --year 2024 --by employee --pdf flotte_2024.pdf --csv flotte_2024.csv
+    python fleet.py flotte.json --start 2022-01-01 --end 2024-12-31 --archive goe_archiv --by license_plate
+"""
+
+# Standard Library Imports
+import sys
+import time
+import argparse
+from datetime import datetime
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Local Imports
+import goe_api
+import report
+from batch import load_manifest, date_range, EXIT_OK, EXIT_USAGE
+from chart import get_renderer
+from pdf_table import TableWriter
+from report_model import energy_wh, to_cents, format_amounts
+from session_store import SessionStore
+from tariffs import tariff_from_spec
+
+
+# Auswertung je ... (Schlüssel -> Spaltenüberschrift)
+GROUPINGS = {'employee': 'Mitarbeiter', 'license_plate': 'Kennzeichen', 'charger': 'Wallbox'}
+DEFAULT_POWER_KW = 11.0
+
+# Tabellenspalten der Übersicht: (Überschrift, Anteil an der Seitenbreite)
+GROUP_COLUMNS = [("Vorgänge", 0.08), ("kWh", 0.1), ("EUR", 0.1), ("Ø kWh", 0.08), ("Max kWh", 0.08),
+                 ("Standzeit h", 0.1), ("ohne Laden h", 0.1), ("ggü. Vormonat", 0.1)]
+MONTH_COLUMNS = [("Monat", 0.2), ("Aktiv", 0.12), ("Vorgänge", 0.12), ("kWh", 0.16), ("EUR", 0.16),
+                 ("Standzeit h", 0.12), ("ggü. Vormonat", 0.12)]
+
+
+def job_label(job, by='employee'):
+    """Liefert die Beschriftung eines Eintrags für die Auswertung je Mitarbeiter bzw. Kennzeichen."""
+    if by == 'license_plate':
+        return job.get('license_plate') or job.get('employee') or goe_api.charger_label(job)
+    return job.get('employee') or job.get('license_plate') or goe_api.charger_label(job)
+
+
+def fleet_sources(jobs):
+    """Ordnet jedem Eintrag seine Wallboxen zu.
+
+    Returns:
+        DataFrame mit 'Seriennummer' (Schlüssel der Wallbox), 'ID Chip' (None = alle
+        Ladevorgänge der Wallbox) und 'job' (Index des Eintrags)
+    """
+    rows = []
+    for i, job in enumerate(jobs):
+        for charger in goe_api.charger_configs(job):
+            for chip in charger.get('id_chips') or [None]:
+                rows.append((goe_api.charger_key(charger), chip, i))
+    return pd.DataFrame(rows, columns=['Seriennummer', 'ID Chip', 'job'])
+
+
+def load_fleet_sessions(jobs, start_date, end_date, store=None, archive=None):
+    """Liest die Ladevorgänge aller Einträge im Zeitraum und ordnet sie den Einträgen zu.
+
+    Alle Wallboxen werden mit einer Abfrage gelesen. Ein Ladevorgang an einer
+    gemeinsam genutzten Wallbox gehört zu jedem Eintrag, dessen ID-Chips passen
+    bzw. der die Wallbox ohne ID-Chips nutzt.
+
+    Args:
+        jobs: Einträge des Flotten-Manifests (siehe batch.load_manifest)
+        store: SessionStore, aus dem gelesen wird (wenn kein Archiv angegeben ist)
+        archive: Optionales SessionArchive, aus dem statt des Speichers gelesen wird
+
+    Returns:
+        DataFrame mit 'Start', 'Ende', 'Energie [kWh]', 'Seriennummer', 'ID Chip' und 'job'
+    """
+    sources = fleet_sources(jobs)
+    serials = list(dict.fromkeys(sources['Seriennummer']))
+    if archive is not None:
+        sessions = archive.read(serials, start_date, end_date, ['Start', 'Ende', 'Energie [kWh]', 'ID Chip'])
+    else:
+        sessions = store.query_chargers([(serial, None) for serial in serials], start_date, end_date)
+    sessions['Seriennummer'] = sessions['Seriennummer'].astype(object)
+
+    chips = sources['ID Chip'].notna()
+    parts = [sessions.merge(sources.loc[~chips, ['Seriennummer', 'job']], on='Seriennummer')]
+    if chips.any():
+        parts.append(sessions.merge(sources[chips], on=['Seriennummer', 'ID Chip']))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _costs(sessions, jobs, wh):
+    """Kosten je Ladevorgang in Cent; je Preis bzw. Tarif ein Aufruf über alle zugehörigen Einträge."""
+    cost_units = np.zeros(len(sessions))
+    job_index = sessions['job'].to_numpy()
+    by_tariff = {}
+    for i, job in enumerate(jobs):
+        key = repr(job['tariff']) if job.get('tariff') else job['price']
+        by_tariff.setdefault(key, []).append(i)
+    for members in by_tariff.values():
+        mask = np.isin(job_index, members)
+        if mask.any():
+            tariff = tariff_from_spec(jobs[members[0]])
+            cost_units[mask], _ = tariff.split(sessions['Start'][mask], sessions['Ende'][mask], wh[mask])
+    return to_cents(cost_units)
+
+
+def _change(current, previous):
+    """Veränderung in Prozent (NaN ohne Vergleichswert)."""
+    current = np.asarray(current, dtype='float64')
+    previous = np.asarray(previous, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+
+
+def fleet_summary(sessions, jobs, start_date, end_date, by='employee'):
+    """Berechnet die Kennzahlen der Flotte.
+
+    Args:
+        sessions: Ladevorgänge aus load_fleet_sessions
+        jobs: Einträge des Flotten-Manifests
+        start_date: Erster Tag (date)
+        end_date: Letzter Tag (date, inklusive)
+        by: 'employee', 'license_plate' oder 'charger'
+
+    Returns:
+        dict mit 'groups' (eine Zeile je Mitarbeiter, Kennzeichen bzw. Wallbox),
+        'monthly' (kWh je Gruppe und Monat), 'months' (Flotte je Monat) und 'totals'
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Unbekannte Auswertung: {by}")
+
+    job_index = sessions['job'].to_numpy()
+    wh = energy_wh(sessions['Energie [kWh]'])
+    cents = _costs(sessions, jobs, wh)
+    start = sessions['Start'].to_numpy('datetime64[s]').astype('int64')
+    plugged = np.maximum(sessions['Ende'].to_numpy('datetime64[s]').astype('int64') - start, 0)
+    power_w = np.array([float(job.get('power_kw') or DEFAULT_POWER_KW) * 1000 for job in jobs])[job_index]
+    idle = np.maximum(plugged - wh / power_w * 3600, 0)
+
+    if by == 'charger':
+        group = sessions['Seriennummer'].to_numpy()
+    else:
+        group = np.array([job_label(job, by) for job in jobs], dtype=object)[job_index]
+    months = pd.period_range(start_date, end_date, freq='M')
+    frame = pd.DataFrame({
+        'group': group, 'month': sessions['Start'].dt.to_period('M'), 'wh': wh, 'cents': cents,
+        'plugged': plugged, 'idle': idle,
+        # Ladevorgang einer gemeinsam genutzten Wallbox für die Flottensummen nur einmal zählen
+        'first': ~sessions.duplicated(['Seriennummer', 'Start', 'Ende', 'Energie [kWh]']).to_numpy()
+    })
+
+    # Je Wallbox zählt ein Ladevorgang einmal, auch wenn er zu mehreren Einträgen gehört
+    rows = frame[frame['first']] if by == 'charger' else frame
+    grouped = rows.groupby('group', sort=True)
+    groups = grouped.agg(sessions=('wh', 'size'), wh=('wh', 'sum'), cents=('cents', 'sum'),
+                         mean_wh=('wh', 'mean'), max_wh=('wh', 'max'),
+                         plugged=('plugged', 'sum'), idle=('idle', 'sum'))
+    monthly = rows.pivot_table(index='group', columns='month', values='wh', aggfunc='sum', fill_value=0)
+    monthly = monthly.reindex(index=groups.index, columns=months, fill_value=0)
+    if len(months) > 1:
+        groups['change'] = _change(monthly.iloc[:, -1], monthly.iloc[:, -2])
+    else:
+        groups['change'] = np.nan
+
+    fleet = frame[frame['first']]
+    by_month = fleet.groupby('month').agg(active=('group', 'nunique'), sessions=('wh', 'size'),
+                                          wh=('wh', 'sum'), cents=('cents', 'sum'), plugged=('plugged', 'sum'))
+    by_month = by_month.reindex(months, fill_value=0)
+    by_month['change'] = _change(by_month['wh'], by_month['wh'].shift(1))
+
+    totals = {
+        'sessions': len(fleet), 'wh': int(fleet['wh'].sum()), 'cents': int(fleet['cents'].sum()),
+        'groups': len(groups), 'chargers': sessions['Seriennummer'].nunique()
+    }
+    return {'by': by, 'start_date': start_date, 'end_date': end_date, 'groups': groups,
+            'monthly': monthly, 'months': by_month, 'totals': totals}
+
+
+def _hours(seconds):
+    return np.char.mod('%.1f', np.asarray(seconds, dtype='float64') / 3600)
+
+
+def _percent(values):
+    values = np.asarray(values, dtype='float64')
+    text = np.char.mod('%+.1f %%', np.nan_to_num(values))
+    return np.where(np.isnan(values), '-', text)
+
+
+class _FormattedRows:
+    """Bereits formatierte Tabellenzeilen ohne Zwischensummen (für TableWriter)."""
+
+    label_columns = 1
+
+    def __init__(self, columns):
+        self.rows = list(zip(*columns))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def block(self, start, stop):
+        return self.rows[start:stop]
+
+    def subtotal(self, stop):
+        return None
+
+
+def group_rows(summary):
+    """Formatiert die Zeilen je Gruppe für das PDF."""
+    groups = summary['groups']
+    return _FormattedRows([
+        groups.index.astype(str).tolist(),
+        groups['sessions'].astype(str).tolist(),
+        format_amounts((groups['wh'].to_numpy() + 5) // 10).tolist(),
+        format_amounts(groups['cents'].to_numpy()).tolist(),
+        format_amounts(np.round(groups['mean_wh'].to_numpy() / 10)).tolist(),
+        format_amounts((groups['max_wh'].to_numpy() + 5) // 10).tolist(),
+        _hours(groups['plugged']).tolist(),
+        _hours(groups['idle']).tolist(),
+        _percent(groups['change']).tolist()
+    ])
+
+
+def month_rows(summary):
+    """Formatiert die Zeilen je Monat für das PDF."""
+    months = summary['months']
+    return _FormattedRows([
+        months.index.strftime('%m.%Y').tolist(),
+        months['active'].astype(str).tolist(),
+        months['sessions'].astype(str).tolist(),
+        format_amounts((months['wh'].to_numpy() + 5) // 10).tolist(),
+        format_amounts(months['cents'].to_numpy()).tolist(),
+        _hours(months['plugged']).tolist(),
+        _percent(months['change']).tolist()
+    ])
+
+
+class FleetPDF(report.PDF):
+    title = 'go-e Charger Flottenübersicht'
+
+
+def write_fleet_pdf(summary, filename, chart_format='vector', chart_dpi=300):
+    """Schreibt die Flottenübersicht als PDF (Querformat).
+
+    Returns:
+        Dateiname
+    """
+    pdf = FleetPDF(filename, orientation='L')
+    try:
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
+        label = GROUPINGS[summary['by']]
+
+        pdf.set_font("Arial", 'B', 11)
+        pdf.set_fill_color(240, 240, 240)
+        pdf.cell(0, 8, f"Zeitraum: {summary['start_date']:%d.%m.%Y} - {summary['end_date']:%d.%m.%Y}"
+                       f"    Auswertung je {label}", 0, 1, 'L', fill=True)
+        pdf.ln(2)
+
+        # Verbrauch der Flotte je Monat
+        months = summary['months']
+        chart_y = pdf.get_y()
+        chart_x = (pdf.w - 190) / 2
+        chart_height = get_renderer(chart_dpi, chart_format).draw(
+            pdf, months.index.to_timestamp().to_numpy(), months['wh'].to_numpy() / 1000, x=chart_x, y=chart_y, w=190)
+        pdf.set_xy(10, chart_y + chart_height + 4)
+
+        name_share = 1 - sum(share for _, share in GROUP_COLUMNS)
+        TableWriter(pdf, [(label, name_share)] + GROUP_COLUMNS, font_size=9).write(group_rows(summary))
+        pdf.ln(4)
+        TableWriter(pdf, MONTH_COLUMNS, font_size=9).write(month_rows(summary))
+
+        # Zusammenfassung
+        totals = summary['totals']
+        pdf.ln(2)
+        pdf.set_font("Arial", 'B', 10)
+        pdf.set_fill_color(52, 73, 94)
+        pdf.set_text_color(255, 255, 255)
+        page_width = pdf.w - 20
+        for name, value in (
+                (f"{label}:", str(totals['groups'])),
+                ("Wallboxen:", str(totals['chargers'])),
+                ("Ladevorgänge:", str(totals['sessions'])),
+                ("Gesamtenergie:", f"{format_amounts([(totals['wh'] + 5) // 10])[0]} kWh"),
+                ("Gesamtkosten:", f"{format_amounts([totals['cents']])[0]} EUR")):
+            pdf.set_x(10)
+            pdf.cell(page_width * 0.7, 7, name, 1, 0, 'L', fill=True)
+            pdf.cell(page_width * 0.3, 7, value, 1, 1, 'R', fill=True)
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(2)
+        pdf.set_font("Arial", 'I', 8)
+        pdf.cell(0, 5, f"Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", 0, 1, 'R')
+        pdf.output()
+    except BaseException:
+        pdf.discard()
+        raise
+    return filename
+
+
+def fleet_table(summary):
+    """Liefert die Kennzahlen je Gruppe als DataFrame mit den kWh je Monat in eigenen Spalten."""
+    groups = summary['groups']
+    table = pd.DataFrame({
+        'Ladevorgänge': groups['sessions'],
+        'kWh': groups['wh'] / 1000,
+        'EUR': groups['cents'] / 100,
+        'Ø kWh': (groups['mean_wh'] / 1000).round(3),
+        'Max kWh': groups['max_wh'] / 1000,
+        'Standzeit [h]': (groups['plugged'] / 3600).round(2),
+        'ohne Laden [h]': (groups['idle'] / 3600).round(2),
+        'ggü. Vormonat [%]': groups['change'].round(1)
+    }, index=groups.index.rename(GROUPINGS[summary['by']]))
+    monthly = summary['monthly'] / 1000
+    monthly.columns = [f"kWh {month.strftime('%Y-%m')}" for month in monthly.columns]
+    return table.join(monthly)
+
+
+def write_fleet_csv(summary, path):
+    """Schreibt die Kennzahlen je Gruppe als CSV (Trennzeichen ';', Dezimalkomma)."""
+    fleet_table(summary).to_csv(path, sep=';', decimal=',')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flottenübersicht über alle Wallboxen eines Manifests")
+    parser.add_argument('manifest', help="Flotten-Manifest (JSON)")
+    parser.add_argument('--month', help="Monat im Format JJJJ-MM (Standard: Vormonat)")
+    parser.add_argument('--year', type=int, help="Jahr")
+    parser.add_argument('--start', help="Startdatum im Format JJJJ-MM-TT")
+    parser.add_argument('--end', help="Enddatum im Format JJJJ-MM-TT")
+    parser.add_argument('--by', choices=list(GROUPINGS), default='employee', help="Auswertung je ...")
+    parser.add_argument('--db', default='goe_charger_sessions.sqlite', help="Lokaler Sitzungsspeicher")
+    parser.add_argument('--archive', help="Statt des Sitzungsspeichers aus dem Parquet-Archiv lesen")
+    parser.add_argument('--pdf', help="Flottenübersicht als PDF schreiben")
+    parser.add_argument('--csv', help="Kennzahlen als CSV schreiben")
+    parser.add_argument('--chart-format', choices=['raster', 'jpeg', 'vector'], default='vector',
+                        help="Format des Verbrauchsdiagramms")
+    args = parser.parse_args(argv)
+
+    try:
+        start_date, end_date = date_range(args)
+        jobs = load_manifest(args.manifest)
+        if args.archive:
+            from archive import open_archive
+            store, archive = None, open_archive(args.archive)
+        else:
+            store, archive = SessionStore(args.db), None
+    except (OSError, ValueError, ImportError) as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return EXIT_USAGE
+
+    t0 = time.perf_counter()
+    sessions = load_fleet_sessions(jobs, start_date, end_date, store, archive)
+    summary = fleet_summary(sessions, jobs, start_date, end_date, args.by)
+    elapsed = time.perf_counter() - t0
+
+    if store is not None:
+        missing = [serial for serial in dict.fromkeys(fleet_sources(jobs)['Seriennummer'])
+                   if not store.covers(serial, end_date, start_date)]
+        if missing:
+            sys.stderr.write(f"Hinweis: Für {len(missing)} Wallbox(en) liegt der Zeitraum nicht vollständig im "
+                             f"lokalen Speicher vor (batch.py für den Zeitraum bzw. prefetch.py ausführen): "
+                             f"{', '.join(missing)}\n")
+
+    if args.pdf:
+        write_fleet_pdf(summary, args.pdf, args.chart_format)
+    if args.csv:
+        write_fleet_csv(summary, args.csv)
+    if not (args.pdf or args.csv):
+        print(fleet_table(summary).iloc[:, :8].to_string())
+    totals = summary['totals']
+    print(f"{totals['sessions']} Ladevorgänge von {totals['chargers']} Wallboxen je {GROUPINGS[args.by]} "
+          f"({totals['groups']} Zeilen) in {elapsed:.2f} s ausgewertet")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,626 @@
+"""
+Zugriff auf die go-e Charger API (lokal und Cloud) und den CSV-Export der Ladevorgänge.
+
+Die Funktionen arbeiten mit einer einfachen Konfiguration (dict) mit den Schlüsseln
+der Einstellungsdatei: 'api_type', 'local_api_url', 'cloud_api_key' und 'serial_number'.
+"""
+
+# Standard Library Imports
+import time
+import random
+import threading
+from urllib.parse import urlencode
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+# Third Party Imports
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Local Imports
+import perf_log
+from sessions import parse_sessions
+
+
+# Basis-URLs der go-e Cloud
+CLOUD_API_URL = "https://{serial}.api.v3.go-e.io"
+DATA_API_URL = "https://data.v3.go-e.io/api/v1"
+
+# Statusabfrage des Exports: Startabstand, Obergrenze und Faktor in Sekunden
+POLL_INITIAL_DELAY = 0.25
+POLL_MAX_DELAY = 4.0
+POLL_BACKOFF = 1.5
+POLL_TIMEOUT = 60
+
+# Wie lange ein ausgefallener Endpunkt nachrangig behandelt wird (Sekunden, verdoppelt sich je Fehler)
+HEALTH_COOLDOWN = 60
+HEALTH_MAX_COOLDOWN = 3600
+
+# Antwortcodes, bei denen eine Wiederholung sinnvoll ist
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Zeitraum eines Exports: zusätzliche Parameter für get_ticket (Millisekunden seit 1970)
+EXPORT_FROM_PARAM = 'from'
+EXPORT_TO_PARAM = 'to'
+# Zuschlag an beiden Enden des Zeitraums (Zeitzone der Wallbox, Ladevorgänge über Mitternacht)
+WINDOW_MARGIN = timedelta(days=1)
+# Längere Zeiträume werden in Abschnitte dieser Länge geteilt und parallel exportiert
+SHARD_DAYS = 366
+MAX_SHARDS = 8
+MAX_PARALLEL_EXPORTS = 4
+
+
+class Cancelled(Exception):
+    """Der Abruf wurde über cancel_event abgebrochen."""
+
+    def __init__(self, message="Vorgang abgebrochen"):
+        super().__init__(message)
+
+
+def charger_key(config):
+    """Liefert den Schlüssel der Wallbox für den lokalen Speicher.
+
+    Bevorzugt die Seriennummer, ohne diese wird die lokale API-URL verwendet.
+    """
+    return (config.get('serial_number') or '').strip() or (config.get('local_api_url') or '').strip()
+
+
+def charger_configs(config):
+    """Liefert die API-Konfigurationen aller Wallboxen eines Eintrags.
+
+    Ein Eintrag kann unter 'chargers' mehrere Wallboxen eines Mitarbeiters
+    auflisten (z.B. zu Hause und im Büro); die übrigen Schlüssel des Eintrags
+    gelten dabei als Standardwerte. 'id_chips' beschränkt eine Wallbox auf
+    Ladevorgänge mit diesen RFID-Chips.
+    """
+    if not config.get('chargers'):
+        return [config]
+    defaults = {key: value for key, value in config.items() if key != 'chargers'}
+    return [dict(defaults, **entry) for entry in config['chargers']]
+
+
+def charger_label(config):
+    """Liefert die Schlüssel aller Wallboxen eines Eintrags für Protokolle und Zusammenfassungen."""
+    return ', '.join(charger_key(charger) for charger in charger_configs(config))
+
+
+def window_params(first_day=None, last_day=None):
+    """Liefert die Parameter für einen Export der Ladevorgänge von first_day bis einschließlich last_day.
+
+    Returns:
+        dict mit 'from' und/oder 'to' (leer = gesamte Historie)
+    """
+    params = {}
+    if first_day is not None:
+        lower = datetime.combine(first_day, datetime.min.time()) - WINDOW_MARGIN
+        params[EXPORT_FROM_PARAM] = int(lower.timestamp() * 1000)
+    if last_day is not None:
+        upper = datetime.combine(last_day + timedelta(days=1), datetime.min.time()) + WINDOW_MARGIN
+        params[EXPORT_TO_PARAM] = int(upper.timestamp() * 1000)
+    return params
+
+
+def split_window(first_day, last_day, days=SHARD_DAYS):
+    """Teilt einen Zeitraum in aufeinanderfolgende Abschnitte von höchstens days Tagen.
+
+    Returns:
+        Liste von (erster Tag, letzter Tag)
+    """
+    shards = []
+    while first_day <= last_day:
+        shard_end = min(first_day + timedelta(days=days - 1), last_day)
+        shards.append((first_day, shard_end))
+        first_day = shard_end + timedelta(days=1)
+    return shards
+
+
+def estimate_remaining(history):
+    """Schätzt die Restdauer des Exports aus dem bisherigen Fortschrittsverlauf.
+
+    Args:
+        history: Liste von (Zeitpunkt, Fortschritt in Prozent)
+
+    Returns:
+        Geschätzte Restdauer in Sekunden oder None, wenn keine Schätzung möglich ist
+    """
+    if len(history) < 2:
+        return None
+    (t0, p0), (t1, p1) = history[0], history[-1]
+    if p1 <= p0 or t1 <= t0:
+        return None
+    rate = (p1 - p0) / (t1 - t0)
+    return max(0.0, (100.0 - p1) / rate)
+
+
+class GoeApiClient:
+    """
+    Wiederverwendbarer Client für die go-e API.
+    Hält Verbindungen im Pool offen, wiederholt fehlgeschlagene Anfragen mit Jitter
+    und merkt sich, welche Endpunkte zuletzt nicht erreichbar waren.
+    """
+
+    def __init__(self, timeout=(5, 30), retries=2, retry_delay=0.5, pool_size=10,
+                 cloud_url=CLOUD_API_URL, data_url=DATA_API_URL, shard_days=SHARD_DAYS,
+                 parallel_exports=MAX_PARALLEL_EXPORTS):
+        """Initialisiert den Client.
+
+        Args:
+            timeout: Timeout pro Anfrage in Sekunden (Verbindungsaufbau, Lesen)
+            retries: Anzahl der Wiederholungen bei Verbindungsfehlern und 429/5xx
+            retry_delay: Basiswartezeit vor einer Wiederholung in Sekunden
+            pool_size: Anzahl offener Verbindungen pro Host
+            cloud_url: URL-Vorlage der Cloud API mit Platzhalter {serial}
+            data_url: Basis-URL der Export-API (get_ticket, get_status)
+            shard_days: Längere Zeiträume werden in Abschnitte dieser Länge geteilt
+            parallel_exports: Anzahl gleichzeitig laufender Abschnitte eines Exports
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cloud_url = cloud_url
+        self.data_url = data_url
+        self.shard_days = shard_days
+        self.parallel_exports = parallel_exports
+        # Beachtet die Export-API den Zeitraum? None = noch unbekannt; geteilt wird erst bei True
+        self.window_support = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Zustand pro Endpunkt: base_url -> (Anzahl Fehler in Folge, nachrangig bis)
+        self.health = {}
+        self._health_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def get(self, url, headers=None, retries=None):
+        """Führt eine GET-Anfrage mit Timeout und Wiederholungen aus.
+
+        Returns:
+            requests.Response der letzten Anfrage
+        """
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                perf_log.count('http_requests')
+                # Übertragene Bytes; bei komprimierten Antworten (gzip, deflate) weniger als der Inhalt
+                perf_log.count('bytes_downloaded', response.raw.tell() if response.raw else len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                perf_log.count('http_errors')
+                if attempt == retries:
+                    raise
+            perf_log.count('http_retries')
+            # Exponentiell wachsende Wartezeit mit Jitter, damit parallele Jobs sich verteilen
+            time.sleep(self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def is_healthy(self, base_url):
+        with self._health_lock:
+            _, down_until = self.health.get(base_url, (0, 0))
+        return time.monotonic() >= down_until
+
+    def mark_success(self, base_url):
+        with self._health_lock:
+            self.health.pop(base_url, None)
+
+    def mark_failure(self, base_url):
+        with self._health_lock:
+            failures, _ = self.health.get(base_url, (0, 0))
+            failures += 1
+            cooldown = min(HEALTH_COOLDOWN * 2 ** (failures - 1), HEALTH_MAX_COOLDOWN)
+            self.health[base_url] = (failures, time.monotonic() + cooldown)
+
+    def endpoints(self, config):
+        """Liefert die nutzbaren Endpunkte (base_url, headers) in Abfragereihenfolge.
+
+        Bei lokaler API wird die Cloud API als Ausweichweg angehängt, sofern konfiguriert.
+        Ein zuletzt ausgefallener Endpunkt wird hinter die erreichbaren gestellt.
+        """
+        api_type = config.get('api_type', 'local')
+        serial = config.get('serial_number', '')
+        cloud_api_key = config.get('cloud_api_key', '')
+
+        cloud = None
+        if serial:
+            cloud = (self.cloud_url.format(serial=serial), {'Authorization': f'Bearer {cloud_api_key}'})
+
+        if api_type == 'cloud':
+            if not serial:
+                raise Exception("Seriennummer ist erforderlich für Cloud API")
+            return [cloud]
+
+        endpoints = [(config.get('local_api_url', ''), {})]
+        if cloud and cloud_api_key:
+            endpoints.append(cloud)
+        return sorted(endpoints, key=lambda endpoint: not self.is_healthy(endpoint[0]))
+
+    def get_export_url(self, config):
+        """Ermittelt die DLL-URL über die erste erreichbare API."""
+        endpoints = self.endpoints(config)
+        for i, (base_url, headers) in enumerate(endpoints):
+            fallback_available = i < len(endpoints) - 1
+            try:
+                # Mit Ausweichweg nicht lange auf einen hängenden Endpunkt warten
+                dll_response = self.get(f"{base_url}/api/status?filter=dll", headers,
+                                        retries=0 if fallback_available else None)
+            except (requests.ConnectionError, requests.Timeout):
+                dll_response = None
+
+            if dll_response is not None and dll_response.status_code == 200:
+                self.mark_success(base_url)
+                export_url = dll_response.json().get('dll')
+                if not export_url:
+                    raise Exception("Keine DLL-URL in der Antwort gefunden")
+                return export_url
+
+            self.mark_failure(base_url)
+
+        if len(endpoints) > 1:
+            raise Exception("Fehler beim Abrufen der DLL-URL (Lokale und Cloud API)")
+        if config.get('api_type', 'local') == 'local':
+            raise Exception("Fehler beim Abrufen der DLL-URL und keine Cloud API Konfiguration verfügbar")
+        raise Exception("Fehler beim Abrufen der DLL-URL")
+
+    def get_ticket(self, export_url, first_day=None, last_day=None):
+        """Fordert für die DLL-URL ein Export-Ticket an.
+
+        Args:
+            export_url: DLL-URL aus get_export_url
+            first_day: Optional nur Ladevorgänge ab diesem Tag exportieren (date)
+            last_day: Optional nur Ladevorgänge bis einschließlich diesem Tag exportieren (date)
+        """
+        # Export-Parameter aus der URL extrahieren
+        export_param = export_url.split('?e=')[1]
+        window = window_params(first_day, last_day)
+
+        ticket_response = self.get(f"{self.data_url}/get_ticket?e={export_param}"
+                                   + (f"&{urlencode(window)}" if window else ''))
+        if ticket_response.status_code != 200:
+            raise Exception("Fehler beim Abrufen des Tickets")
+
+        ticket = ticket_response.json().get('ticket')
+        if not ticket:
+            raise Exception("Kein Ticket in der Antwort gefunden")
+        return ticket
+
+    def poll_export(self, ticket, progress_callback=None, deadline=None, cancel_event=None):
+        """Fragt den Status eines Export-Tickets ab, bis die CSV-Daten bereitstehen.
+
+        Die Abfrage beginnt mit kurzen Abständen und wird bei längeren Exporten
+        langsamer. Liefern die 'progressBars' einen Fortschritt, wird die nächste
+        Abfrage auf die voraussichtliche Fertigstellung gelegt.
+
+        Args:
+            ticket: Ticket aus get_ticket
+            progress_callback: Optionale Funktion, die die 'progressBars' des Exports erhält
+            deadline: Optionaler Zeitpunkt (time.monotonic()), nach dem abgebrochen wird
+            cancel_event: Optionales threading.Event; ist es gesetzt, wird mit Cancelled abgebrochen
+
+        Returns:
+            CSV-Daten des Exports als String
+        """
+        timeout_at = time.monotonic() + POLL_TIMEOUT
+        if deadline is not None:
+            timeout_at = min(timeout_at, deadline)
+
+        delay = POLL_INITIAL_DELAY
+        history = []
+        while True:
+            status_response = self.get(f"{self.data_url}/get_status?ticket={ticket}")
+            if status_response.status_code != 200:
+                raise Exception("Fehler beim Abrufen des Status")
+
+            perf_log.count('polls')
+            status = status_response.json().get('status', {})
+
+            # Fortschritt weitergeben und für die Schätzung merken
+            progress_bars = status.get('progressBars')
+            if progress_bars:
+                if progress_callback:
+                    progress_callback(progress_bars)
+                progress = sum(bar.get('progress', 0) for bar in progress_bars) / len(progress_bars)
+                history.append((time.monotonic(), progress))
+
+            # Prüfen ob die Daten fertig sind
+            if status.get('message') == "Task finished" and status.get('csv'):
+                return status['csv']
+
+            # Nächste Abfrage: exponentiell langsamer, aber nicht nach der erwarteten Fertigstellung
+            wait = delay
+            remaining = estimate_remaining(history)
+            if remaining is not None:
+                wait = min(wait, max(POLL_INITIAL_DELAY, remaining))
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+            if time.monotonic() + wait > timeout_at:
+                raise Exception("Timeout beim Warten auf die Daten")
+            if cancel_event is None:
+                time.sleep(wait)
+            elif cancel_event.wait(wait):
+                raise Cancelled()
+
+    def export_shards(self, windows):
+        """Teilt die Zeiträume eines Exports in Abschnitte auf.
+
+        Geteilt wird erst, wenn die Export-API gezeigt hat, dass sie den Zeitraum
+        beachtet – sonst würde jeder Abschnitt die gesamte Historie liefern. Solange
+        das nicht belegt ist, werden die Zeiträume zu einem Export zusammengefasst;
+        beachtet sie ihn nicht, wird nur einmal die gesamte Historie angefordert.
+        Sehr lange Zeiträume ergeben höchstens MAX_SHARDS längere Abschnitte.
+
+        Args:
+            windows: Liste von (erster Tag, letzter Tag); None an einer Stelle = offen
+
+        Returns:
+            Liste von (erster Tag, letzter Tag)
+        """
+        if self.window_support is False:
+            return [(None, None)]
+        if self.window_support is None:
+            firsts = [first_day for first_day, _ in windows]
+            lasts = [last_day for _, last_day in windows]
+            return [(None if None in firsts else min(firsts), None if None in lasts else max(lasts))]
+        if not self.shard_days:
+            return list(windows)
+        shards = []
+        for first_day, last_day in windows:
+            if first_day is None:
+                shards.append((first_day, last_day))
+                continue
+            last_day = last_day or date.today()
+            days = max(self.shard_days, -(-((last_day - first_day).days + 1) // MAX_SHARDS))
+            shards += split_window(first_day, last_day, days)
+        return shards
+
+    def _export_parallel(self, export_url, shards, progress_callback=None, deadline=None, cancel_event=None):
+        """Exportiert mehrere Abschnitte gleichzeitig.
+
+        Der Fortschritt wird als ein Balken pro Abschnitt weitergegeben. Schlägt ein
+        Abschnitt fehl oder wird abgebrochen, werden die übrigen beendet.
+
+        Returns:
+            Liste der CSV-Daten in der Reihenfolge der Abschnitte
+        """
+        trace = perf_log.current()
+        abort = threading.Event()
+        progress = [0.0] * len(shards)
+        progress_lock = threading.Lock()
+
+        def shard_progress(index, bars):
+            with progress_lock:
+                progress[index] = sum(bar.get('progress', 0) for bar in bars) / len(bars)
+                combined = [{'name': f"Export {i + 1}/{len(shards)}", 'progress': value}
+                            for i, value in enumerate(progress)]
+            progress_callback(combined)
+
+        def export_shard(index, first_day, last_day):
+            with trace.activate():
+                ticket = self.get_ticket(export_url, first_day, last_day)
+                callback = (lambda bars: shard_progress(index, bars)) if progress_callback else None
+                return self.poll_export(ticket, callback, deadline, abort)
+
+        with ThreadPoolExecutor(max_workers=min(len(shards), self.parallel_exports)) as pool:
+            futures = [pool.submit(export_shard, i, *shard) for i, shard in enumerate(shards)]
+            try:
+                pending = futures
+                while pending:
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        future.result()
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise Cancelled()
+            except BaseException:
+                abort.set()
+                for future in futures:
+                    future.cancel()
+                raise
+        return [future.result() for future in futures]
+
+    def _scope(self, sessions, first_day, last_day, known_start=None):
+        """Beschränkt die Ladevorgänge eines Exports auf seinen Zeitraum.
+
+        Enthält der Export Ladevorgänge weit vor dem angefragten Zeitraum, hat die
+        API die Parameter nicht beachtet; dann wird künftig nicht mehr geteilt.
+        Belegt ist die Unterstützung erst, wenn ein bekannter älterer Ladevorgang
+        (known_start) fehlt. Fehlen ältere Ladevorgänge nur, weil die Wallbox keine
+        hat, bleibt sie unbekannt.
+        """
+        if first_day is None and last_day is None:
+            return sessions
+        lower = pd.Timestamp(first_day) if first_day is not None else None
+        if lower is not None:
+            if (sessions['Start'] < lower - WINDOW_MARGIN).any():
+                perf_log.count('exports_unscoped')
+                self.window_support = False
+            elif (known_start is not None and pd.Timestamp(known_start) < lower - WINDOW_MARGIN
+                  and self.window_support is None):
+                self.window_support = True
+        mask = True
+        if lower is not None:
+            mask = sessions['Start'] >= lower
+        if last_day is not None:
+            mask = mask & (sessions['Start'] < pd.Timestamp(last_day + timedelta(days=1)))
+        return sessions if mask is True else sessions[mask]
+
+    def export_sessions(self, config, progress_callback=None, deadline=None, since=None, cancel_event=None,
+                        windows=None, known_start=None):
+        """Exportiert die Ladehistorie der Wallbox über die go-e API.
+
+        Mit windows werden nur die Ladevorgänge dieser Zeiträume angefordert; lange
+        Zeiträume werden in Abschnitte geteilt, die gleichzeitig exportiert werden.
+        Kleinere Exporte werden schneller fertig und übertragen weniger Daten.
+
+        Args:
+            config: API-Konfiguration der Wallbox
+            progress_callback: Optionale Funktion, die die 'progressBars' des Exports erhält
+            deadline: Optionaler Zeitpunkt (time.monotonic()), nach dem abgebrochen wird
+            since: Nur Ladevorgänge übernehmen, die nach diesem Zeitpunkt begonnen haben
+            cancel_event: Optionales threading.Event zum Abbrechen (siehe poll_export)
+            windows: Optionale Liste von (erster Tag, letzter Tag) als date; None an
+                einer Stelle = offen (Standard: gesamte Historie)
+            known_start: Optional Start (datetime) eines bereits gespeicherten
+                Ladevorgangs; fehlt er im Export, beachtet die API den Zeitraum
+
+        Returns:
+            DataFrame mit den Ladevorgängen ('Start' und 'Ende' als datetime)
+        """
+        try:
+            with perf_log.stage('dll'):
+                export_url = self.get_export_url(config)
+            shards = self.export_shards(windows or [(None, None)])
+
+            if len(shards) == 1:
+                with perf_log.stage('ticket'):
+                    ticket = self.get_ticket(export_url, *shards[0])
+                # Status abfragen, bis der Export fertig ist
+                with perf_log.stage('export_wait'):
+                    csv_parts = [self.poll_export(ticket, progress_callback, deadline, cancel_event)]
+            else:
+                perf_log.count('export_shards', len(shards))
+                with perf_log.stage('export_wait'):
+                    csv_parts = self._export_parallel(export_url, shards, progress_callback, deadline,
+                                                      cancel_event)
+            perf_log.count('csv_bytes', sum(len(csv_data) for csv_data in csv_parts))
+
+            # CSV-String blockweise in DataFrame umwandeln
+            with perf_log.stage('parse'):
+                # Mit since fehlen ältere Ladevorgänge auch ohne Zeitraum
+                if since is not None:
+                    known_start = None
+                parts = []
+                for (first_day, last_day), csv_data in zip(shards, csv_parts):
+                    parts.append(self._scope(parse_sessions(csv_data, since=since), first_day, last_day,
+                                             known_start))
+                if len(parts) == 1:
+                    sessions = parts[0]
+                else:
+                    # Ladevorgänge an den Grenzen der Abschnitte nur einmal übernehmen
+                    sessions = pd.concat(parts, ignore_index=True).drop_duplicates(
+                        ['Start', 'Ende', 'Energie [kWh]']).sort_values('Start', ignore_index=True)
+            perf_log.count('rows_parsed', len(sessions))
+            return sessions
+
+        except Cancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"API Fehler: {str(e)}")
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client():
+    """Liefert den gemeinsam genutzten Client des Prozesses."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = GoeApiClient()
+        return _default_client
+
+
+def fetch_sessions(config, start_date, end_date, store, progress_callback=None, deadline=None, client=None,
+                   cancel_event=None):
+    """Liefert die Ladevorgänge einer Wallbox bzw. aller Wallboxen eines Eintrags im angegebenen Zeitraum.
+
+    Exportiert nur, wenn der Zeitraum noch nicht im lokalen Speicher vorliegt, und
+    dann nur die fehlenden Zeiträume (siehe refresh_sessions).
+
+    Args:
+        config: API-Konfiguration der Wallbox (oder mehrerer, siehe charger_configs)
+        start_date: Erster Tag des Zeitraums (date)
+        end_date: Letzter Tag des Zeitraums (date, inklusive)
+        store: SessionStore für die lokal gespeicherten Ladevorgänge
+        progress_callback: Optionale Funktion für den Exportfortschritt
+        deadline: Optionaler Zeitpunkt (time.monotonic()), nach dem abgebrochen wird
+        client: GoeApiClient (Standard: gemeinsamer Client des Prozesses)
+        cancel_event: Optionales threading.Event zum Abbrechen des Exports
+
+    Returns:
+        DataFrame mit den Spalten 'Start', 'Ende' (datetime64) und 'Energie [kWh]',
+        bei mehreren Wallboxen oder ID-Chips zusätzlich 'Seriennummer' und 'ID Chip'
+    """
+    chargers = charger_configs(config)
+    for charger in chargers:
+        # Nur exportieren, wenn der Zeitraum noch nicht lokal vorliegt
+        if not store.covers(charger_key(charger), end_date, start_date):
+            refresh_sessions(charger, store, progress_callback, deadline, client, cancel_event, start_date)
+        else:
+            perf_log.count('store_hits')
+
+    return query_sessions(config, start_date, end_date, store)
+
+
+def query_sessions(config, start_date, end_date, store):
+    """Liefert die Ladevorgänge eines Eintrags aus dem lokalen Speicher, ohne zu exportieren.
+
+    Returns:
+        DataFrame wie fetch_sessions
+    """
+    chargers = charger_configs(config)
+    with perf_log.stage('store_query'):
+        if len(chargers) == 1 and not chargers[0].get('id_chips'):
+            sessions = store.query(charger_key(chargers[0]), start_date, end_date)
+        else:
+            sources = [(charger_key(charger), charger.get('id_chips')) for charger in chargers]
+            sessions = store.query_chargers(sources, start_date, end_date)
+    perf_log.count('rows_report', len(sessions))
+    return sessions
+
+
+def refresh_sessions(config, store, progress_callback=None, deadline=None, client=None, cancel_event=None,
+                     start_date=None):
+    """Exportiert die fehlenden Ladevorgänge und übernimmt sie in den lokalen Speicher.
+
+    Angefordert werden nur die Zeiträume, die noch nicht lokal vorliegen: bei einer
+    bekannten Wallbox die Ladevorgänge ab dem neuesten gespeicherten, bei einer
+    neuen Wallbox alles ab start_date (ohne start_date die gesamte Historie).
+    Beginnt start_date vor dem bisher abgedeckten Zeitraum, wird auch der Zeitraum
+    davor exportiert.
+
+    Args:
+        start_date: Optional erster benötigter Tag (date)
+
+    Returns:
+        Anzahl der neu gespeicherten Ladevorgänge
+    """
+    key = charger_key(config)
+    client = client or default_client()
+
+    last_fetch = store.last_fetch(key)
+    covered_from = store.covered_from(key)
+    last_start = store.last_session_start(key)
+    if last_fetch is None:
+        recent = (start_date, None)
+    elif last_start is not None:
+        recent = (last_start.date(), None)
+    else:
+        recent = (covered_from, None)
+    windows = [recent]
+    # Älterer Zeitraum vor dem bisher abgedeckten
+    earlier = covered_from is not None and start_date is not None and start_date < covered_from
+    if earlier:
+        windows.insert(0, (start_date, covered_from - timedelta(days=1)))
+
+    # Beachtet die Export-API keine Zeiträume, kommt ohnehin die gesamte Historie
+    first_day = None if client.window_support is False else start_date
+
+    fetched_at = datetime.now()
+    sessions = client.export_sessions(config, progress_callback, deadline, cancel_event=cancel_event,
+                                      windows=windows, known_start=store.first_session_start(key))
+    with perf_log.stage('store_write'):
+        added = 0
+        if earlier:
+            older = sessions['Start'] < pd.Timestamp(covered_from)
+            added += store.merge_sessions(key, sessions[older])
+            store.extend_coverage(key, first_day)
+            sessions = sessions[~older]
+        added += store.add_sessions(key, sessions, fetched_at, covered_from=first_day)
+    perf_log.count('sessions_new', added)
+    return added
@@ -6,20 +6,31 @@ Ermöglicht die Erstellung detaillierter Monatsberichte für die Abrechnung.
 # Standard Library Imports
 import os
 import json
-import time
+import queue
 import calendar
+import threading
+import importlib
 from datetime import datetime
-from io import StringIO
 
 # Third Party Imports
-import requests
-import pandas as pd
-from fpdf import FPDF
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
 from tkcalendar import DateEntry
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+
+# Local Imports
+import perf_log
+from report_cache import ReportCache
+
+
+# Module für Datenabruf und Berichterstellung. Sie ziehen pandas, matplotlib, fpdf
+# und requests nach sich und werden deshalb erst nach dem Start des Fensters geladen.
+REPORT_MODULES = ('goe_api', 'report', 'session_store')
+
+
+def warm_up_report_modules():
+    """Lädt die Module für Datenabruf und Berichterstellung vor."""
+    for name in REPORT_MODULES:
+        importlib.import_module(name)
 
 
 class GoeChargerApp:
@@ -38,6 +49,9 @@ class GoeChargerApp:
         self.root.title("go-e Charger Auswertung")
         self.settings_file = "goe_charger_settings.json"
         self.settings = {}
+        self._session_store = None
+        self.perf_log = perf_log.PerfLog(perf_log.LOG_FILE)
+        self.report_trace = None
 
         # Hauptframe mit Padding
         main_frame = ttk.Frame(root, padding="20")
@@ -110,14 +124,30 @@ class GoeChargerApp:
         # Fortschrittsbalken
         self.progress_frame = ttk.LabelFrame(main_frame, text="Fortschritt", padding="10")
         self.progress_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        self.status_label = ttk.Label(self.progress_frame, text="")
+        self.status_label.grid(row=0, column=0, columnspan=2, sticky=tk.W, padx=5)
         self.progress_bars = {}
+        self.progress_queue = queue.Queue()
+        self.report_thread = None
+        self.cancel_event = threading.Event()
         
         # Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=2, pady=(0, 10))
         
-        ttk.Button(button_frame, text="Bericht erstellen", 
-                  command=self.generate_report).grid(row=0, column=0, padx=5)
+        self.report_button = ttk.Button(button_frame, text="Bericht erstellen", 
+                                        command=self.generate_report)
+        self.report_button.grid(row=0, column=0, padx=5)
+
+        self.period_button = ttk.Button(button_frame, text="Monatsberichte erstellen",
+                                        command=self.generate_period_reports)
+        self.period_button.grid(row=0, column=1, padx=5)
+        self.period_dir = None
+
+        self.cancel_button = ttk.Button(button_frame, text="Abbrechen", command=self.cancel_report)
+        self.cancel_button.grid(row=0, column=2, padx=5)
+        self.cancel_button.state(['disabled'])
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Versteckte Einstellungen
         self.api_type = tk.StringVar()
@@ -126,6 +156,8 @@ class GoeChargerApp:
         self.employee = tk.StringVar()
         self.license_plate = tk.StringVar()
         self.serial_number = tk.StringVar()
+        self.tariff_file = tk.StringVar()
+        self.report_mode = tk.StringVar(value='daily')
         
         # Einstellungen laden und ggf. Dialog zeigen
         if not os.path.exists(self.settings_file):
@@ -133,6 +165,9 @@ class GoeChargerApp:
         else:
             self.load_settings()
 
+        # Berichtsmodule laden, sobald das Fenster angezeigt wird
+        self.root.after(200, lambda: threading.Thread(target=warm_up_report_modules, daemon=True).start())
+
     def show_settings_dialog(self):
         settings_dialog = tk.Toplevel(self.root)
         settings_dialog.title("Konfiguration")
@@ -181,6 +216,19 @@ class GoeChargerApp:
         ttk.Label(cost_frame, text="Strompreis (€/kWh):", style='Header.TLabel').grid(row=0, column=0, sticky=tk.W)
         price_entry = ttk.Entry(cost_frame, width=10, textvariable=self.price)
         price_entry.grid(row=0, column=1, pady=5, padx=5, sticky=tk.W)
+
+        # Optionaler zeitabhängiger Tarif (HT/NT), ersetzt den festen Strompreis
+        ttk.Label(cost_frame, text="Tarifdatei (JSON):", style='Header.TLabel').grid(row=1, column=0, sticky=tk.W)
+        tariff_entry = ttk.Entry(cost_frame, width=40, textvariable=self.tariff_file)
+        tariff_entry.grid(row=1, column=1, columnspan=2, pady=5, padx=5, sticky=tk.W)
+
+        ttk.Label(cost_frame, text="Berichtsart:", style='Header.TLabel').grid(row=2, column=0, sticky=tk.W)
+        ttk.Radiobutton(cost_frame, text="Tage",
+                        variable=self.report_mode,
+                        value="daily").grid(row=2, column=1, padx=5, sticky=tk.W)
+        ttk.Radiobutton(cost_frame, text="Ladevorgänge",
+                        variable=self.report_mode,
+                        value="sessions").grid(row=2, column=2, padx=5, sticky=tk.W)
         
         # Mitarbeiter und Kennzeichen
         info_frame = ttk.LabelFrame(dialog_frame, text="Fahrzeug & Fahrer", padding="10")
@@ -232,6 +280,8 @@ class GoeChargerApp:
             'cloud_api_key': self.cloud_api_key.get(),
             'serial_number': self.serial_number.get(),
             'price': self.price.get(),
+            'tariff_file': self.tariff_file.get(),
+            'report_mode': self.report_mode.get(),
             'employee': self.employee.get(),
             'license_plate': self.license_plate.get()
         }
@@ -251,6 +301,8 @@ class GoeChargerApp:
                     self.cloud_api_key.set(self.settings.get('cloud_api_key', ''))
                     self.serial_number.set(self.settings.get('serial_number', ''))
                     self.price.set(self.settings.get('price', '0.30'))
+                    self.tariff_file.set(self.settings.get('tariff_file', ''))
+                    self.report_mode.set(self.settings.get('report_mode', 'daily'))
                     self.employee.set(self.settings.get('employee', ''))
                     self.license_plate.set(self.settings.get('license_plate', ''))
             else:
@@ -260,306 +312,138 @@ class GoeChargerApp:
             self.settings = {}
 
     def update_progress_bars(self, progress_data):
-        # Bestehende Fortschrittsbalken löschen
-        for widget in self.progress_frame.winfo_children():
-            widget.destroy()
+        """Aktualisiert die Fortschrittsbalken des Exports, ohne sie neu aufzubauen."""
+        for bar_data in progress_data:
+            name = bar_data.get('name', '')
+            if name not in self.progress_bars:
+                row = len(self.progress_bars) + 1
+                label = ttk.Label(self.progress_frame, text=name)
+                label.grid(row=row, column=0, padx=5, sticky=tk.W)
+                progress = ttk.Progressbar(self.progress_frame, length=200, mode='determinate')
+                progress.grid(row=row, column=1, padx=5)
+                self.progress_bars[name] = (label, progress)
+            self.progress_bars[name][1]['value'] = bar_data.get('progress', 0)
+
+    def reset_progress(self, text=""):
+        """Entfernt die Fortschrittsbalken des letzten Berichts und setzt den Statustext."""
+        for label, progress in self.progress_bars.values():
+            label.destroy()
+            progress.destroy()
         self.progress_bars.clear()
-        
-        # Neue Fortschrittsbalken erstellen
-        for i, bar_data in enumerate(progress_data):
-            label = ttk.Label(self.progress_frame, text=bar_data.get('name', ''))
-            label.grid(row=i, column=0, padx=5)
-            
-            progress = ttk.Progressbar(self.progress_frame, length=200, mode='determinate')
-            progress.grid(row=i, column=1, padx=5)
-            progress['value'] = bar_data.get('progress', 0)
-            
-            self.progress_bars[bar_data.get('name', '')] = progress
-        
-        self.root.update()
+        self.status_label['text'] = text
+
+    def api_config(self):
+        """Liefert die aktuelle API-Konfiguration aus den Einstellungen."""
+        return {
+            'api_type': self.api_type.get(),
+            'local_api_url': self.local_api_url.get(),
+            'cloud_api_key': self.cloud_api_key.get(),
+            'serial_number': self.serial_number.get()
+        }
+
+    @property
+    def session_store(self):
+        if self._session_store is None:
+            from session_store import SessionStore
+            self._session_store = SessionStore()
+        return self._session_store
 
-    def fetch_charging_data(self, start_date, end_date):
+    def report_worker(self, config, spec, period_dir, trace, cancel_event):
+        """Ruft die Ladedaten ab und erstellt den Bericht im Hintergrund.
+
+        Fortschritt und Ergebnis werden über die Queue an den GUI-Thread gemeldet;
+        Tk-Widgets werden hier nicht angefasst.
+        """
+        import goe_api
+        import report
+        post = self.progress_queue.put
+
+        def check_cancelled():
+            if cancel_event.is_set():
+                raise goe_api.Cancelled()
+
+        def period_progress(done, total):
+            check_cancelled()
+            post(('status', f"Bericht {done + 1} von {total} wird erstellt ..."))
+
+        error_text = "Fehler beim Abrufen der Daten"
         try:
-            # Bestimme die Base URL und Headers basierend auf API-Typ
-            base_url = ""
-            headers = {}
-            
-            if self.api_type.get() == 'cloud':
-                # Cloud API
-                serial = self.serial_number.get()
-                if not serial:
-                    raise Exception("Seriennummer ist erforderlich für Cloud API")
-                base_url = f"https://{serial}.api.v3.go-e.io"
-                headers = {'Authorization': f'Bearer {self.cloud_api_key.get()}'}
-            else:
-                # Lokale API
-                base_url = self.local_api_url.get()
-                
-            try:
-                # Ersten API-Call um die DLL-URL zu bekommen
-                dll_response = requests.get(f"{base_url}/api/status?filter=dll", headers=headers)
-                if dll_response.status_code != 200:
-                    if self.api_type.get() == 'local':
-                        # Bei Fehler zur Cloud API wechseln
-                        serial = self.serial_number.get()
-                        if serial and self.cloud_api_key.get():
-                            base_url = f"https://{serial}.api.v3.go-e.io"
-                            headers = {'Authorization': f'Bearer {self.cloud_api_key.get()}'}
-                            dll_response = requests.get(f"{base_url}/api/status?filter=dll", headers=headers)
-                            if dll_response.status_code != 200:
-                                raise Exception("Fehler beim Abrufen der DLL-URL (Lokale und Cloud API)")
-                        else:
-                            raise Exception("Fehler beim Abrufen der DLL-URL und keine Cloud API Konfiguration verfügbar")
-                    else:
-                        raise Exception("Fehler beim Abrufen der DLL-URL")
-                
-                dll_data = dll_response.json()
-                export_url = dll_data.get('dll')
-                if not export_url:
-                    raise Exception("Keine DLL-URL in der Antwort gefunden")
-                
-                # Export-Parameter aus der URL extrahieren
-                export_param = export_url.split('?e=')[1]
-                
-                # Ticket anfordern mit dem Export-Parameter
-                ticket_response = requests.get(f"https://data.v3.go-e.io/api/v1/get_ticket?e={export_param}")
-                if ticket_response.status_code != 200:
-                    raise Exception("Fehler beim Abrufen des Tickets")
-                
-                ticket_data = ticket_response.json()
-                ticket = ticket_data.get('ticket')
-                if not ticket:
-                    raise Exception("Kein Ticket in der Antwort gefunden")
-                
-                # Status-Abfrage in Schleife
-                max_retries = 30
-                retry_count = 0
-                while retry_count < max_retries:
-                    status_response = requests.get(f"https://data.v3.go-e.io/api/v1/get_status?ticket={ticket}")
-                    if status_response.status_code != 200:
-                        raise Exception("Fehler beim Abrufen des Status")
-                        
-                    status_data = status_response.json()
-                    
-                    # Fortschrittsbalken aktualisieren
-                    if 'status' in status_data and 'progressBars' in status_data['status']:
-                        self.update_progress_bars(status_data['status']['progressBars'])
-                    
-                    # Prüfen ob die Daten fertig sind
-                    if status_data.get('status', {}).get('message') == "Task finished":
-                        csv_data = status_data.get('status', {}).get('csv')
-                        if csv_data:
-                            # CSV-String in DataFrame umwandeln
-                            df = pd.read_csv(StringIO(csv_data), sep=';', decimal=',')
-                            
-                            # Datum konvertieren und filtern
-                            df['Start'] = pd.to_datetime(df['Start'], format='%d.%m.%Y %H:%M:%S')
-                            df['Ende'] = pd.to_datetime(df['Ende'], format='%d.%m.%Y %H:%M:%S')
-                            
-                            mask = (df['Start'].dt.date >= start_date) & (df['Ende'].dt.date <= end_date)
-                            filtered_df = df[mask]
-                            
-                            # Nur benötigte Spalten behalten und nach Datum gruppieren
-                            result_df = filtered_df.groupby(df['Start'].dt.date)['Energie [kWh]'].sum().reset_index()
-                            result_df.columns = ['Datum', 'Energie_kWh']
-                            result_df['Datum'] = result_df['Datum'].astype(str)
-                            
-                            return result_df
-                            
-                    time.sleep(2)
-                    retry_count += 1
-                    
-                raise Exception("Timeout beim Warten auf die Daten")
-                
-            except Exception as e:
-                raise Exception(f"API Fehler: {str(e)}")
-                
+            with trace.activate():
+                post(('status', "Daten werden abgerufen ..."))
+                df = goe_api.fetch_sessions(config, spec['start_date'], spec['end_date'], self.session_store,
+                                            lambda bars: post(('progress', bars)), cancel_event=cancel_event)
+                error_text = "Fehler bei der PDF-Erstellung"
+                if period_dir:
+                    result = report.generate_period_reports(df, spec, 'month', period_dir, overview=True,
+                                                            progress_callback=period_progress)
+                else:
+                    check_cancelled()
+                    post(('status', "Bericht wird erstellt ..."))
+                    result = report.generate_pdf(df, spec)
+            trace.finish('ok')
+            post(('done', result))
+        except goe_api.Cancelled:
+            trace.finish('cancelled')
+            post(('cancelled', None))
         except Exception as e:
-            messagebox.showerror("Fehler", f"Fehler beim Abrufen der Daten: {str(e)}")
-            return None
+            trace.finish('failed', e)
+            post(('error', f"{error_text}: {str(e)}"))
+
+    def process_progress_queue(self):
+        """Verarbeitet die Meldungen der Berichterstellung im GUI-Thread."""
+        try:
+            while True:
+                kind, payload = self.progress_queue.get_nowait()
+                if kind == 'progress':
+                    self.update_progress_bars(payload)
+                elif kind == 'status':
+                    if not self.cancel_event.is_set():
+                        self.status_label['text'] = payload
+                else:
+                    self.finish_report(kind, payload)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self.process_progress_queue)
 
     def parse_price(self, price_str):
         """Konvertiert einen Preis-String in Float, akzeptiert Komma und Punkt"""
+        import report
         try:
-            # Ersetze Komma durch Punkt und versuche zu konvertieren
-            price_str = price_str.replace(',', '.')
-            return float(price_str)
-        except (ValueError, AttributeError):
-            messagebox.showerror("Fehler", "Ungültiger Strompreis. Bitte geben Sie eine Zahl ein (z.B. 0,30 oder 0.30)")
+            return report.parse_price(price_str)
+        except ValueError as e:
+            self.log_error(e)
+            messagebox.showerror("Fehler", str(e))
             return None
 
-    def generate_pdf(self, df):
-        try:
-            price_per_kwh = self.parse_price(self.price.get())
-            if price_per_kwh is None:
-                return None
-            
-            class PDF(FPDF):
-                def header(self):
-                    self.set_font('Arial', 'B', 15)
-                    self.cell(0, 8, 'go-e Charger Ladebericht', 0, 1, 'C')
-                    self.line(10, 20, 200, 20)
-                    self.ln(5)
-
-                def footer(self):
-                    self.set_y(-15)
-                    self.set_font('Arial', 'I', 8)
-                    self.cell(0, 10, f'Seite {self.page_no()}', 0, 0, 'C')
-
-            # PDF erstellen
-            pdf = PDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            
-            # Zeitraum
-            pdf.set_font("Arial", 'B', 11)
-            pdf.set_fill_color(240, 240, 240)
-            zeitraum_text = f"Zeitraum: {self.start_date.get_date().strftime('%d.%m.%Y')} - {self.end_date.get_date().strftime('%d.%m.%Y')}"
-            pdf.cell(0, 8, zeitraum_text, 0, 1, 'L', fill=True)
-            
-            # Mitarbeiter und Kennzeichen in einer Zeile
-            if self.employee.get().strip() or self.license_plate.get().strip():
-                pdf.set_font("Arial", 'B', 11)
-                pdf.set_fill_color(240, 240, 240)
-                
-                if self.employee.get().strip() and self.license_plate.get().strip():
-                    mitarbeiter_width = 130
-                    kennzeichen_width = 60
-                else:
-                    mitarbeiter_width = 190
-                    kennzeichen_width = 190
-                
-                if self.employee.get().strip():
-                    pdf.cell(mitarbeiter_width, 8, f"Mitarbeiter: {self.employee.get()}", 0, 0, 'L', fill=True)
-                
-                if self.license_plate.get().strip():
-                    if self.employee.get().strip():
-                        pdf.cell(kennzeichen_width, 8, f"KFZ: {self.license_plate.get()}", 0, 1, 'L', fill=True)
-                    else:
-                        pdf.cell(kennzeichen_width, 8, f"KFZ: {self.license_plate.get()}", 0, 1, 'L', fill=True)
-                else:
-                    pdf.ln()
-            
-            pdf.ln(2)
-            
-            # Verbrauchsdiagramm erstellen
-            plt.figure(figsize=(10, 4))
-            dates = pd.to_datetime(df['Datum'])
-            
-            # Balkendiagramm statt Liniendiagramm
-            plt.bar(dates, df['Energie_kWh'], width=0.8, color='#34495e', alpha=0.7)
-            plt.grid(True, linestyle='--', alpha=0.3, axis='y')
-            
-            # Deutsche Formatierung
-            plt.title('Stromverbrauch im Zeitverlauf')
-            plt.xlabel('Datum')
-            plt.ylabel('Verbrauch (kWh)')
-            
-            # Datumsformat auf Deutsch setzen
-            date_formatter = DateFormatter('%d.%m.%Y')
-            plt.gca().xaxis.set_major_formatter(date_formatter)
-            plt.xticks(rotation=45, ha='right')
-            
-            # Layout optimieren
-            plt.tight_layout()
-            
-            # Diagramm speichern
-            chart_filename = 'temp_chart.png'
-            plt.savefig(chart_filename, dpi=300, bbox_inches='tight')
-            plt.close()
-            
-            # Diagramm in PDF einfügen
-            pdf.image(chart_filename, x=10, y=pdf.get_y(), w=190)
-            
-            # Temporäre Datei löschen
-            try:
-                os.remove(chart_filename)
-            except:
-                pass
-            
-            pdf.ln(100)  # Platz für das Diagramm
-            
-            # Tabellenkopf
-            pdf.set_font("Arial", 'B', 10)
-            pdf.set_fill_color(52, 73, 94)
-            pdf.set_text_color(255, 255, 255)
-            
-            # Angepasste Spaltenbreiten für volle Seitenbreite
-            page_width = pdf.w - 20  # Seitenbreite minus Ränder
-            date_width = page_width * 0.4
-            energy_width = page_width * 0.3
-            cost_width = page_width * 0.3
-            
-            # Tabelle zentrieren
-            x_offset = 10  # Linker Rand
-            
-            pdf.set_x(x_offset)
-            pdf.cell(date_width, 7, "Datum", 1, 0, 'C', fill=True)
-            pdf.cell(energy_width, 7, "kWh", 1, 0, 'C', fill=True)
-            pdf.cell(cost_width, 7, "EUR", 1, 1, 'C', fill=True)
-            
-            # Tabelleninhalt
-            pdf.set_font("Arial", '', 10)
-            pdf.set_text_color(0, 0, 0)
-            
-            total_energy = 0
-            total_cost = 0
-            
-            row_colors = [(255, 255, 255), (245, 245, 245)]
-            
-            for i, (_, row) in enumerate(df.iterrows()):
-                date_obj = datetime.strptime(row['Datum'], '%Y-%m-%d')
-                date = date_obj.strftime('%d.%m.%Y')
-                
-                energy = row['Energie_kWh']
-                cost = energy * price_per_kwh
-                
-                pdf.set_fill_color(*row_colors[i % 2])
-                pdf.set_x(x_offset)
-                
-                pdf.cell(date_width, 7, date, 1, 0, 'C', fill=True)
-                pdf.cell(energy_width, 7, f"{energy:.2f}", 1, 0, 'C', fill=True)
-                pdf.cell(cost_width, 7, f"{cost:.2f}", 1, 1, 'C', fill=True)
-                
-                total_energy += energy
-                total_cost += cost
-            
-            # Zusammenfassung
-            pdf.ln(2)
-            pdf.set_font("Arial", 'B', 10)
-            pdf.set_fill_color(52, 73, 94)
-            pdf.set_text_color(255, 255, 255)
-            
-            summary_label_width = page_width * 0.7
-            summary_value_width = page_width * 0.3
-            
-            pdf.set_x(x_offset)
-            pdf.cell(summary_label_width, 7, "Gesamtenergie:", 1, 0, 'L', fill=True)
-            pdf.cell(summary_value_width, 7, f"{total_energy:.2f} kWh", 1, 1, 'R', fill=True)
-            
-            pdf.set_x(x_offset)
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(summary_label_width, 7, "Strompreis pro kWh:", 1, 0, 'L', fill=True)
-            pdf.cell(summary_value_width, 7, f"{price_per_kwh:.2f} EUR", 1, 1, 'R', fill=True)
-            
-            pdf.set_x(x_offset)
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(summary_label_width, 7, "Gesamtkosten:", 1, 0, 'L', fill=True)
-            pdf.cell(summary_value_width, 7, f"{total_cost:.2f} EUR", 1, 1, 'R', fill=True)
-            
-            # Erstellungsdatum
-            pdf.ln(2)
-            pdf.set_font("Arial", 'I', 8)
-            pdf.cell(0, 5, f"Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", 0, 1, 'R')
-            
-            filename = f"goe_charger_bericht_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            pdf.output(filename)
-            return filename
-        except Exception as e:
-            messagebox.showerror("Fehler", f"Fehler bei der PDF-Erstellung: {str(e)}")
+    def report_spec(self):
+        """Liefert die Berichtsbeschreibung aus den Einstellungen oder None bei ungültigem Preis."""
+        price_per_kwh = self.parse_price(self.price.get())
+        if price_per_kwh is None:
             return None
 
-    def generate_report(self):
+        spec = {
+            'start_date': self.start_date.get_date(),
+            'end_date': self.end_date.get_date(),
+            'price': price_per_kwh,
+            'mode': self.report_mode.get() or 'daily',
+            'employee': self.employee.get(),
+            'license_plate': self.license_plate.get(),
+            # Unveränderte Berichte, z.B. abgeschlossene Monate, werden nur kopiert
+            'cache': ReportCache()
+        }
+        if self.tariff_file.get().strip():
+            import tariffs
+            spec['tariff'] = tariffs.load_tariff(self.tariff_file.get().strip())
+        return spec
+
+    def generate_period_reports(self):
+        """Erstellt für den gewählten Zeitraum je einen Bericht pro Monat und eine Übersicht."""
+        directory = filedialog.askdirectory(title="Zielverzeichnis für die Monatsberichte")
+        if directory:
+            self.generate_report(period_dir=directory)
+
+    def generate_report(self, period_dir=None):
         try:
             start_date = self.start_date.get_date()
             end_date = self.end_date.get_date()
@@ -567,14 +451,74 @@ class GoeChargerApp:
             if start_date > end_date:
                 messagebox.showerror("Fehler", "Das Startdatum muss vor dem Enddatum liegen!")
                 return
-                
-            df = self.fetch_charging_data(start_date, end_date)
-            if df is not None:
-                filename = self.generate_pdf(df)
-                messagebox.showinfo("Erfolg", f"Bericht wurde erstellt: {filename}")
+
+            if self.report_thread is not None and self.report_thread.is_alive():
+                return
+
+            config = self.api_config()
+            self.report_trace = perf_log.Trace(
+                'report', self.perf_log, charger=config['serial_number'] or config['local_api_url'],
+                api_type=config['api_type'], start_date=start_date.isoformat(), end_date=end_date.isoformat(),
+                period_reports=bool(period_dir))
+            spec = self.report_spec()
+            if spec is None:
+                return
+
+            # Abruf und Berichterstellung im Hintergrund, die GUI bleibt bedienbar
+            self.period_dir = period_dir
+            self.report_button.state(['disabled'])
+            self.period_button.state(['disabled'])
+            self.cancel_button.state(['!disabled'])
+            self.reset_progress("Bericht wird vorbereitet ...")
+            self.progress_queue = queue.Queue()
+            self.cancel_event = threading.Event()
+            self.report_thread = threading.Thread(
+                target=self.report_worker,
+                args=(config, spec, period_dir, self.report_trace, self.cancel_event),
+                daemon=True)
+            self.report_thread.start()
+            self.root.after(100, self.process_progress_queue)
         except Exception as e:
+            self.log_error(e)
+            self.enable_buttons()
             messagebox.showerror("Fehler", f"Fehler bei der Berichterstellung: {str(e)}")
 
+    def enable_buttons(self):
+        self.report_button.state(['!disabled'])
+        self.period_button.state(['!disabled'])
+        self.cancel_button.state(['disabled'])
+
+    def cancel_report(self):
+        """Bricht die laufende Berichterstellung beim nächsten Zwischenschritt ab."""
+        if self.report_thread is not None and self.report_thread.is_alive():
+            self.cancel_event.set()
+            self.cancel_button.state(['disabled'])
+            self.status_label['text'] = "Wird abgebrochen ..."
+
+    def on_close(self):
+        self.cancel_event.set()
+        self.root.destroy()
+
+    def log_error(self, error):
+        """Protokolliert einen Fehler der laufenden Berichterstellung."""
+        if self.report_trace is not None:
+            self.report_trace.finish('failed', error)
+
+    def finish_report(self, kind, payload):
+        """Zeigt das Ergebnis der Berichterstellung an ('done', 'cancelled' oder 'error')."""
+        self.enable_buttons()
+        if kind == 'done':
+            self.status_label['text'] = "Fertig"
+            if self.period_dir:
+                messagebox.showinfo("Erfolg", f"{len(payload)} Berichte wurden erstellt in: {self.period_dir}")
+            else:
+                messagebox.showinfo("Erfolg", f"Bericht wurde erstellt: {payload}")
+        elif kind == 'cancelled':
+            self.status_label['text'] = "Abgebrochen"
+        else:
+            self.status_label['text'] = ""
+            messagebox.showerror("Fehler", payload)
+
 if __name__ == "__main__":
     root = tk.Tk()
     root.iconbitmap('icon.ico')
@@ -0,0 +1,313 @@
+"""
+Seitenweises Schreiben großer PDF-Tabellen.
+
+StreamingPDF schreibt jede fertige Seite sofort komprimiert in die Zieldatei,
+statt alle Seiten bis zur Ausgabe im Speicher zu halten und am Ende Zeile für
+Zeile an einen String anzuhängen. TableWriter setzt die Tabellenzeilen einer
+Seite direkt als PDF-Befehle: alle Hintergründe einer Zeilenfarbe in einem Pfad,
+alle Texte der Seite in einem Textobjekt. Farben und Schrift werden je Seite
+einmal gesetzt statt für jede Zelle. Auf jeder Seite wird der Tabellenkopf
+wiederholt; bei mehrseitigen Tabellen steht am Seitenende eine Zwischensumme und
+am Anfang der Folgeseite der Übertrag.
+"""
+
+# Standard Library Imports
+import os
+import zlib
+
+# Third Party Imports
+from fpdf import FPDF, FPDF_VERSION
+
+# StreamingPDF ersetzt interne Methoden von fpdf 1.7.2; fpdf2 installiert dasselbe Modul
+if FPDF_VERSION != '1.7.2':
+    raise ImportError(f"Benötigt wird fpdf 1.7.2, installiert ist {FPDF_VERSION} (pip install fpdf==1.7.2)")
+
+
+class StreamingPDF(FPDF):
+    """
+    FPDF-Dokument, das direkt in eine Datei geschrieben wird.
+    Fertige Seiten werden sofort ausgegeben; Links und der Platzhalter für die
+    Seitenanzahl (alias_nb_pages) werden daher nicht unterstützt.
+    """
+
+    def __init__(self, filename, orientation='P', unit='mm', format='A4'):
+        """Initialisiert das Dokument.
+
+        Args:
+            filename: Zieldatei; bis output() wird in eine temporäre Datei daneben geschrieben
+        """
+        super().__init__(orientation, unit, format)
+        self.filename = filename
+        self._temp = f"{filename}.tmp"
+        self._file = None
+        self._pos = 0
+        self._parts = []
+
+    def _write(self, text):
+        if self._file is None:
+            self._file = open(self._temp, 'wb')
+        data = text.encode('latin1')
+        self._file.write(data)
+        self._pos += len(data)
+
+    def _out(self, s):
+        if isinstance(s, bytes):
+            s = s.decode('latin1')
+        elif not isinstance(s, str):
+            s = str(s)
+        if self.state == 2:
+            # Inhalt der aktuellen Seite: Liste statt wiederholter String-Verkettung
+            self._parts.append(s)
+        else:
+            self._write(s + "\n")
+
+    def _beginpage(self, orientation):
+        if self._pos == 0:
+            self._write(f"%PDF-{self.pdf_version}\n")
+        super()._beginpage(orientation)
+        self._parts = []
+
+    def _endpage(self):
+        super()._endpage()
+        content = "\n".join(self._parts) + "\n" if self._parts else ''
+        self._parts = []
+        self._put_page(self.page, content)
+
+    def _put_page(self, n, content):
+        """Schreibt Seitenobjekt und Inhalt einer fertigen Seite (Objekte 3 + 2 * (n - 1) und folgendes)."""
+        self._newobj()
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if n in self.orientation_changes:
+            self._out('/MediaBox [0 0 %.2f %.2f]' % (self.fh_pt, self.fw_pt))
+        self._out('/Resources 2 0 R')
+        if self.pdf_version > '1.3':
+            self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out(f"/Contents {self.n + 1} 0 R>>")
+        self._out('endobj')
+
+        data = content.encode('latin1')
+        if self.compress:
+            data = zlib.compress(data)
+        self._newobj()
+        self._out(f"<<{'/Filter /FlateDecode ' if self.compress else ''}/Length {len(data)}>>")
+        self._putstream(data)
+        self._out('endobj')
+        # Nur die Seitennummer bleibt bekannt, der Inhalt ist geschrieben
+        self.pages[n] = ''
+
+    def _newobj(self):
+        self.n += 1
+        self.offsets[self.n] = self._pos
+        self._out(f"{self.n} 0 obj")
+
+    def _putheader(self):
+        # Bereits vor der ersten Seite geschrieben
+        pass
+
+    def _putpages(self):
+        # Die Seiten sind geschrieben, es fehlt nur der Seitenbaum
+        if self.def_orientation == 'P':
+            w_pt, h_pt = self.fw_pt, self.fh_pt
+        else:
+            w_pt, h_pt = self.fh_pt, self.fw_pt
+        self.offsets[1] = self._pos
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f"{3 + 2 * i} 0 R " for i in range(self.page)) + ']')
+        self._out(f"/Count {self.page}")
+        self._out('/MediaBox [0 0 %.2f %.2f]' % (w_pt, h_pt))
+        self._out('>>')
+        self._out('endobj')
+
+    def _putresources(self):
+        self._putfonts()
+        self._putimages()
+        self.offsets[2] = self._pos
+        self._out('2 0 obj')
+        self._out('<<')
+        self._putresourcedict()
+        self._out('>>')
+        self._out('endobj')
+
+    def _enddoc(self):
+        self._putpages()
+        self._putresources()
+        self._newobj()
+        self._out('<<')
+        self._putinfo()
+        self._out('>>')
+        self._out('endobj')
+        self._newobj()
+        self._out('<<')
+        self._putcatalog()
+        self._out('>>')
+        self._out('endobj')
+        xref = self._pos
+        self._out('xref')
+        self._out(f"0 {self.n + 1}")
+        self._out('0000000000 65535 f ')
+        for i in range(1, self.n + 1):
+            self._out('%010d 00000 n ' % self.offsets[i])
+        self._out('trailer')
+        self._out('<<')
+        self._puttrailer()
+        self._out('>>')
+        self._out('startxref')
+        self._out(xref)
+        self._out('%%EOF')
+        self.state = 3
+
+    def output(self, name='', dest=''):
+        """Schließt das Dokument ab und legt es unter filename ab.
+
+        Returns:
+            Dateiname
+        """
+        if self.state < 3:
+            self.close()
+        self._file.close()
+        os.replace(self._temp, self.filename)
+        return self.filename
+
+    def discard(self):
+        """Verwirft ein unvollständiges Dokument (z.B. nach einem Fehler)."""
+        if self._file is not None:
+            self._file.close()
+            if os.path.exists(self._temp):
+                os.remove(self._temp)
+
+
+def _rgb(color, operator):
+    return '%.3f %.3f %.3f %s' % (color[0] / 255, color[1] / 255, color[2] / 255, operator)
+
+
+class TableWriter:
+    """
+    Schreibt Tabellenzeilen seitenweise in ein StreamingPDF.
+    Kopf- und Summenzeilen entstehen über die normalen FPDF-Zellen, die Datenzeilen
+    einer Seite als ein Block von PDF-Befehlen.
+    """
+
+    HEADER_FILL = (52, 73, 94)
+    ROW_FILLS = ((255, 255, 255), (245, 245, 245))
+
+    def __init__(self, pdf, columns, x=10, row_height=7, font_size=10):
+        """Initialisiert die Tabelle.
+
+        Args:
+            pdf: Dokument (FPDF bzw. StreamingPDF)
+            columns: Liste von (Überschrift, Anteil an der Tabellenbreite)
+            x: Linker Rand der Tabelle in mm
+            row_height: Zeilenhöhe in mm
+            font_size: Schriftgröße in Punkt
+        """
+        self.pdf = pdf
+        self.titles = [title for title, _ in columns]
+        width = pdf.w - 2 * x
+        self.widths = [width * share for _, share in columns]
+        self.lefts = [x + sum(self.widths[:i]) for i in range(len(self.widths))]
+        self.x = x
+        self.width = width
+        self.row_height = row_height
+        self.font_size = font_size
+        self._half_widths = {}
+
+    def _header(self):
+        pdf = self.pdf
+        pdf.set_font('Arial', 'B', self.font_size)
+        pdf.set_fill_color(*self.HEADER_FILL)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_x(self.x)
+        for i, title in enumerate(self.titles):
+            pdf.cell(self.widths[i], self.row_height, title, 1, int(i == len(self.titles) - 1), 'C', fill=True)
+
+    def _total_row(self, label, totals, label_columns):
+        """Zwischensumme bzw. Übertrag: Beschriftung über die Beschriftungsspalten, dann die Summen."""
+        pdf = self.pdf
+        pdf.set_font('Arial', 'B', self.font_size)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_x(self.x)
+        pdf.cell(sum(self.widths[:label_columns]), self.row_height, label, 1, 0, 'L', fill=True)
+        for i, value in enumerate(totals):
+            column = label_columns + i
+            pdf.cell(self.widths[column], self.row_height, value, 1, int(column == len(self.widths) - 1),
+                     'C', fill=True)
+
+    def _body(self, rows):
+        """Schreibt Datenzeilen ab der aktuellen Position als ein Block von PDF-Befehlen."""
+        pdf = self.pdf
+        pdf.set_font('Arial', '', self.font_size)
+        k, page_h, h = pdf.k, pdf.h, self.row_height
+        y0 = pdf.y
+        char_widths = pdf.current_font['cw']
+        em = pdf.font_size / 1000.0
+        escape = pdf._escape
+        # Spaltenabhängige Teile der Befehle nur einmal je Seite formatieren
+        columns = [('%.2f' % (left * k), '%.2f %.2f' % (w * k, -h * k), left + w / 2)
+                   for left, w in zip(self.lefts, self.widths)]
+        # Textbreiten wiederholter Werte (Beträge, Datumsangaben) nur einmal berechnen
+        half_widths = self._half_widths
+
+        rects = ([], [])
+        texts = []
+        for r, row in enumerate(rows):
+            y = y0 + r * h
+            top = '%.2f' % ((page_h - y) * k)
+            baseline = '%.2f' % ((page_h - (y + 0.5 * h + 0.3 * pdf.font_size)) * k)
+            rects[r % 2].append(' '.join(f"{left} {top} {size} re" for left, size, _ in columns))
+            for (_, _, center), value in zip(columns, row):
+                half = half_widths.get(value)
+                if half is None:
+                    half = half_widths[value] = sum(char_widths[c] for c in value) * em / 2
+                texts.append('1 0 0 1 %.2f %s Tm (%s) Tj' % ((center - half) * k, baseline, escape(value)))
+
+        # q ... Q stellt Farben und Schrift danach wieder her
+        ops = ['q']
+        for fill, parts in zip(self.ROW_FILLS, rects):
+            if parts:
+                ops.append(_rgb(fill, 'rg'))
+                ops.append(' '.join(parts) + ' B')
+        ops.append('BT /F%d %.2f Tf 0 g' % (pdf.current_font['i'], pdf.font_size_pt))
+        ops.extend(texts)
+        ops.append('ET Q')
+        pdf._out('\n'.join(ops))
+        pdf.set_xy(self.x, y0 + len(rows) * h)
+        if len(half_widths) > 100000:
+            half_widths.clear()
+
+    def write(self, rows):
+        """Schreibt alle Zeilen.
+
+        Args:
+            rows: TableRows (siehe report_model) mit len(), block(start, stop),
+                subtotal(stop) und label_columns; liefert subtotal None, entfallen
+                Zwischensumme und Übertrag
+        """
+        pdf = self.pdf
+        h = self.row_height
+        total = len(rows)
+        done = 0
+        while True:
+            # Platz für Kopf, mindestens eine Zeile und ggf. die Zwischensumme
+            if pdf.y + 3 * h > pdf.page_break_trigger:
+                pdf.add_page()
+            self._header()
+            carry = rows.subtotal(done) if done else None
+            if carry is not None:
+                self._total_row('Übertrag', carry, rows.label_columns)
+
+            space = int((pdf.page_break_trigger - pdf.y) // h)
+            count = total - done if total - done <= space else space - 1
+            if count:
+                self._body(rows.block(done, done + count))
+            done += count
+            if done >= total:
+                break
+            subtotal = rows.subtotal(done)
+            if subtotal is not None:
+                self._total_row('Zwischensumme', subtotal, rows.label_columns)
+            pdf.add_page()
+
+        pdf.set_text_color(0, 0, 0)
@@ -0,0 +1,278 @@
+"""
+Laufzeitmessung der Berichterstellung und strukturiertes Protokoll (JSON Lines).
+
+Ein Trace begleitet einen Vorgang, z.B. einen Bericht, über alle Stufen: Abruf
+(DLL-URL, Ticket, Warten auf den Export), Einlesen, Speicher, Berichtsmodell,
+Diagramm und PDF-Ausgabe. Die Funktionen in goe_api, sessions und report melden
+ihre Stufen und Zähler an den Trace des aktuellen Threads; ohne aktiven Trace
+kosten die Aufrufe praktisch nichts.
+
+Jeder abgeschlossene Trace wird als eine JSON-Zeile geschrieben, z.B.:
+
+    {"time": "2024-06-01T02:00:13", "name": "report", "status": "ok",
+     "duration": 12.41, "stages": {"dll": 0.21, "export_wait": 11.2, ...},
+     "counters": {"polls": 9, "bytes_downloaded": 184220, "rows_parsed": 1830},
+     "process_peak_rss_mb": 212.4, "peak_rss_growth_mb": 18.0, "charger": "123456"}
+
+process_peak_rss_mb ist der Spitzenwert des ganzen Prozesses seit dessen Start;
+in lang laufenden Prozessen (batch.py, service.py) zeigt peak_rss_growth_mb, um
+wie viel dieser Spitzenwert während des Traces gestiegen ist.
+
+Für die Stapelverarbeitung können die Traces zusätzlich im Textformat von
+Prometheus (node_exporter textfile collector) zusammengefasst werden.
+"""
+
+# Standard Library Imports
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+LOG_FILE = "goe_charger_perf.jsonl"
+METRIC_PREFIX = "goe_report"
+
+_local = threading.local()
+
+
+def peak_rss_mb():
+    """Liefert den bisherigen Spitzenwert des Arbeitsspeichers des Prozesses in MB (oder None)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux meldet KB, macOS Bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class PerfLog:
+    """
+    Ziel für abgeschlossene Traces: JSON-Lines-Datei und/oder Liste im Speicher.
+    Kann von mehreren Threads gleichzeitig verwendet werden.
+    """
+
+    def __init__(self, path=LOG_FILE, keep=False):
+        """Initialisiert das Protokoll.
+
+        Args:
+            path: JSON-Lines-Datei, an die angehängt wird (None = keine Datei)
+            keep: Einträge zusätzlich für write_prometheus im Speicher behalten
+        """
+        self.path = path
+        self.keep = keep
+        self.records = []
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self.keep:
+                self.records.append(record)
+            if self.path:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(line + '\n')
+                except OSError as e:
+                    sys.stderr.write(f"Protokoll konnte nicht geschrieben werden: {str(e)}\n")
+
+    def write_prometheus(self, path):
+        """Schreibt die behaltenen Einträge als Prometheus-Metriken (Textformat)."""
+        with self._lock:
+            text = prometheus_text(self.records)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class Trace:
+    """
+    Misst Stufen und Zähler eines Vorgangs.
+
+    Verwendung:
+        with Trace('report', log, charger='123456') as trace:
+            ...
+    oder über Threads hinweg mit activate() und finish().
+    """
+
+    def __init__(self, name, log=None, **fields):
+        self.name = name
+        self.log = log
+        self.fields = fields
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.peak_at_start = peak_rss_mb()
+        self.record = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        """Macht den Trace im aktuellen Thread zum Ziel von stage() und count()."""
+        previous = getattr(_local, 'trace', None)
+        _local.trace = self
+        try:
+            yield self
+        finally:
+            _local.trace = previous
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def finish(self, status='ok', error=None):
+        """Schließt den Trace ab und schreibt ihn ins Protokoll (nur beim ersten Aufruf).
+
+        Returns:
+            Der Protokolleintrag (dict)
+        """
+        with self._lock:
+            if self.record is not None:
+                return self.record
+            peak = peak_rss_mb()
+            growth = None
+            if peak is not None and self.peak_at_start is not None:
+                growth = round(max(peak - self.peak_at_start, 0.0), 1)
+            self.record = {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'name': self.name,
+                'status': status,
+                'duration': round(time.perf_counter() - self.started, 4),
+                'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'process_peak_rss_mb': peak,
+                'peak_rss_growth_mb': growth
+            }
+            if error is not None:
+                self.record['error'] = str(error)
+            self.record.update(self.fields)
+        if self.log is not None:
+            self.log.write(self.record)
+        return self.record
+
+    def __enter__(self):
+        self._activation = self.activate()
+        self._activation.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._activation.__exit__(None, None, None)
+        if exc_type is None:
+            self.finish()
+        else:
+            self.finish('failed', exc)
+        return False
+
+
+class _NoTrace:
+    """Platzhalter, wenn im aktuellen Thread kein Trace aktiv ist."""
+
+    @contextmanager
+    def activate(self):
+        yield self
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+    def set(self, **fields):
+        pass
+
+
+_NO_TRACE = _NoTrace()
+
+
+def current():
+    """Liefert den Trace des aktuellen Threads (oder einen Platzhalter)."""
+    return getattr(_local, 'trace', None) or _NO_TRACE
+
+
+def stage(name):
+    """Misst eine Stufe im Trace des aktuellen Threads: with perf_log.stage('parse'): ..."""
+    return current().stage(name)
+
+
+def count(name, value=1):
+    """Erhöht einen Zähler im Trace des aktuellen Threads."""
+    current().count(name, value)
+
+
+def prometheus_text(records):
+    """Fasst Protokolleinträge als Prometheus-Metriken im Textformat zusammen."""
+    totals = {}
+    stage_sum, stage_count, stage_max = {}, {}, {}
+    counter_sum = {}
+    duration_sum, duration_max = 0.0, 0.0
+    peak = None
+
+    for record in records:
+        totals[record['status']] = totals.get(record['status'], 0) + 1
+        duration_sum += record['duration']
+        duration_max = max(duration_max, record['duration'])
+        for name, seconds in record.get('stages', {}).items():
+            stage_sum[name] = stage_sum.get(name, 0.0) + seconds
+            stage_count[name] = stage_count.get(name, 0) + 1
+            stage_max[name] = max(stage_max.get(name, 0.0), seconds)
+        for name, value in record.get('counters', {}).items():
+            counter_sum[name] = counter_sum.get(name, 0) + value
+        if record.get('process_peak_rss_mb') is not None:
+            peak = max(peak or 0.0, record['process_peak_rss_mb'])
+
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_total Erstellte Berichte nach Status",
+        f"# TYPE {p}_total counter"
+    ]
+    lines += [f'{p}_total{{status="{status}"}} {n}' for status, n in sorted(totals.items())]
+    lines += [
+        f"# HELP {p}_duration_seconds Gesamtdauer der Berichte",
+        f"# TYPE {p}_duration_seconds summary",
+        f"{p}_duration_seconds_sum {duration_sum:.4f}",
+        f"{p}_duration_seconds_count {len(records)}",
+        f"# HELP {p}_duration_seconds_max Längste Dauer eines Berichts",
+        f"# TYPE {p}_duration_seconds_max gauge",
+        f"{p}_duration_seconds_max {duration_max:.4f}",
+        f"# HELP {p}_stage_seconds Dauer der einzelnen Stufen",
+        f"# TYPE {p}_stage_seconds summary"
+    ]
+    for name in sorted(stage_sum):
+        lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {stage_sum[name]:.4f}')
+        lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {stage_count[name]}')
+    lines += [
+        f"# HELP {p}_stage_seconds_max Längste Dauer einer Stufe",
+        f"# TYPE {p}_stage_seconds_max gauge"
+    ]
+    lines += [f'{p}_stage_seconds_max{{stage="{name}"}} {stage_max[name]:.4f}' for name in sorted(stage_max)]
+    for name in sorted(counter_sum):
+        lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {counter_sum[name]}"]
+    if peak is not None:
+        lines += [
+            f"# HELP {p}_process_peak_rss_bytes Spitzenwert des Arbeitsspeichers des Prozesses",
+            f"# TYPE {p}_process_peak_rss_bytes gauge",
+            f"{p}_process_peak_rss_bytes {int(peak * 1024 * 1024)}"
+        ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,173 @@
+"""
+Vorababruf der Ladevorgänge im Hintergrund, z.B. jede Nacht.
+
+Exportiert die Ladehistorie aller konfigurierten Wallboxen über den gewohnten
+Ablauf (DLL-URL, Ticket, Status) und übernimmt neue Ladevorgänge in den lokalen
+Speicher. Berichte für abgeschlossene Zeiträume werden danach ohne Export aus
+dem Speicher erstellt.
+
+Die Abrufe werden über ein Zeitfenster verteilt, damit die go-e Cloud nicht
+mit allen Wallboxen gleichzeitig belastet wird. Wallboxen, die in mehreren
+Einträgen vorkommen (z.B. eine gemeinsam genutzte Wallbox im Büro), werden nur
+einmal abgerufen.
+
+Aufruf:
+    python prefetch.py flotte.json --at 02:00 --window 3600
+    python prefetch.py goe_charger_settings.json --once
+
+Als Konfiguration dient ein Flotten-Manifest (siehe batch.py) oder die
+Einstellungsdatei der GUI.
+"""
+
+# Standard Library Imports
+import sys
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+# Local Imports
+import goe_api
+from archive import open_archive
+from batch import load_manifest, EXIT_OK, EXIT_FAILED, EXIT_USAGE
+from session_store import SessionStore
+
+
+DEFAULT_AT = "02:00"
+DEFAULT_WINDOW = 3600
+
+
+def next_run(now, at):
+    """Liefert den nächsten Zeitpunkt zur Uhrzeit at ('HH:MM') nach now."""
+    hours, minutes = (int(part) for part in at.split(':'))
+    run = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    if run <= now:
+        run += timedelta(days=1)
+    return run
+
+
+def stagger(count, window, rng=None):
+    """Verteilt count Abrufe gleichmäßig mit Zufallsanteil über window Sekunden.
+
+    Returns:
+        Aufsteigende Startversätze in Sekunden
+    """
+    if count == 0 or window <= 0:
+        return [0.0] * count
+    rng = rng or random.Random()
+    slot = window / count
+    return [i * slot + rng.uniform(0, slot) for i in range(count)]
+
+
+def unique_chargers(jobs):
+    """Liefert die API-Konfigurationen aller Wallboxen der Jobs, jede Wallbox nur einmal."""
+    chargers = {}
+    for job in jobs:
+        for charger in goe_api.charger_configs(job):
+            chargers.setdefault(goe_api.charger_key(charger), charger)
+    return list(chargers.values())
+
+
+def prefetch_all(jobs, store, window=0, client=None, stop_event=None, timeout=300, stream=sys.stdout):
+    """Ruft die Ladevorgänge aller Wallboxen ab und speichert sie lokal.
+
+    Args:
+        jobs: Job-Konfigurationen mit den Wallboxen (siehe goe_api.charger_configs)
+        store: SessionStore für die lokal gespeicherten Ladevorgänge
+        window: Zeitfenster in Sekunden, über das die Abrufe verteilt werden
+        client: GoeApiClient (Standard: gemeinsamer Client des Prozesses)
+        stop_event: Optionales threading.Event zum vorzeitigen Beenden
+        timeout: Maximale Dauer eines Abrufs in Sekunden
+        stream: Ausgabe für das Protokoll (oder None)
+
+    Returns:
+        Liste mit einem Ergebnis (dict) pro Wallbox
+    """
+    stop_event = stop_event or threading.Event()
+    client = client or goe_api.default_client()
+    chargers = unique_chargers(jobs)
+    started = time.monotonic()
+    results = []
+
+    for offset, charger in zip(stagger(len(chargers), window), chargers):
+        if stop_event.wait(max(0.0, started + offset - time.monotonic())):
+            break
+
+        key = goe_api.charger_key(charger)
+        result = {'charger': key, 'status': 'ok', 'new_sessions': 0, 'error': None}
+        t0 = time.monotonic()
+        try:
+            result['new_sessions'] = goe_api.refresh_sessions(charger, store, deadline=t0 + timeout, client=client)
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        result['duration'] = round(time.monotonic() - t0, 2)
+        results.append(result)
+
+        if stream is not None:
+            detail = f"{result['new_sessions']} neue Ladevorgänge" if result['status'] == 'ok' else result['error']
+            stream.write(f"{datetime.now():%d.%m.%Y %H:%M:%S}  {result['status']:<7} {key}: {detail}\n")
+            stream.flush()
+
+    return results
+
+
+def run_scheduler(jobs, store, at=DEFAULT_AT, window=DEFAULT_WINDOW, client=None, stop_event=None,
+                  timeout=300, stream=sys.stdout):
+    """Führt den Vorababruf jeden Tag zur Uhrzeit at aus, bis stop_event gesetzt wird."""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        run = next_run(datetime.now(), at)
+        if stream is not None:
+            stream.write(f"Nächster Abruf: {run:%d.%m.%Y %H:%M}\n")
+            stream.flush()
+        if stop_event.wait((run - datetime.now()).total_seconds()):
+            break
+        prefetch_all(jobs, store, window, client, stop_event, timeout, stream)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Ladevorgänge der go-e Wallboxen im Hintergrund abrufen")
+    parser.add_argument('config', help="Flotten-Manifest oder Einstellungsdatei (JSON)")
+    parser.add_argument('--at', default=DEFAULT_AT, help="Uhrzeit des täglichen Abrufs (HH:MM)")
+    parser.add_argument('--window', type=float,
+                        help=f"Zeitfenster in Sekunden, über das die Abrufe verteilt werden "
+                             f"(Standard: {DEFAULT_WINDOW}, mit --once 0)")
+    parser.add_argument('--once', action='store_true', help="Einmal sofort abrufen und beenden")
+    parser.add_argument('--timeout', type=float, default=300, help="Zeitlimit pro Wallbox in Sekunden")
+    parser.add_argument('--db', default='goe_charger_sessions.sqlite', help="Lokaler Sitzungsspeicher")
+    parser.add_argument('--archive', help="Neue Ladevorgänge zusätzlich im Parquet-Archiv ablegen (benötigt pyarrow)")
+    parser.add_argument('--cloud-url', default=goe_api.CLOUD_API_URL,
+                        help="URL-Vorlage der Cloud API, z.B. für den Stub in benchmarks/goe_stub_server.py")
+    parser.add_argument('--data-url', default=goe_api.DATA_API_URL, help="Basis-URL der Export-API")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        next_run(datetime.now(), args.at)
+        jobs = load_manifest(args.config)
+        store = SessionStore(args.db, open_archive(args.archive))
+    except (OSError, ValueError, ImportError) as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return EXIT_USAGE
+
+    client = goe_api.GoeApiClient(cloud_url=args.cloud_url, data_url=args.data_url)
+
+    if args.once:
+        results = prefetch_all(jobs, store, args.window or 0, client, timeout=args.timeout)
+        return EXIT_OK if all(r['status'] == 'ok' for r in results) else EXIT_FAILED
+
+    window = DEFAULT_WINDOW if args.window is None else args.window
+    try:
+        run_scheduler(jobs, store, args.at, window, client, timeout=args.timeout)
+    except KeyboardInterrupt:
+        pass
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+"""
+Aufzeichnung der Ladevorgänge über die lokale API der Wallbox, ohne Cloud-Export.
+
+Der Recorder fragt bei jeder Wallbox mit 'local_api_url' in festen Abständen
+den Energiezähler ('eto', Wh) und den Fahrzeugstatus ('car') über
+/api/status ab. Gespeichert wird ein Messwert nur, wenn sich Zähler oder Status
+geändert haben, höchstens aber nach heartbeat Sekunden ohne Änderung. Die
+Messwerte landen zunächst in einem Ringpuffer fester Größe und werden
+blockweise an Monatsdateien angehängt:
+
+    goe_telemetrie/123456/2024-05.bin
+
+Jeder Messwert belegt 13 Byte (Zeitpunkt in ms seit 1970 UTC, Zählerstand in Wh,
+Status); die Monatsdateien sind nach UTC-Monaten geteilt. Der Speicherbedarf pro
+Wallbox bleibt damit auch über Monate konstant. Erst die Ladevorgänge werden in
+Ortszeit umgerechnet, wie im Export – so bleiben die Messwerte auch beim
+Zurückstellen der Uhr am Ende der Sommerzeit aufsteigend sortiert.
+
+Aus den Messwerten werden die Ladevorgänge in einem Durchgang über die Arrays
+rekonstruiert: Ein Ladevorgang beginnt mit dem Anstecken des Fahrzeugs und endet
+mit dem Abstecken, die Energie ist die Differenz des Zählers. Mit --db werden
+sie in den lokalen Sitzungsspeicher übernommen; Berichte entstehen dann ohne
+Export aus den lokalen Daten.
+
+Aufruf:
+    python recorder.py flotte.json --interval 10 --db goe_charger_sessions.sqlite
+    python recorder.py flotte.json --sync --db goe_charger_sessions.sqlite
+"""
+
+# Standard Library Imports
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+# Local Imports
+import goe_api
+from batch import load_manifest, EXIT_OK, EXIT_USAGE
+from session_store import SessionStore
+from sessions import empty_sessions
+
+
+# Zeitpunkt (ms seit 1970, UTC), Zählerstand (Wh), Fahrzeugstatus
+SAMPLE_DTYPE = np.dtype([('time', '<i8'), ('eto', '<u4'), ('car', 'u1')])
+STATUS_FILTER = 'eto,car'
+# Fahrzeugstatus der API v2: 1 bereit, 2 lädt, 3 wartet auf Fahrzeug, 4 Laden beendet, 5 Fehler
+CONNECTED_STATES = (2, 3, 4)
+
+DEFAULT_INTERVAL = 10
+DEFAULT_HEARTBEAT = 900
+DEFAULT_CAPACITY = 4096
+DEFAULT_FLUSH_SAMPLES = 256
+DEFAULT_FLUSH_SECONDS = 300
+
+
+class RingBuffer:
+    """
+    Ringpuffer fester Größe für Messwerte (SAMPLE_DTYPE).
+    Ist er voll, wird der älteste Messwert überschrieben.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.data = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, sample_time, eto, car):
+        capacity = len(self.data)
+        self.data[(self.start + self.size) % capacity] = (sample_time, eto, car)
+        if self.size < capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % capacity
+            self.dropped += 1
+
+    def samples(self):
+        """Liefert alle Messwerte in zeitlicher Reihenfolge (als Kopie), ohne sie zu entnehmen."""
+        return np.roll(self.data, -self.start)[:self.size]
+
+    def drain(self):
+        """Entnimmt alle Messwerte in zeitlicher Reihenfolge (als Kopie)."""
+        samples = self.samples()
+        self.clear()
+        return samples
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+
+def local_times(ms):
+    """Wandelt Zeitpunkte in ms seit 1970 (UTC) in Ortszeit ohne Zeitzone um, wie im Export.
+
+    Returns:
+        numpy-Array (datetime64[ns])
+    """
+    utc = pd.to_datetime(np.asarray(ms, dtype='int64'), unit='ms', utc=True)
+    return utc.tz_convert(tz.tzlocal()).tz_localize(None).as_unit('ns').to_numpy()
+
+
+def epoch_ms(value):
+    """Wandelt einen Zeitpunkt in Ortszeit (datetime ohne Zeitzone) in ms seit 1970 (UTC) um."""
+    return int(round(pd.Timestamp(value).to_pydatetime().timestamp() * 1000))
+
+
+def _charger_dir(root, serial):
+    return os.path.join(root, quote(serial, safe=''))
+
+
+def _month(value):
+    return f"{value:%Y-%m}"
+
+
+def write_samples(root, serial, samples):
+    """Hängt Messwerte an die Monatsdateien einer Wallbox an."""
+    if not len(samples):
+        return
+    directory = _charger_dir(root, serial)
+    os.makedirs(directory, exist_ok=True)
+    months = np.datetime_as_string(samples['time'].astype('datetime64[ms]'), unit='M')
+    for month in np.unique(months):
+        with open(os.path.join(directory, f"{month}.bin"), 'ab') as f:
+            samples[months == month].tofile(f)
+
+
+def recorded_serials(root):
+    """Liefert die Schlüssel aller aufgezeichneten Wallboxen."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(unquote(name) for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+
+
+def recorded_months(root, serial):
+    """Liefert die aufgezeichneten Monate einer Wallbox ('JJJJ-MM', aufsteigend)."""
+    directory = _charger_dir(root, serial)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len('.bin')] for name in os.listdir(directory) if name.endswith('.bin'))
+
+
+def read_samples(root, serial, first_month=None, last_month=None):
+    """Liest die Messwerte einer Wallbox aus den Monatsdateien first_month bis last_month.
+
+    Returns:
+        Messwerte als Array mit SAMPLE_DTYPE
+    """
+    selected = [month for month in recorded_months(root, serial)
+                if (not first_month or month >= first_month) and (not last_month or month <= last_month)]
+    parts = []
+    for month in selected:
+        path = os.path.join(_charger_dir(root, serial), f"{month}.bin")
+        # Ein beim Absturz halb geschriebener letzter Messwert wird ignoriert
+        count = os.path.getsize(path) // SAMPLE_DTYPE.itemsize
+        parts.append(np.fromfile(path, dtype=SAMPLE_DTYPE, count=count))
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=SAMPLE_DTYPE)
+
+
+def rebuild_sessions(samples):
+    """Rekonstruiert die Ladevorgänge aus den Messwerten.
+
+    Ein Ladevorgang reicht vom ersten Messwert mit angestecktem Fahrzeug bis zum
+    ersten Messwert danach ohne Fahrzeug; die Energie ist die Zählerdifferenz vom
+    letzten Messwert vor dem Anstecken bis zum Abstecken. Unvollständige
+    Ladevorgänge – am Anfang bereits, am Ende noch laufend – werden nicht ausgegeben.
+
+    Returns:
+        DataFrame mit den Spalten 'Start', 'Ende' (datetime) und 'Energie [kWh]' (float)
+    """
+    if not len(samples):
+        return empty_sessions()
+    connected = np.isin(samples['car'], CONNECTED_STATES).astype('int8')
+    edges = np.diff(connected, prepend=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    starts = starts[:len(stops)]
+    if len(starts) and starts[0] == 0:
+        starts, stops = starts[1:], stops[1:]
+
+    times = samples['time']
+    eto = samples['eto'].astype('int64')
+    # Ohne Fahrzeug steht der Zähler: Der Messwert vor dem Anstecken zählt auch die ersten Sekunden mit
+    before = starts - 1
+    return pd.DataFrame({
+        'Start': local_times(times[starts]),
+        'Ende': local_times(times[stops]),
+        'Energie [kWh]': np.maximum(eto[stops] - eto[before], 0) / 1000.0
+    })
+
+
+def recorded_sessions(root, serial, start_date=None, end_date=None):
+    """Liefert die aufgezeichneten Ladevorgänge einer Wallbox im angegebenen Zeitraum.
+
+    Wie beim SessionStore zählen nur Ladevorgänge, die im Zeitraum begonnen und
+    geendet haben.
+    """
+    first = _month(start_date.replace(day=1) - timedelta(days=1)) if start_date else None
+    last = _month(end_date.replace(day=28) + timedelta(days=4)) if end_date else None
+    sessions = rebuild_sessions(read_samples(root, serial, first, last))
+    mask = np.ones(len(sessions), dtype=bool)
+    if start_date:
+        mask &= (sessions['Start'] >= pd.Timestamp(start_date)).to_numpy()
+    if end_date:
+        mask &= (sessions['Ende'] < pd.Timestamp(end_date + timedelta(days=1))).to_numpy()
+    return sessions[mask].reset_index(drop=True)
+
+
+def covered_until(samples, since, max_gap):
+    """Liefert den Zeitpunkt, bis zu dem die Aufzeichnung ab since lückenlos ist (oder None).
+
+    Lückenlos heißt: Es gibt einen Messwert spätestens zu since, und danach liegen
+    nie mehr als max_gap Sekunden zwischen zwei Messwerten. since und das
+    Ergebnis sind Ortszeiten wie im Sitzungsspeicher.
+    """
+    times = samples['time']
+    first = np.searchsorted(times, epoch_ms(since), side='right') - 1
+    if first < 0:
+        return None
+    gaps = np.flatnonzero(np.diff(times[first:]) > max_gap * 1000)
+    last = first + gaps[0] if len(gaps) else len(times) - 1
+    return pd.Timestamp(local_times(times[last:last + 1])[0]).to_pydatetime()
+
+
+def gap_free_since(samples, max_gap):
+    """Liefert den ersten Messwert der lückenlosen Aufzeichnung bis zum letzten Messwert (Ortszeit, oder None)."""
+    times = samples['time']
+    if not len(times):
+        return None
+    gaps = np.flatnonzero(np.diff(times) > max_gap * 1000)
+    first = gaps[-1] + 1 if len(gaps) else 0
+    return pd.Timestamp(local_times(times[first:first + 1])[0]).to_pydatetime()
+
+
+def sync_store(root, store, serials=None, max_gap=2 * DEFAULT_HEARTBEAT):
+    """Übernimmt die aufgezeichneten Ladevorgänge in den lokalen Sitzungsspeicher.
+
+    Übernommen wird nur, was lückenlos aufgezeichnet wurde: Schließt die
+    Aufzeichnung an den letzten Export an, gilt der Speicher bis zum Ende der
+    lückenlosen Aufzeichnung als aktuell – Berichte bis dahin brauchen keinen
+    Export. Ladevorgänge nach einer Lücke bleiben nur in der Aufzeichnung; der
+    nächste Export setzt beim neuesten gespeicherten Ladevorgang an und liefert
+    auch die während der Lücke verpassten.
+
+    Wallboxen ohne Export gelten ab dem ersten vollen Tag der lückenlosen
+    Aufzeichnung als abgedeckt (covered_from), Berichte für diesen Zeitraum
+    entstehen dann ganz ohne Cloud.
+
+    Returns:
+        dict Wallbox -> Anzahl der neu gespeicherten Ladevorgänge
+    """
+    added = {}
+    for serial in serials or recorded_serials(root):
+        added[serial] = 0
+        last_fetch = store.last_fetch(serial)
+        last_start = store.last_session_start(serial)
+        known = [value for value in (last_fetch, last_start) if value is not None]
+        first = _month(min(known).replace(day=1) - timedelta(days=1)) if known else None
+        samples = read_samples(root, serial, first)
+        sessions = rebuild_sessions(samples)
+        if last_start is not None:
+            sessions = sessions[sessions['Start'] > last_start]
+
+        covered_from = None
+        if last_fetch is None:
+            since = gap_free_since(samples, max_gap)
+            if since is None:
+                continue
+            covered_from = since.date() + timedelta(days=1)
+            sessions = sessions[sessions['Start'] >= pd.Timestamp(covered_from)]
+        else:
+            since = last_fetch
+
+        complete = covered_until(samples, since, max_gap)
+        if complete is None or complete <= since or (
+                covered_from is not None and complete < datetime.combine(covered_from, datetime.min.time())):
+            continue
+        added[serial] = store.add_sessions(serial, sessions[sessions['Ende'] <= complete], complete, covered_from)
+    return added
+
+
+class TelemetryRecorder:
+    """
+    Zeichnet Zählerstand und Fahrzeugstatus mehrerer Wallboxen über die lokale API auf.
+    Jede Wallbox wird in einem eigenen Thread abgefragt und hat einen eigenen Ringpuffer.
+    """
+
+    def __init__(self, chargers, root="goe_telemetrie", interval=DEFAULT_INTERVAL,
+                 heartbeat=DEFAULT_HEARTBEAT, capacity=DEFAULT_CAPACITY,
+                 flush_samples=DEFAULT_FLUSH_SAMPLES, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 client=None, on_flush=None):
+        """Initialisiert den Recorder.
+
+        Args:
+            chargers: API-Konfigurationen der Wallboxen (mit 'local_api_url')
+            root: Verzeichnis der Aufzeichnung
+            interval: Abstand der Abfragen in Sekunden
+            heartbeat: Spätestens nach so vielen Sekunden wird auch ein unveränderter Messwert gespeichert
+            capacity: Größe des Ringpuffers pro Wallbox (Messwerte)
+            flush_samples: Ab so vielen Messwerten im Puffer wird auf die Platte geschrieben
+            flush_seconds: Spätestens nach so vielen Sekunden wird auf die Platte geschrieben
+            client: GoeApiClient (Standard: gemeinsamer Client des Prozesses)
+            on_flush: Optionale Funktion(serial), die nach jedem Schreiben aufgerufen wird
+        """
+        for charger in chargers:
+            if not (charger.get('local_api_url') or '').strip():
+                raise ValueError(f"Keine lokale API-URL für {goe_api.charger_label(charger)}")
+        self.chargers = chargers
+        self.root = root
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.capacity = capacity
+        self.flush_samples = min(flush_samples, capacity)
+        self.flush_seconds = flush_seconds
+        self.client = client or goe_api.default_client()
+        self.on_flush = on_flush
+        self.stop_event = threading.Event()
+        self.buffers = {}
+        self.errors = {}
+        self._threads = []
+
+    def read_status(self, charger):
+        """Fragt Zählerstand (Wh) und Fahrzeugstatus einer Wallbox ab."""
+        response = self.client.get(f"{charger['local_api_url'].rstrip('/')}/api/status?filter={STATUS_FILTER}",
+                                   retries=0)
+        if response.status_code != 200:
+            raise Exception(f"Lokale API antwortet mit Status {response.status_code}")
+        status = response.json()
+        return int(status['eto']), int(status['car'])
+
+    def record(self, charger):
+        """Fragt eine Wallbox ab, bis stop_event gesetzt wird, und schreibt die Messwerte blockweise."""
+        key = goe_api.charger_key(charger)
+        buffer = self.buffers[key] = RingBuffer(self.capacity)
+        self.errors[key] = 0
+        last = None
+        flushed = time.monotonic()
+
+        def flush():
+            # Erst nach dem Schreiben leeren: schlägt es fehl, bleiben die Messwerte im Ringpuffer
+            write_samples(self.root, key, buffer.samples())
+            buffer.clear()
+            if self.on_flush is not None:
+                self.on_flush(key)
+
+        next_poll = time.monotonic()
+        while not self.stop_event.wait(max(0.0, next_poll - time.monotonic())):
+            next_poll += self.interval
+            sample_time = int(time.time() * 1000)
+            try:
+                eto, car = self.read_status(charger)
+            except Exception:
+                self.errors[key] += 1
+                continue
+
+            if (last is None or (eto, car) != last[1:]
+                    or sample_time - last[0] >= self.heartbeat * 1000):
+                buffer.append(sample_time, eto, car)
+                last = (sample_time, eto, car)
+
+            if len(buffer) >= self.flush_samples or time.monotonic() - flushed >= self.flush_seconds:
+                try:
+                    flush()
+                    flushed = time.monotonic()
+                except OSError:
+                    # Platte nicht beschreibbar: Messwerte bleiben im Ringpuffer
+                    self.errors[key] += 1
+        if len(buffer):
+            try:
+                flush()
+            except OSError as e:
+                self.errors[key] += 1
+                sys.stderr.write(f"{len(buffer)} Messwerte von {key} konnten nicht geschrieben werden: {str(e)}\n")
+
+    def start(self):
+        for charger in self.chargers:
+            thread = threading.Thread(target=self.record, args=(charger,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Beendet die Abfragen und schreibt die gepufferten Messwerte."""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def local_chargers(jobs):
+    """Liefert die Wallboxen der Jobs mit lokaler API, jede Wallbox nur einmal."""
+    chargers = {}
+    for job in jobs:
+        for charger in goe_api.charger_configs(job):
+            if (charger.get('local_api_url') or '').strip():
+                chargers.setdefault(goe_api.charger_key(charger), charger)
+    return list(chargers.values())
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Ladevorgänge über die lokale API der Wallboxen aufzeichnen")
+    parser.add_argument('config', help="Flotten-Manifest oder Einstellungsdatei (JSON)")
+    parser.add_argument('--dir', default='goe_telemetrie', help="Verzeichnis der Aufzeichnung")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Abstand der Abfragen in Sekunden")
+    parser.add_argument('--heartbeat', type=float, default=DEFAULT_HEARTBEAT,
+                        help="Unveränderte Messwerte spätestens nach so vielen Sekunden speichern")
+    parser.add_argument('--flush-seconds', type=float, default=DEFAULT_FLUSH_SECONDS,
+                        help="Messwerte spätestens nach so vielen Sekunden auf die Platte schreiben")
+    parser.add_argument('--db', help="Ladevorgänge nach jedem Schreiben in diesen Sitzungsspeicher übernehmen")
+    parser.add_argument('--sync', action='store_true',
+                        help="Nur die vorhandene Aufzeichnung in den Sitzungsspeicher übernehmen und beenden")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        chargers = local_chargers(load_manifest(args.config))
+        store = SessionStore(args.db) if args.db else None
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return EXIT_USAGE
+    if not chargers:
+        sys.stderr.write("Fehler: Keine Wallbox mit 'local_api_url' konfiguriert\n")
+        return EXIT_USAGE
+    if args.sync and store is None:
+        sys.stderr.write("Fehler: --sync benötigt --db\n")
+        return EXIT_USAGE
+
+    max_gap = 2 * args.heartbeat + args.interval
+    serials = [goe_api.charger_key(charger) for charger in chargers]
+    if args.sync:
+        for serial, added in sync_store(args.dir, store, serials, max_gap).items():
+            print(f"{serial}: {added} neue Ladevorgänge")
+        return EXIT_OK
+
+    sync_lock = threading.Lock()
+
+    def on_flush(serial):
+        with sync_lock:
+            try:
+                sync_store(args.dir, store, [serial], max_gap)
+            except Exception as e:
+                sys.stderr.write(f"Fehler beim Übernehmen von {serial}: {str(e)}\n")
+
+    recorder = TelemetryRecorder(chargers, args.dir, args.interval, args.heartbeat,
+                                 flush_seconds=args.flush_seconds, on_flush=on_flush if store else None)
+    print(f"Zeichne {len(chargers)} Wallbox(en) alle {args.interval:g} s auf (Strg+C beendet)")
+    recorder.start()
+    try:
+        while not recorder.stop_event.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        pass
+    recorder.stop()
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+PDF-Berichterstellung für die Ladevorgänge einer go-e Wallbox.
+
+Der Bericht wird aus den Ladevorgängen und einer einfachen Berichtsbeschreibung
+(dict) erzeugt und ist damit unabhängig von der GUI nutzbar.
+"""
+
+# Standard Library Imports
+import os
+import re
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# Local Imports
+import perf_log
+from chart import get_renderer
+from pdf_table import StreamingPDF, TableWriter
+from report_cache import report_key
+from report_model import build_report_model, build_overview_model, split_periods
+from tariffs import parse_price, tariff_from_spec  # noqa: F401 (parse_price bleibt über report verfügbar)
+
+
+UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue', 'ß': 'ss'})
+
+
+def slugify(text, default='bericht'):
+    """Wandelt einen Namen in einen Bestandteil für Dateinamen um."""
+    return re.sub(r'[^A-Za-z0-9]+', '_', (text or '').translate(UMLAUTS)).strip('_') or default
+
+
+def report_prefix(spec):
+    """Liefert den Namensteil der Berichtsdateien aus Fahrzeug bzw. Mitarbeiter (ohne Zeitraum)."""
+    if spec.get('filename_prefix'):
+        return spec['filename_prefix']
+    name = (spec.get('license_plate') or '').strip() or (spec.get('employee') or '').strip()
+    return f"goe_charger_bericht_{slugify(name)}" if name else 'goe_charger_bericht'
+
+
+def report_filename(spec):
+    """Liefert den festen Dateinamen eines Berichts aus Fahrzeug bzw. Mitarbeiter und Zeitraum."""
+    return f"{report_prefix(spec)}_{spec['start_date']:%Y%m%d}_{spec['end_date']:%Y%m%d}.pdf"
+
+
+class PDF(StreamingPDF):
+    title = 'go-e Charger Ladebericht'
+
+    def header(self):
+        # Seitenwechsel mitten in einer Tabelle: Farben der Kopfzeile nicht übernehmen
+        self.set_text_color(0, 0, 0)
+        self.set_font('Arial', 'B', 15)
+        self.cell(0, 8, self.title, 0, 1, 'C')
+        self.line(10, 20, self.w - 10, 20)
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_text_color(0, 0, 0)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Seite {self.page_no()}', 0, 0, 'C')
+
+    def embed_image(self, info, x, y, w, h):
+        """Fügt ein bereits im Speicher vorliegendes Bild (FPDF-Bildobjekt) ein."""
+        name = f"memory_image_{len(self.images) + 1}"
+        info['i'] = len(self.images) + 1
+        self.images[name] = info
+        self.image(name, x=x, y=y, w=w, h=h)
+
+
+def generate_pdf(sessions, spec):
+    """Erstellt den PDF-Bericht.
+
+    Args:
+        sessions: DataFrame mit den Spalten 'Start', 'Ende' (datetime64) und 'Energie [kWh]'
+        spec: Berichtsbeschreibung mit 'start_date', 'end_date' und 'price' oder
+            'tariff' (siehe tariffs.py) sowie optional 'mode' ('daily' oder
+            'sessions'), 'employee', 'license_plate', 'filename' (Standard:
+            report_filename), 'chart_dpi', 'chart_format' ('raster', 'jpeg'
+            oder 'vector') und 'cache' (ReportCache, unveränderte Berichte
+            werden dann nicht neu erstellt)
+
+    Returns:
+        Dateiname des erstellten Berichts
+    """
+    with perf_log.stage('model'):
+        model = build_report_model(sessions, tariff_from_spec(spec), spec.get('mode', 'daily'))
+    return render_pdf(model, spec)
+
+
+def render_pdf(model, spec):
+    """Schreibt ein fertiges Berichtsmodell (siehe report_model) als PDF.
+
+    Args:
+        model: Berichtsmodell
+        spec: Berichtsbeschreibung wie bei generate_pdf, optional mit 'heading'
+            (Beschriftung des Zeitraums)
+
+    Returns:
+        Dateiname des erstellten Berichts
+    """
+    filename = spec.get('filename') or report_filename(spec)
+    cache = spec.get('cache')
+    if cache is not None:
+        key = report_key(model, spec)
+        if cache.fetch(key, filename):
+            perf_log.count('cache_hits')
+            return filename
+        perf_log.count('cache_misses')
+
+    pdf = PDF(filename)
+    try:
+        _write_report(pdf, model, spec)
+        with perf_log.stage('pdf_output'):
+            pdf.output()
+    except BaseException:
+        pdf.discard()
+        raise
+    if cache is not None:
+        cache.store(key, filename)
+    perf_log.count('reports')
+    perf_log.count('table_rows', len(model['rows']))
+    return filename
+
+
+def _write_report(pdf, model, spec):
+    """Setzt Kopf, Diagramm, Tabelle und Zusammenfassung des Berichts."""
+    employee = (spec.get('employee') or '').strip()
+    license_plate = (spec.get('license_plate') or '').strip()
+
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # Zeitraum
+    pdf.set_font("Arial", 'B', 11)
+    pdf.set_fill_color(240, 240, 240)
+    zeitraum_text = f"{spec.get('heading', 'Zeitraum')}: {spec['start_date'].strftime('%d.%m.%Y')} - {spec['end_date'].strftime('%d.%m.%Y')}"
+    pdf.cell(0, 8, zeitraum_text, 0, 1, 'L', fill=True)
+
+    # Mitarbeiter und Kennzeichen in einer Zeile
+    if employee or license_plate:
+        pdf.set_font("Arial", 'B', 11)
+        pdf.set_fill_color(240, 240, 240)
+
+        if employee and license_plate:
+            mitarbeiter_width = 130
+            kennzeichen_width = 60
+        else:
+            mitarbeiter_width = 190
+            kennzeichen_width = 190
+
+        if employee:
+            pdf.cell(mitarbeiter_width, 8, f"Mitarbeiter: {employee}", 0, 0, 'L', fill=True)
+
+        if license_plate:
+            pdf.cell(kennzeichen_width, 8, f"KFZ: {license_plate}", 0, 1, 'L', fill=True)
+        else:
+            pdf.ln()
+
+    pdf.ln(2)
+
+    # Verbrauchsdiagramm im Speicher rendern und einfügen
+    renderer = get_renderer(spec.get('chart_dpi', 300), spec.get('chart_format', 'raster'))
+    chart_y = pdf.get_y()
+    with perf_log.stage('chart'):
+        chart_height = renderer.draw(pdf, model['dates'], model['energy_kwh'], x=10, y=chart_y, w=190)
+    pdf.set_xy(10, chart_y + chart_height + 4)
+
+    # Tabelle seitenweise mit Kopf, Zwischensumme und Übertrag
+    x_offset = 10  # Linker Rand
+    TableWriter(pdf, model['columns'], x=x_offset).write(model['rows'])
+
+    # Zusammenfassung
+    pdf.ln(2)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(52, 73, 94)
+    pdf.set_text_color(255, 255, 255)
+
+    page_width = pdf.w - 20  # Seitenbreite minus Ränder
+    summary_label_width = page_width * 0.7
+    summary_value_width = page_width * 0.3
+
+    for label, value in model['summary']:
+        pdf.set_x(x_offset)
+        pdf.cell(summary_label_width, 7, label, 1, 0, 'L', fill=True)
+        pdf.cell(summary_value_width, 7, value, 1, 1, 'R', fill=True)
+
+    # Erstellungsdatum
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(2)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.cell(0, 5, f"Erstellt am: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", 0, 1, 'R')
+
+
+def generate_period_reports(sessions, spec, period='month', output_dir='.', overview=True, progress_callback=None):
+    """Erstellt aus einem Abruf je einen Bericht pro Zeitraum und optional eine Übersicht.
+
+    Die Ladevorgänge werden einmal auf die Zeiträume aufgeteilt; es ist kein
+    weiterer Export nötig.
+
+    Args:
+        sessions: Ladevorgänge des gesamten Zeitraums
+        spec: Berichtsbeschreibung wie bei generate_pdf; 'start_date' und 'end_date'
+            umfassen alle Zeiträume, optional 'filename_prefix' für die Dateinamen
+            (Standard: wie bei report_filename aus Fahrzeug bzw. Mitarbeiter)
+        period: 'month', 'quarter' oder 'year'
+        output_dir: Zielverzeichnis der Berichte
+        overview: Zusätzlich eine Übersicht mit einer Zeile pro Zeitraum erstellen
+        progress_callback: Optionale Funktion, die vor jedem Bericht (erstellt, gesamt) erhält
+
+    Returns:
+        Liste der Dateinamen, die Übersicht zuletzt
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = report_prefix(spec)
+    tariff = tariff_from_spec(spec)
+    mode = spec.get('mode', 'daily')
+
+    parts = split_periods(sessions, spec['start_date'], spec['end_date'], period)
+    total = len(parts) + (1 if overview else 0)
+    filenames = []
+    for start_date, end_date, part in parts:
+        if progress_callback:
+            progress_callback(len(filenames), total)
+        period_spec = dict(spec, start_date=start_date, end_date=end_date,
+                           filename=os.path.join(output_dir, f"{prefix}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.pdf"))
+        with perf_log.stage('model'):
+            model = build_report_model(part, tariff, mode)
+        filenames.append(render_pdf(model, period_spec))
+
+    if overview:
+        if progress_callback:
+            progress_callback(len(filenames), total)
+        with perf_log.stage('model'):
+            model = build_overview_model(sessions, tariff, spec['start_date'], spec['end_date'], period, mode)
+        overview_spec = dict(spec, heading='Übersicht', filename=os.path.join(
+            output_dir, f"{prefix}_uebersicht_{spec['start_date']:%Y%m%d}_{spec['end_date']:%Y%m%d}.pdf"))
+        filenames.append(render_pdf(model, overview_spec))
+
+    return filenames
+
+
+def render_report(sessions, spec, period=None, output_dir='.', overview=False, progress_callback=None):
+    """Erstellt einen Bericht oder mit period je einen Bericht pro Zeitraum.
+
+    Reine Funktion ohne GUI-Zustand, damit sie auch in einem Worker-Prozess läuft.
+    progress_callback wird wie bei generate_period_reports vor jedem Bericht
+    aufgerufen und kann die Erstellung durch eine Ausnahme abbrechen.
+
+    Returns:
+        Dateiname bzw. Liste der Dateinamen
+    """
+    if period:
+        return generate_period_reports(sessions, spec, period, output_dir, overview, progress_callback)
+    if progress_callback:
+        progress_callback(0, 1)
+    return generate_pdf(sessions, spec)
+
+
+def render_pool(processes=None):
+    """Erstellt einen Prozess-Pool für die Berichterstellung.
+
+    Die Worker werden neu gestartet (spawn) statt geforkt, da der aufrufende
+    Prozess bereits Threads und offene Verbindungen haben kann.
+    """
+    return ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def render_reports(tasks, processes=None):
+    """Erstellt viele Berichte parallel auf allen Prozessorkernen.
+
+    Args:
+        tasks: Liste von (Ladevorgänge, Berichtsbeschreibung); ohne 'filename'
+            gilt der feste Name aus report_filename
+        processes: Anzahl der Worker-Prozesse (Standard: Anzahl der Kerne)
+
+    Returns:
+        Liste der Dateinamen in der Reihenfolge der Aufgaben
+    """
+    with render_pool(processes) as pool:
+        futures = [pool.submit(generate_pdf, sessions, spec) for sessions, spec in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,144 @@
+"""
+Zwischenspeicher für fertige PDF-Berichte, adressiert über ihren Inhalt.
+
+Der Schlüssel eines Berichts ist ein Hash über das Berichtsmodell (Tabellenzeilen,
+Diagrammdaten, Zusammenfassung) und die Angaben, die sonst noch im PDF
+erscheinen (Zeitraum, Überschrift, Mitarbeiter, Kennzeichen, Diagrammformat).
+Ändern sich Ladevorgänge, Preis, Tarif oder Einstellungen, ändert sich der
+Schlüssel, und der Bericht wird neu erstellt. Bei gleichem Schlüssel wird das
+zuvor erstellte PDF – einschließlich seines Erstellungsdatums – nur kopiert.
+
+Alte Einträge werden nach Alter und, zuletzt benutzte zuletzt, nach
+Gesamtgröße entfernt.
+"""
+
+# Standard Library Imports
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+
+
+# Bei Änderungen am Layout des PDFs erhöhen, damit alte Einträge nicht mehr passen
+CACHE_VERSION = 2
+
+DEFAULT_DIR = "goe_report_cache"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE = 180 * 86400
+
+# Angaben der Berichtsbeschreibung, die außer dem Modell im PDF erscheinen
+SPEC_FIELDS = ('heading', 'start_date', 'end_date', 'employee', 'license_plate', 'chart_dpi', 'chart_format')
+
+
+def report_key(model, spec):
+    """Berechnet den Schlüssel eines Berichts aus Berichtsmodell und Berichtsbeschreibung.
+
+    Returns:
+        Hex-String (SHA-256)
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((CACHE_VERSION, model['columns'], model['summary'])).encode('utf-8'))
+    digest.update(repr([str(spec.get(field, '')).strip() for field in SPEC_FIELDS]).encode('utf-8'))
+    # Tabellenzeilen über ihre Spalten, ohne sie zu formatieren
+    model['rows'].update_digest(digest)
+    digest.update(model['dates'].astype('datetime64[ns]').tobytes())
+    digest.update(model['energy_kwh'].astype('float64').tobytes())
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """
+    Verzeichnis mit fertigen PDFs, benannt nach ihrem Schlüssel.
+    Enthält nur Einstellungen und lässt sich daher an Worker-Prozesse übergeben.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        """Initialisiert den Zwischenspeicher.
+
+        Args:
+            directory: Verzeichnis der Einträge (wird beim ersten Speichern angelegt)
+            max_bytes: Höchstgröße aller Einträge zusammen in Byte
+            max_age: Einträge, die so viele Sekunden nicht benutzt wurden, werden entfernt
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def fetch(self, key, filename):
+        """Kopiert den Bericht zum Schlüssel nach filename.
+
+        Returns:
+            True, wenn der Bericht vorhanden war
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, filename)
+            # Zuletzt benutzt: wird bei der Größenbegrenzung zuletzt entfernt
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, filename):
+        """Übernimmt einen neu erstellten Bericht und entfernt danach alte Einträge."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Erst vollständig kopieren, dann ersetzen: parallele Leser sehen nie eine halbe Datei
+        # Eigener Name je Aufruf, da auch Threads desselben Prozesses gleichzeitig speichern
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(filename, temp)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        self.evict()
+
+    def entries(self):
+        """Liefert die Einträge als Liste von (zuletzt benutzt, Größe, Pfad), älteste zuerst."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self):
+        """Entfernt zu alte Einträge und danach die am längsten unbenutzten, bis max_bytes eingehalten ist.
+
+        Returns:
+            Anzahl der entfernten Einträge
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for used, size, path in entries:
+            if used >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self):
+        """Entfernt alle Einträge."""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
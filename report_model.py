@@ -0,0 +1,296 @@
+"""
+Berichtsmodell: bereitet die Ladevorgänge für den PDF-Bericht auf.
+
+Kosten, Summen und Formatierung werden spaltenweise berechnet. Energie und
+Kosten werden dazu in ganzzahlige Einheiten (Wh, Cent) umgerechnet, damit die
+Summen exakt den angezeigten Zeilen entsprechen.
+"""
+
+# Standard Library Imports
+from decimal import Decimal, ROUND_HALF_UP
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+
+REPORT_MODES = ('daily', 'sessions')
+
+# Tabellenspalten je Berichtsart: (Überschrift, Anteil an der Seitenbreite)
+TABLE_COLUMNS = {
+    'daily': [("Datum", 0.4), ("kWh", 0.3), ("EUR", 0.3)],
+    'sessions': [("Start", 0.3), ("Ende", 0.3), ("kWh", 0.2), ("EUR", 0.2)]
+}
+
+
+def energy_wh(energy_kwh):
+    """Rundet Energiewerte in kWh auf ganze Wh (int64)."""
+    return np.round(np.asarray(energy_kwh, dtype='float64') * 1000).astype('int64')
+
+
+def to_cents(cost_units):
+    """Rundet Kosten in 1/10^7 EUR kaufmännisch auf ganze Cent."""
+    return np.floor((np.asarray(cost_units, dtype='float64') + 50000) / 100000).astype('int64')
+
+
+def format_amounts(hundredths):
+    """Formatiert Werte in Hundertstel (Cent, 10 Wh) mit zwei Nachkommastellen."""
+    return np.char.mod('%.2f', np.asarray(hundredths, dtype='int64') / 100)
+
+
+def format_kwh(wh):
+    """Formatiert eine Energiemenge in Wh als kWh mit zwei Nachkommastellen."""
+    return f"{Decimal(int(wh)).scaleb(-3).quantize(Decimal('0.01'), ROUND_HALF_UP):.2f}"
+
+
+def to_decimal(hundredths):
+    """Wandelt einen ganzzahligen Wert in Hundertstel in eine Decimal um."""
+    return Decimal(int(hundredths)).scaleb(-2)
+
+
+class TableRows:
+    """
+    Tabellenzeilen eines Berichts.
+    Gehalten werden nur die Spalten als Arrays; formatiert wird erst beim Schreiben
+    und blockweise, damit auch Berichte mit Millionen Zeilen kaum Speicher belegen.
+    """
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, labels, wh, cents, label_format=None):
+        """Initialisiert die Zeilen.
+
+        Args:
+            labels: Beschriftungsspalten (datetime64-Arrays oder Arrays mit Texten)
+            wh: Energie je Zeile in Wh (int64)
+            cents: Kosten je Zeile in Cent (int64)
+            label_format: strftime-Format der datetime64-Beschriftungen (None = bereits Texte)
+        """
+        self.labels = [np.asarray(values) for values in labels]
+        self.wh = np.asarray(wh, dtype='int64')
+        self.cents = np.asarray(cents, dtype='int64')
+        self.label_format = label_format
+        # Stand der fortlaufenden Zwischensumme: (Zeilen, 10 Wh, Cent)
+        self._running = (0, 0, 0)
+        self._chunk = (None, [])
+
+    def __len__(self):
+        return len(self.wh)
+
+    def __iter__(self):
+        for start in range(0, len(self), self.BLOCK_SIZE):
+            yield from self.block(start, start + self.BLOCK_SIZE)
+
+    @property
+    def label_columns(self):
+        return len(self.labels)
+
+    def _format_labels(self, values):
+        if self.label_format is None:
+            return values.tolist()
+        return pd.DatetimeIndex(values).strftime(self.label_format).tolist()
+
+    def _format_chunk(self, start):
+        # Zuletzt formatierter Abschnitt; Seiten sind kleiner als BLOCK_SIZE
+        if self._chunk[0] != start:
+            stop = start + self.BLOCK_SIZE
+            columns = [self._format_labels(values[start:stop]) for values in self.labels]
+            columns.append(format_amounts((self.wh[start:stop] + 5) // 10).tolist())
+            columns.append(format_amounts(self.cents[start:stop]).tolist())
+            self._chunk = (start, list(zip(*columns)))
+        return self._chunk[1]
+
+    def block(self, start, stop):
+        """Liefert die Zeilen start bis ausschließlich stop als Tupel formatierter Werte.
+
+        Formatiert wird in Abschnitten von BLOCK_SIZE Zeilen, von denen nur der
+        zuletzt benutzte gehalten wird.
+        """
+        stop = min(stop, len(self))
+        rows = []
+        while start < stop:
+            chunk_start = start - start % self.BLOCK_SIZE
+            chunk = self._format_chunk(chunk_start)
+            end = min(stop, chunk_start + self.BLOCK_SIZE)
+            rows.extend(chunk[start - chunk_start:end - chunk_start])
+            start = end
+        return rows
+
+    def subtotal(self, stop):
+        """Liefert kWh und EUR der ersten stop Zeilen, summiert aus den angezeigten Werten.
+
+        Aufeinanderfolgende Aufrufe mit wachsendem stop setzen die Summe fort, statt
+        sie jedes Mal über alle vorherigen Zeilen zu bilden.
+        """
+        done, kwh, cents = self._running
+        if stop < done:
+            done, kwh, cents = 0, 0, 0
+        kwh += int(((self.wh[done:stop] + 5) // 10).sum())
+        cents += int(self.cents[done:stop].sum())
+        self._running = (stop, kwh, cents)
+        return tuple(format_amounts([kwh, cents]).tolist())
+
+    def update_digest(self, digest):
+        """Ergänzt einen hashlib-Hash um den Inhalt der Zeilen (siehe report_cache)."""
+        digest.update(repr((self.label_format, len(self))).encode('utf-8'))
+        for values in self.labels:
+            if values.dtype.kind == 'M':
+                digest.update(values.astype('datetime64[ns]').tobytes())
+            else:
+                digest.update('\x1f'.join(map(str, values.tolist())).encode('utf-8'))
+        digest.update(self.wh.tobytes())
+        digest.update(self.cents.tobytes())
+
+
+# Zeiträume für Mehrmonats- und Jahresberichte: (pandas-Frequenz, Beschriftung)
+PERIODS = {
+    'month': ('M', '%m.%Y'),
+    'quarter': ('Q', 'Q%q %Y'),
+    'year': ('Y', '%Y')
+}
+
+
+def split_periods(sessions, start_date, end_date, period='month'):
+    """Teilt die Ladevorgänge in einem Durchlauf auf die Zeiträume auf.
+
+    Args:
+        sessions: DataFrame mit den Ladevorgängen
+        start_date: Erster Tag (date)
+        end_date: Letzter Tag (date, inklusive)
+        period: 'month', 'quarter' oder 'year'
+
+    Returns:
+        Liste von (Beginn, Ende, Ladevorgänge) je Zeitraum, auch für Zeiträume
+        ohne Ladevorgänge; Beginn und Ende sind auf [start_date, end_date] begrenzt
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unbekannter Zeitraum: {period}")
+    freq = PERIODS[period][0]
+
+    groups = dict(tuple(sessions.groupby(sessions['Start'].dt.to_period(freq), sort=False)))
+    result = []
+    for p in pd.period_range(start_date, end_date, freq=freq):
+        part = groups.get(p, sessions.iloc[0:0])
+        result.append((max(p.start_time.date(), start_date), min(p.end_time.date(), end_date), part))
+    return result
+
+
+def _line_items(sessions, tariff, mode):
+    """Berechnet Energie und Kosten je Tabellenzeile der Berichtsart."""
+    if mode not in REPORT_MODES:
+        raise ValueError(f"Unbekannte Berichtsart: {mode}")
+
+    sessions = sessions.sort_values('Start')
+    wh = energy_wh(sessions['Energie [kWh]'])
+    cost_units, ht_wh = tariff.split(sessions['Start'], sessions['Ende'], wh)
+
+    # Tageswerte für Diagramm und Tagestabelle
+    day = sessions['Start'].dt.normalize()
+    daily = pd.DataFrame({'Datum': day.to_numpy(), 'wh': wh, 'cost': cost_units})
+    daily = daily.groupby('Datum', sort=True).sum()
+
+    if mode == 'daily':
+        keys, row_wh, cents = daily.index, daily['wh'].to_numpy(), to_cents(daily['cost'])
+    else:
+        keys, row_wh, cents = pd.DatetimeIndex(sessions['Start']), wh, to_cents(cost_units)
+    return {'sessions': sessions, 'wh': wh, 'ht_wh': ht_wh, 'daily': daily,
+            'keys': keys, 'row_wh': row_wh, 'cents': cents}
+
+
+def _rounded_wh(wh):
+    """Rundet Energiemengen in Wh auf die angezeigten 10 Wh (kaufmännisch)."""
+    return (np.asarray(wh, dtype='int64') + 5) // 10 * 10
+
+
+def _summary(items, tariff, cents):
+    """Erstellt die Summen und die Zeilen der Zusammenfassung.
+
+    Energie und Kosten werden aus den angezeigten Tabellenzeilen summiert, damit
+    Zwischensummen und Gesamtsumme übereinstimmen.
+    """
+    total_wh = int(_rounded_wh(items['row_wh']).sum())
+    total_energy = Decimal(total_wh).scaleb(-3).quantize(Decimal('0.01'))
+    total_cost = to_decimal(cents.sum())
+
+    summary = [("Gesamtenergie:", f"{total_energy:.2f} kWh")]
+    if tariff.has_nt:
+        ht_total = int(np.round(items['ht_wh'].sum()))
+        summary.append(("davon HT / NT:", f"{format_kwh(ht_total)} / {format_kwh(total_wh - ht_total)} kWh"))
+    if tariff.is_flat:
+        price = Decimal(int(tariff.ht_prices[0])).scaleb(-4)
+        summary.append(("Strompreis pro kWh:", f"{price.quantize(Decimal('0.01'), ROUND_HALF_UP):.2f} EUR"))
+    elif total_wh:
+        average = (total_cost / total_energy) if total_energy else Decimal(0)
+        summary.append(("Durchschnittspreis pro kWh:", f"{average.quantize(Decimal('0.0001'), ROUND_HALF_UP):.4f} EUR"))
+    summary.append(("Gesamtkosten:", f"{total_cost:.2f} EUR"))
+    return total_energy, total_cost, summary
+
+
+def build_report_model(sessions, tariff, mode='daily'):
+    """Erstellt das Berichtsmodell aus den Ladevorgängen.
+
+    Args:
+        sessions: DataFrame mit den Spalten 'Start', 'Ende' (datetime64) und 'Energie [kWh]'
+        tariff: Tarif für die Kostenberechnung
+        mode: 'daily' (eine Zeile pro Tag) oder 'sessions' (eine Zeile pro Ladevorgang)
+
+    Returns:
+        dict mit den Tabellenspalten ('columns'), den Tabellenzeilen ('rows',
+        TableRows), den Diagrammdaten ('dates', 'energy_kwh'), den Summen als
+        Decimal und den Zeilen der Zusammenfassung ('summary')
+    """
+    items = _line_items(sessions, tariff, mode)
+    daily, cents = items['daily'], items['cents']
+
+    if mode == 'daily':
+        rows = TableRows([daily.index.to_numpy()], items['row_wh'], cents, '%d.%m.%Y')
+    else:
+        sessions = items['sessions']
+        rows = TableRows([sessions['Start'].to_numpy(), sessions['Ende'].to_numpy()],
+                         items['row_wh'], cents, '%d.%m.%Y %H:%M')
+
+    # Summen aus den angezeigten kWh und Cent der Zeilen
+    total_energy, total_cost, summary = _summary(items, tariff, cents)
+
+    return {
+        'columns': TABLE_COLUMNS[mode],
+        'rows': rows,
+        'dates': daily.index.to_numpy(),
+        'energy_kwh': daily['wh'].to_numpy() / 1000,
+        'total_energy': total_energy,
+        'total_cost': total_cost,
+        'summary': summary
+    }
+
+
+def build_overview_model(sessions, tariff, start_date, end_date, period='month', mode='daily'):
+    """Erstellt das Modell der Übersicht mit einer Zeile pro Zeitraum.
+
+    Energie und Kosten je Zeitraum sind die Summe der gerundeten Zeilen der
+    Einzelberichte in der Berichtsart mode und stimmen damit mit deren Summen überein.
+
+    Returns:
+        dict wie build_report_model
+    """
+    freq, label = PERIODS[period]
+    items = _line_items(sessions, tariff, mode)
+    daily = items['daily']
+
+    per_row = pd.DataFrame({'wh': _rounded_wh(items['row_wh']), 'cents': items['cents']},
+                           index=items['keys'].to_period(freq))
+    per_period = per_row.groupby(level=0).sum()
+    per_period = per_period.reindex(pd.period_range(start_date, end_date, freq=freq), fill_value=0)
+
+    rows = TableRows([np.array(per_period.index.strftime(label).tolist(), dtype=object)],
+                     per_period['wh'].to_numpy(), per_period['cents'].to_numpy())
+    total_energy, total_cost, summary = _summary(items, tariff, items['cents'])
+
+    return {
+        'columns': [("Zeitraum", 0.4), ("kWh", 0.3), ("EUR", 0.3)],
+        'rows': rows,
+        'dates': daily.index.to_numpy(),
+        'energy_kwh': daily['wh'].to_numpy() / 1000,
+        'total_energy': total_energy,
+        'total_cost': total_cost,
+        'summary': summary
+    }
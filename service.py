@@ -0,0 +1,446 @@
+"""
+Berichtsdienst: erstellt Berichte über eine HTTP-Schnittstelle für mehrere Benutzer.
+
+Statt dass jeder Sachbearbeiter die Wallboxen mit der GUI selbst abruft, nimmt
+der Dienst Berichtsaufträge entgegen und verarbeitet sie im Hintergrund:
+
+    POST /reports                  {"serial": "123456", "start_date": "2024-05-01", "end_date": "2024-05-31"}
+                                   oder {"serial": "123456", "month": "2024-05"}
+                                   -> 202 {"id": "...", "status": "queued", ...}
+    GET  /reports/<id>             Status des Auftrags (queued, fetching, rendering, done, failed)
+    GET  /reports/<id>/files/<n>   erstellter Bericht (PDF)
+    GET  /reports                  alle Aufträge
+    GET  /health                   Zustand des Dienstes
+
+Optionale Angaben eines Auftrags: "employee", "license_plate", "report_mode"
+("daily" oder "sessions"), "split_by" ("month", "quarter", "year") und "overview".
+Zugangsdaten, Preise und Tarife stammen aus dem Flotten-Manifest (siehe batch.py).
+
+Alle Aufträge teilen sich den lokalen Sitzungsspeicher. Wird dieselbe Wallbox
+von mehreren Aufträgen gleichzeitig benötigt, wird sie nur einmal exportiert;
+ein Export, der jünger als --max-age ist, wird ohne neuen Export verwendet.
+Gleiche Aufträge erhalten dieselbe Auftragsnummer. Die PDFs werden in einem
+begrenzten Pool von Worker-Prozessen erstellt.
+
+Die HTTP-Anfragen selbst warten nie auf einen Export: Aufträge werden sofort
+angenommen und von Worker-Threads abgearbeitet.
+
+Aufruf:
+    python service.py flotte.json --port 8600 --output-dir berichte_dienst
+    python service.py stub_flotte.json --cloud-url "http://127.0.0.1:8080/cloud/{serial}" \\
+        --data-url http://127.0.0.1:8080/api/v1
+"""
+
+# Standard Library Imports
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local Imports
+import goe_api
+import perf_log
+import report
+from archive import open_archive
+from report_cache import ReportCache
+from batch import load_manifest, month_range
+from report_model import REPORT_MODES, PERIODS
+from session_store import SessionStore
+
+
+DEFAULT_PORT = 8600
+DEFAULT_MAX_AGE = 300
+JOB_RETENTION = 24 * 3600
+MAX_BODY = 64 * 1024
+
+
+class ReportService:
+    """
+    Nimmt Berichtsaufträge an und verarbeitet sie mit begrenzten Pools für
+    Aufträge, Exporte und PDF-Erstellung. Kann von mehreren Threads gleichzeitig
+    verwendet werden.
+    """
+
+    def __init__(self, jobs, store, output_dir='berichte_dienst', workers=8, export_workers=4,
+                 render_processes=0, client=None, max_age=DEFAULT_MAX_AGE, timeout=300, render_options=None,
+                 log=None):
+        """Initialisiert den Dienst.
+
+        Args:
+            jobs: Job-Konfigurationen aus dem Manifest
+            store: SessionStore, den alle Aufträge gemeinsam nutzen
+            output_dir: Verzeichnis für die erstellten Berichte (ein Unterverzeichnis pro Auftrag)
+            workers: Anzahl gleichzeitig bearbeiteter Aufträge
+            export_workers: Anzahl gleichzeitiger Exporte
+            render_processes: Anzahl der Prozesse für die PDF-Erstellung; 0 erstellt
+                die Berichte in den Auftrags-Threads
+            client: GoeApiClient für alle Exporte
+            max_age: Exporte, die höchstens so viele Sekunden alt sind, werden wiederverwendet
+            timeout: Maximale Dauer eines Exports in Sekunden
+            render_options: Zusätzliche Angaben für den Bericht, z.B. 'chart_format'
+            log: PerfLog für die Laufzeitmessung der Aufträge
+        """
+        self.entries = {}
+        for job in jobs:
+            for charger in goe_api.charger_configs(job):
+                self.entries.setdefault(goe_api.charger_key(charger), job)
+        self.store = store
+        self.output_dir = output_dir
+        self.client = client or goe_api.GoeApiClient(pool_size=max(10, export_workers))
+        self.max_age = max_age
+        self.timeout = timeout
+        self.render_options = render_options or {}
+        self.log = log
+
+        self.jobs = {}
+        self._by_request = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._job_pool = ThreadPoolExecutor(max_workers=workers)
+        self._export_pool = ThreadPoolExecutor(max_workers=export_workers)
+        self._render_pool = report.render_pool(render_processes) if render_processes else None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def close(self):
+        self._job_pool.shutdown(wait=False, cancel_futures=True)
+        self._export_pool.shutdown(wait=False, cancel_futures=True)
+        if self._render_pool is not None:
+            self._render_pool.shutdown(cancel_futures=True)
+
+    def submit(self, request):
+        """Nimmt einen Auftrag an.
+
+        Args:
+            request: dict mit 'serial' und 'start_date'/'end_date' (JJJJ-MM-TT) oder 'month' (JJJJ-MM)
+
+        Returns:
+            (Auftrag als dict, True wenn ein gleicher Auftrag wiederverwendet wurde)
+
+        Raises:
+            ValueError: bei ungültigen Angaben
+            KeyError: wenn die Wallbox nicht im Manifest steht
+        """
+        serial = str(request.get('serial') or '').strip()
+        if not serial:
+            raise ValueError("'serial' fehlt")
+        if serial not in self.entries:
+            raise KeyError(f"Unbekannte Wallbox: {serial}")
+        entry = self.entries[serial]
+
+        if request.get('month'):
+            try:
+                start_date, end_date = month_range(str(request['month']))
+            except ValueError:
+                raise ValueError(f"Ungültiger Monat: {request['month']} (JJJJ-MM)")
+        elif request.get('start_date') and request.get('end_date'):
+            try:
+                start_date = date.fromisoformat(str(request['start_date']))
+                end_date = date.fromisoformat(str(request['end_date']))
+            except ValueError:
+                raise ValueError("Ungültiges Datum (JJJJ-MM-TT)")
+        else:
+            raise ValueError("'start_date' und 'end_date' oder 'month' erforderlich")
+        if start_date > end_date:
+            raise ValueError("Das Startdatum muss vor dem Enddatum liegen!")
+
+        mode = request.get('report_mode') or entry.get('report_mode', 'daily')
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unbekannte Berichtsart: {mode}")
+        period = request.get('split_by') or None
+        if period is not None and period not in PERIODS:
+            raise ValueError(f"Unbekannter Zeitraum: {period}")
+
+        spec = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'price': entry['price'],
+            'tariff': entry.get('tariff'),
+            'mode': mode,
+            'employee': request.get('employee') or entry.get('employee', ''),
+            'license_plate': request.get('license_plate') or entry.get('license_plate', '')
+        }
+        spec.update(self.render_options)
+        overview = bool(request.get('overview')) and period is not None
+        key = (serial, start_date, end_date, mode, period, overview, spec['employee'], spec['license_plate'])
+
+        with self._lock:
+            self._expire()
+            job = self.jobs.get(self._by_request.get(key))
+            # Gleicher Auftrag: laufend oder für einen abgeschlossenen Zeitraum fertig
+            if job is not None and (job['status'] not in ('done', 'failed') or
+                                    (job['status'] == 'done' and job['complete'])):
+                return self._public(job), True
+
+            job = {
+                'id': uuid.uuid4().hex[:16], 'status': 'queued', 'serial': serial, 'entry': entry,
+                'spec': spec, 'period': period, 'overview': overview, 'files': [], 'error': None,
+                'complete': False, 'created': time.time(), 'finished': None
+            }
+            self.jobs[job['id']] = job
+            self._by_request[key] = job['id']
+        self._job_pool.submit(self._run, job)
+        return self._public(job), False
+
+    def get(self, job_id):
+        """Liefert einen Auftrag (dict) oder None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def list_jobs(self):
+        with self._lock:
+            return [self._public(job) for job in self.jobs.values()]
+
+    def file(self, job_id, index):
+        """Liefert den Pfad des index-ten Berichts eines fertigen Auftrags oder None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] != 'done' or not 0 <= index < len(job['files']):
+                return None
+            return job['files'][index]
+
+    def health(self):
+        with self._lock:
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job['status']] = statuses.get(job['status'], 0) + 1
+            return {'status': 'ok', 'jobs': statuses, 'exports_in_flight': sorted(self._inflight),
+                    'chargers': len(self.entries)}
+
+    def _public(self, job):
+        spec = job['spec']
+        finished = job['finished']
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'serial': job['serial'],
+            'start_date': spec['start_date'].isoformat(),
+            'end_date': spec['end_date'].isoformat(),
+            'report_mode': spec['mode'],
+            'split_by': job['period'],
+            'employee': spec['employee'],
+            'license_plate': spec['license_plate'],
+            'created': datetime.fromtimestamp(job['created']).isoformat(timespec='seconds'),
+            'duration': round(finished - job['created'], 2) if finished else None,
+            'files': [f"/reports/{job['id']}/files/{i}" for i in range(len(job['files']))],
+            'error': job['error']
+        }
+
+    def _expire(self):
+        """Entfernt abgeschlossene Aufträge, die älter als JOB_RETENTION sind (unter self._lock)."""
+        limit = time.time() - JOB_RETENTION
+        for job_id in [i for i, job in self.jobs.items() if job['finished'] and job['finished'] < limit]:
+            del self.jobs[job_id]
+            shutil.rmtree(os.path.join(self.output_dir, job_id), ignore_errors=True)
+        self._by_request = {key: job_id for key, job_id in self._by_request.items() if job_id in self.jobs}
+
+    def _set(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _run(self, job):
+        spec = dict(job['spec'])
+        start_date, end_date = spec['start_date'], spec['end_date']
+        trace = perf_log.Trace('service_report', self.log, job=job['id'], charger=job['serial'],
+                               start_date=start_date.isoformat(), end_date=end_date.isoformat())
+        try:
+            with trace:
+                self._set(job, status='fetching')
+                chargers = goe_api.charger_configs(job['entry'])
+                for charger in chargers:
+                    self._refresh(charger, start_date, end_date, trace)
+                complete = all(self.store.covers(goe_api.charger_key(c), end_date, start_date) for c in chargers)
+                sessions = goe_api.query_sessions(job['entry'], start_date, end_date, self.store)
+
+                self._set(job, status='rendering')
+                directory = os.path.join(self.output_dir, job['id'])
+                os.makedirs(directory, exist_ok=True)
+                spec['filename'] = os.path.join(directory, report.report_filename(spec))
+
+                args = (sessions, spec, job['period'], directory, job['overview'])
+                if self._render_pool is not None:
+                    with trace.stage('render'):
+                        result = self._render_pool.submit(report.render_report, *args).result()
+                else:
+                    result = report.render_report(*args)
+            files = result if isinstance(result, list) else [result]
+            self._set(job, status='done', files=files, complete=complete, finished=time.time())
+        except Exception as e:
+            self._set(job, status='failed', error=str(e), finished=time.time())
+
+    def _covers_start(self, key, start_date):
+        covered_from = self.store.covered_from(key)
+        return covered_from is None or covered_from <= start_date
+
+    def _refresh(self, charger, start_date, end_date, trace):
+        """Aktualisiert den Speicher einer Wallbox; gleichzeitige Anfragen teilen sich einen Export."""
+        key = goe_api.charger_key(charger)
+        if self.store.covers(key, end_date, start_date):
+            trace.count('store_hits')
+            return
+        last_fetch = self.store.last_fetch(key)
+        if (last_fetch is not None and datetime.now() - last_fetch < timedelta(seconds=self.max_age)
+                and self._covers_start(key, start_date)):
+            trace.count('store_hits')
+            return
+
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                own = future is None
+                if own:
+                    future = self._export_pool.submit(self._export, charger, start_date, trace)
+                    self._inflight[key] = future
+                else:
+                    trace.count('exports_coalesced')
+            future.result()
+            # Ein mitgenutzter Export kann später begonnen haben als dieser Zeitraum
+            if own or self._covers_start(key, start_date):
+                return
+
+    def _export(self, charger, start_date, trace):
+        key = goe_api.charger_key(charger)
+        try:
+            with trace.activate():
+                goe_api.refresh_sessions(charger, self.store, deadline=time.monotonic() + self.timeout,
+                                         client=self.client, start_date=start_date)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    """Erstellt den HTTP-Server für einen ReportService (Start mit serve_forever())."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, code, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path).path.strip('/').split('/')
+            if parts == ['health']:
+                return self.send_json(200, service.health())
+            if parts == ['reports']:
+                return self.send_json(200, {'reports': service.list_jobs()})
+            if len(parts) == 2 and parts[0] == 'reports':
+                job = service.get(parts[1])
+                return self.send_json(200, job) if job else self.send_json(404, {'error': 'Unbekannter Auftrag'})
+            if len(parts) == 4 and parts[0] == 'reports' and parts[2] == 'files' and parts[3].isdigit():
+                path = service.file(parts[1], int(parts[3]))
+                if path is None or not os.path.exists(path):
+                    return self.send_json(404, {'error': 'Bericht nicht vorhanden'})
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(path)}"')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self.send_json(404, {'error': 'Nicht gefunden'})
+
+        def do_POST(self):
+            if urlsplit(self.path).path.strip('/') != 'reports':
+                return self.send_json(404, {'error': 'Nicht gefunden'})
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY:
+                self.close_connection = True
+                return self.send_json(413, {'error': 'Anfrage zu groß'})
+            try:
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(request, dict):
+                    raise ValueError("JSON-Objekt erwartet")
+                job, coalesced = service.submit(request)
+            except KeyError as e:
+                return self.send_json(404, {'error': e.args[0]})
+            except ValueError as e:
+                return self.send_json(400, {'error': str(e)})
+            job['coalesced'] = coalesced
+            self.send_json(202, job)
+
+    return _Server((host, port), Handler)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Viele Benutzer verbinden sich gleichzeitig (Standard von socketserver: 5)
+    request_queue_size = 128
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="HTTP-Dienst für go-e Ladeberichte")
+    parser.add_argument('manifest', help="Flotten-Manifest (JSON), siehe batch.py")
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse des Dienstes")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--output-dir', default='berichte_dienst', help="Verzeichnis der erstellten Berichte")
+    parser.add_argument('--workers', type=int, default=8, help="Gleichzeitig bearbeitete Aufträge")
+    parser.add_argument('--export-workers', type=int, default=4, help="Gleichzeitige Exporte")
+    parser.add_argument('--render-processes', type=int, default=2,
+                        help="Prozesse für die PDF-Erstellung (0 = in den Auftrags-Threads, -1 = alle Kerne)")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE,
+                        help="Exporte, die höchstens so viele Sekunden alt sind, wiederverwenden")
+    parser.add_argument('--timeout', type=float, default=300, help="Zeitlimit pro Export in Sekunden")
+    parser.add_argument('--chart-format', choices=['raster', 'jpeg', 'vector'], default='raster')
+    parser.add_argument('--cache', help="Fertige Berichte hier zwischenspeichern; unveränderte werden nur kopiert")
+    parser.add_argument('--cache-mb', type=int, default=200, help="Höchstgröße des Berichts-Zwischenspeichers in MB")
+    parser.add_argument('--db', default='goe_charger_sessions.sqlite', help="Lokaler Sitzungsspeicher")
+    parser.add_argument('--archive', help="Neue Ladevorgänge zusätzlich im Parquet-Archiv ablegen (benötigt pyarrow)")
+    parser.add_argument('--perf-log', help="Laufzeitmessung je Auftrag als JSON Lines anhängen")
+    parser.add_argument('--cloud-url', default=goe_api.CLOUD_API_URL,
+                        help="URL-Vorlage der Cloud API, z.B. für den Stub in benchmarks/goe_stub_server.py")
+    parser.add_argument('--data-url', default=goe_api.DATA_API_URL, help="Basis-URL der Export-API")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        jobs = load_manifest(args.manifest)
+        store = SessionStore(args.db, open_archive(args.archive))
+    except (OSError, ValueError, ImportError) as e:
+        sys.stderr.write(f"Fehler: {str(e)}\n")
+        return 2
+
+    render_options = {'chart_format': args.chart_format}
+    if args.cache:
+        render_options['cache'] = ReportCache(args.cache, args.cache_mb * 1024 * 1024)
+    client = goe_api.GoeApiClient(pool_size=max(10, args.export_workers), cloud_url=args.cloud_url,
+                                  data_url=args.data_url)
+    service = ReportService(
+        jobs, store, args.output_dir, args.workers, args.export_workers,
+        os.cpu_count() if args.render_processes < 0 else args.render_processes, client, args.max_age,
+        args.timeout, render_options,
+        perf_log.PerfLog(args.perf_log) if args.perf_log else None)
+    server = make_server(service, args.host, args.port)
+    print(f"Berichtsdienst läuft auf http://{args.host}:{server.server_address[1]} ({len(service.entries)} Wallboxen)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Lokaler Speicher für Ladevorgänge der go-e Wallboxen.
+
+Hält die aus dem CSV-Export gelesenen Ladevorgänge aller Wallboxen in einer
+gemeinsamen SQLite-Tabelle vor, damit wiederholte Berichte nicht jedes Mal die
+komplette Ladehistorie exportieren müssen.
+
+Jeder Ladevorgang erhält einen stabilen Schlüssel aus Wallbox, Start, Ende und
+Energie (session_keys). Überlappende Exporte – erneute Abrufe, parallele Abrufe
+derselben Wallbox oder nachträglich importierte Exporte – werden über diesen
+Schlüssel zusammengeführt, ohne die bereits gespeicherte Historie zu laden.
+"""
+
+# Standard Library Imports
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+
+SESSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_key INTEGER PRIMARY KEY,
+        serial TEXT NOT NULL,
+        start TEXT NOT NULL,
+        ende TEXT NOT NULL,
+        energy_kwh REAL NOT NULL,
+        chip TEXT
+    )
+"""
+
+
+def session_keys(serial, df):
+    """Berechnet den Schlüssel jedes Ladevorgangs aus (Wallbox, Start, Ende, Energie in Wh).
+
+    Der Schlüssel ist ein Hash mit festem Startwert und damit über Programmläufe
+    hinweg stabil; er passt als positive Zahl in eine SQLite-INTEGER-Spalte.
+
+    Returns:
+        numpy-Array (int64) mit einem Schlüssel pro Zeile von df
+    """
+    serial_hash = pd.util.hash_array(np.array([serial], dtype=object))[0]
+    parts = pd.DataFrame({
+        'serial': np.full(len(df), serial_hash, dtype='uint64'),
+        'start': df['Start'].to_numpy('datetime64[ns]').view('int64'),
+        'ende': df['Ende'].to_numpy('datetime64[ns]').view('int64'),
+        'wh': np.round(df['Energie [kWh]'].to_numpy('float64') * 1000).astype('int64')
+    })
+    keys = pd.util.hash_pandas_object(parts, index=False).to_numpy()
+    return (keys >> np.uint64(1)).astype('int64')
+
+
+def _isoformat(values):
+    """Wandelt Zeitpunkte spaltenweise in ISO-Strings wie datetime.isoformat() um."""
+    values = values.to_numpy('datetime64[us]')
+    whole_seconds = not (values.view('int64') % 1000000).any()
+    return np.datetime_as_string(values, unit='s' if whole_seconds else 'us').tolist()
+
+
+class SessionStore:
+    """
+    Persistenter Speicher für Ladevorgänge, getrennt nach Wallbox.
+    Neue Exporte werden inkrementell übernommen, Zeitraumabfragen werden lokal beantwortet.
+    """
+
+    def __init__(self, db_file="goe_charger_sessions.sqlite", archive=None):
+        """Öffnet (oder erstellt) die Datenbank.
+
+        Args:
+            db_file: Pfad zur SQLite-Datei
+            archive: Optionales SessionArchive, in das neue Ladevorgänge zusätzlich geschrieben werden
+        """
+        self.db_file = db_file
+        self.archive = archive
+        with self._connect() as conn:
+            self._migrate(conn)
+            conn.execute(SESSIONS_TABLE)
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_serial_start ON sessions (serial, start)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chargers (
+                    serial TEXT PRIMARY KEY,
+                    last_fetch TEXT NOT NULL,
+                    covered_from TEXT
+                )
+            """)
+            # Datenbanken ohne Beginn des abgedeckten Zeitraums: Historie vollständig
+            if 'covered_from' not in [row[1] for row in conn.execute("PRAGMA table_info(chargers)")]:
+                conn.execute("ALTER TABLE chargers ADD COLUMN covered_from TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _migrate(self, conn):
+        """Überführt eine Datenbank ohne Sitzungsschlüssel in das aktuelle Format."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+        if not columns or 'session_key' in columns:
+            return
+        old = pd.read_sql_query("SELECT serial, start, ende, energy_kwh FROM sessions", conn)
+        conn.execute("ALTER TABLE sessions RENAME TO sessions_old")
+        conn.execute(SESSIONS_TABLE)
+        for serial, part in old.groupby('serial', sort=False):
+            df = pd.DataFrame({
+                'Start': pd.to_datetime(part['start'], format='ISO8601'),
+                'Ende': pd.to_datetime(part['ende'], format='ISO8601'),
+                'Energie [kWh]': part['energy_kwh']
+            })
+            self._insert(conn, serial, df)
+        conn.execute("DROP TABLE sessions_old")
+
+    def serials(self):
+        """Liefert die Schlüssel aller gespeicherten Wallboxen."""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT serial FROM sessions ORDER BY serial")]
+
+    def last_fetch(self, serial):
+        """Gibt den Zeitpunkt des letzten vollständigen Exports zurück (oder None)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_fetch FROM chargers WHERE serial = ?",
+                               (serial,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def covered_from(self, serial):
+        """Gibt den ersten vollständig gespeicherten Tag zurück (date; None = gesamte Historie)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT covered_from FROM chargers WHERE serial = ?",
+                               (serial,)).fetchone()
+        return datetime.fromisoformat(row[0]).date() if row and row[0] else None
+
+    def first_session_start(self, serial):
+        """Gibt den Start des ältesten gespeicherten Ladevorgangs zurück (oder None)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(start) FROM sessions WHERE serial = ?",
+                               (serial,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def last_session_start(self, serial):
+        """Gibt den Start des neuesten gespeicherten Ladevorgangs zurück (oder None)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(start) FROM sessions WHERE serial = ?",
+                               (serial,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def covers(self, serial, end_date, start_date=None):
+        """Prüft, ob der Zeitraum bis einschließlich end_date vollständig lokal vorliegt.
+
+        Ein Zeitraum gilt als abgedeckt, wenn der letzte Export nach dem Ende des
+        Zeitraums stattfand – alle bis dahin beendeten Ladevorgänge sind dann enthalten.
+        Wurde nur ein Teil der Historie exportiert (siehe covered_from), muss der
+        Zeitraum außerdem nach dessen Beginn anfangen; ohne start_date ist dann
+        die gesamte Historie gemeint.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_fetch, covered_from FROM chargers WHERE serial = ?",
+                               (serial,)).fetchone()
+        if row is None or datetime.fromisoformat(row[0]).date() <= end_date:
+            return False
+        return row[1] is None or (start_date is not None and datetime.fromisoformat(row[1]).date() <= start_date)
+
+    def add_sessions(self, serial, df, fetched_at=None, covered_from=None):
+        """Übernimmt neue Ladevorgänge aus einem Export.
+
+        Es werden nur Ladevorgänge betrachtet, die nach dem neuesten bereits
+        gespeicherten Ladevorgang begonnen haben; der Aufwand wächst damit mit den
+        neuen Ladevorgängen, nicht mit der gesamten Historie.
+
+        Args:
+            serial: Seriennummer bzw. Schlüssel der Wallbox
+            df: DataFrame mit den Spalten 'Start', 'Ende', 'Energie [kWh]' und optional 'ID Chip'
+            fetched_at: Zeitpunkt des Exports (Standard: jetzt)
+            covered_from: Erster Tag (date) des ersten Exports einer Wallbox, wenn dieser
+                nur einen Zeitraum umfasste; bei bekannten Wallboxen ohne Wirkung
+
+        Returns:
+            Anzahl der neu gespeicherten Ladevorgänge
+        """
+        fetched_at = fetched_at or datetime.now()
+        last_start = self.last_session_start(serial)
+        if last_start is not None:
+            df = df[df['Start'] > last_start]
+
+        with self._connect() as conn:
+            added = self._insert(conn, serial, df)
+            conn.execute(
+                "INSERT INTO chargers (serial, last_fetch, covered_from) VALUES (?, ?, ?) "
+                "ON CONFLICT (serial) DO UPDATE SET last_fetch = excluded.last_fetch",
+                (serial, fetched_at.isoformat(), covered_from.isoformat() if covered_from else None))
+        if self.archive is not None and added:
+            self.archive.write(serial, df)
+        return added
+
+    def extend_coverage(self, serial, covered_from):
+        """Verlegt den Beginn des abgedeckten Zeitraums nach einem Export älterer Ladevorgänge nach vorn.
+
+        Args:
+            covered_from: Neuer erster Tag (date; None = gesamte Historie)
+        """
+        with self._connect() as conn:
+            if covered_from is None:
+                conn.execute("UPDATE chargers SET covered_from = NULL WHERE serial = ?", (serial,))
+            else:
+                conn.execute("UPDATE chargers SET covered_from = ? WHERE serial = ? AND covered_from > ?",
+                             (covered_from.isoformat(), serial, covered_from.isoformat()))
+
+    def merge_sessions(self, serial, df):
+        """Führt einen beliebigen Export, z.B. eine ältere CSV-Datei, mit dem Speicher zusammen.
+
+        Bereits gespeicherte Ladevorgänge werden über ihren Schlüssel erkannt. Der
+        Zeitpunkt des letzten Exports bleibt unverändert.
+
+        Returns:
+            Anzahl der neu gespeicherten Ladevorgänge
+        """
+        with self._connect() as conn:
+            added = self._insert(conn, serial, df)
+        if self.archive is not None and added:
+            self.archive.write(serial, df)
+        return added
+
+    @staticmethod
+    def _insert(conn, serial, df):
+        """Speichert Ladevorgänge, deren Schlüssel noch nicht vorhanden ist."""
+        if not len(df):
+            return 0
+        keys = session_keys(serial, df)
+        duplicated = pd.Index(keys).duplicated()
+        if duplicated.any():
+            df, keys = df[~duplicated], keys[~duplicated]
+
+        if 'ID Chip' in df.columns:
+            chips = df['ID Chip'].astype(object).where(df['ID Chip'].notna(), None).tolist()
+        else:
+            chips = [None] * len(df)
+        rows = zip(keys.tolist(), [serial] * len(df), _isoformat(df['Start']), _isoformat(df['Ende']),
+                   df['Energie [kWh]'].astype('float64').tolist(), chips)
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO sessions (session_key, serial, start, ende, energy_kwh, chip) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return conn.total_changes - before
+
+    def query(self, serial, start_date, end_date):
+        """Liefert alle Ladevorgänge einer Wallbox im angegebenen Zeitraum.
+
+        Args:
+            serial: Seriennummer bzw. Schlüssel der Wallbox
+            start_date: Erster Tag des Zeitraums (date)
+            end_date: Letzter Tag des Zeitraums (date, inklusive)
+
+        Returns:
+            DataFrame mit den Spalten 'Start', 'Ende' und 'Energie [kWh]'
+        """
+        # Vorfilter über den Index auf Start, exakte Prüfung des Endes danach
+        lower = datetime.combine(start_date, datetime.min.time())
+        upper = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT start, ende, energy_kwh FROM sessions "
+                "WHERE serial = ? AND start >= ? AND start < ? ORDER BY start",
+                conn, params=(serial, lower.isoformat(), upper.isoformat()))
+
+        df.columns = ['Start', 'Ende', 'Energie [kWh]']
+        df['Start'] = pd.to_datetime(df['Start'], format='ISO8601')
+        df['Ende'] = pd.to_datetime(df['Ende'], format='ISO8601')
+        return df[df['Ende'] < upper].reset_index(drop=True)
+
+    def query_chargers(self, sources, start_date, end_date):
+        """Liefert die Ladevorgänge mehrerer Wallboxen im angegebenen Zeitraum, z.B. eines Mitarbeiters.
+
+        Args:
+            sources: Liste von (Seriennummer bzw. Schlüssel, ID-Chips); mit ID-Chips
+                werden nur Ladevorgänge mit einem dieser Chips übernommen (z.B. an
+                einer gemeinsam genutzten Wallbox), mit None alle
+            start_date: Erster Tag des Zeitraums (date)
+            end_date: Letzter Tag des Zeitraums (date, inklusive)
+
+        Returns:
+            DataFrame mit den Spalten 'Start', 'Ende', 'Energie [kWh]', 'Seriennummer'
+            und 'ID Chip', nach Start sortiert
+        """
+        conditions, params = [], []
+        for serial, chips in sources:
+            if chips:
+                conditions.append(f"(serial = ? AND chip IN ({', '.join('?' * len(chips))}))")
+                params += [serial, *chips]
+            else:
+                conditions.append("serial = ?")
+                params.append(serial)
+
+        lower = datetime.combine(start_date, datetime.min.time())
+        upper = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                f"SELECT start, ende, energy_kwh, serial, chip FROM sessions "
+                f"WHERE ({' OR '.join(conditions) or '0'}) AND start >= ? AND start < ? ORDER BY start",
+                conn, params=params + [lower.isoformat(), upper.isoformat()])
+
+        df.columns = ['Start', 'Ende', 'Energie [kWh]', 'Seriennummer', 'ID Chip']
+        df['Start'] = pd.to_datetime(df['Start'], format='ISO8601')
+        df['Ende'] = pd.to_datetime(df['Ende'], format='ISO8601')
+        return df[df['Ende'] < upper].reset_index(drop=True)
@@ -0,0 +1,112 @@
+"""
+Einlesen der Ladevorgänge aus dem CSV-Export der go-e Wallbox.
+
+Der Export wird blockweise mit festen Spalten und Datentypen gelesen und bereits
+beim Einlesen gefiltert, damit der Speicherbedarf auch bei sehr langen
+Ladehistorien begrenzt bleibt.
+"""
+
+# Standard Library Imports
+import csv
+
+# Third Party Imports
+import pandas as pd
+
+
+# Spalten des Exports, die für die Auswertung benötigt werden
+SESSION_COLUMNS = ['Start', 'Ende', 'Energie [kWh]']
+# Optional: RFID-Chip, mit dem der Ladevorgang freigegeben wurde
+CHIP_COLUMN = 'ID Chip'
+DATE_FORMAT = '%d.%m.%Y %H:%M:%S'
+
+# Zeilen pro Block beim Einlesen
+CHUNK_SIZE = 50000
+
+
+class _StringReader:
+    """Liest einen String abschnittsweise, ohne ihn wie StringIO vollständig zu kopieren."""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self.text) - self.pos
+        chunk = self.text[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+    def __iter__(self):
+        # pandas erkennt dateiähnliche Objekte an read() und __iter__()
+        return self
+
+    def __next__(self):
+        if self.pos >= len(self.text):
+            raise StopIteration
+        end = self.text.find('\n', self.pos)
+        end = len(self.text) if end < 0 else end + 1
+        line = self.text[self.pos:end]
+        self.pos = end
+        return line
+
+
+def empty_sessions():
+    """Liefert einen leeren DataFrame mit den Spalten und Typen der Ladevorgänge."""
+    return pd.DataFrame({
+        'Start': pd.Series(dtype='datetime64[ns]'),
+        'Ende': pd.Series(dtype='datetime64[ns]'),
+        'Energie [kWh]': pd.Series(dtype='float64')
+    })
+
+
+def parse_sessions(csv_data, since=None, start_date=None, end_date=None, chunksize=CHUNK_SIZE):
+    """Liest die Ladevorgänge aus dem CSV-Export.
+
+    Args:
+        csv_data: CSV-Export als String (Trennzeichen ';', Dezimalkomma)
+        since: Nur Ladevorgänge übernehmen, die nach diesem Zeitpunkt begonnen haben
+        start_date: Nur Ladevorgänge ab diesem Tag (date)
+        end_date: Nur Ladevorgänge, die bis einschließlich diesem Tag beendet wurden (date)
+        chunksize: Zeilen pro Block
+
+    Returns:
+        DataFrame mit den Spalten 'Start', 'Ende' (datetime) und 'Energie [kWh]' (float),
+        zusätzlich 'ID Chip', wenn der Export diese Spalte enthält
+    """
+    wanted = SESSION_COLUMNS + [CHIP_COLUMN]
+    # Kopfzeile vorab prüfen; pandas meldet fehlende Datumsspalten sonst nur allgemein
+    end = csv_data.find('\n')
+    header = next(csv.reader([csv_data[:end] if end >= 0 else csv_data], delimiter=';'), [])
+    missing = [column for column in SESSION_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Spalten fehlen im Export: {', '.join(missing)}")
+
+    reader = pd.read_csv(
+        _StringReader(csv_data), sep=';', decimal=',',
+        usecols=lambda column: column in wanted,
+        dtype={'Energie [kWh]': 'float64', CHIP_COLUMN: 'str'},
+        parse_dates=['Start', 'Ende'], date_format=DATE_FORMAT,
+        chunksize=chunksize)
+
+    lower = pd.Timestamp(start_date) if start_date is not None else None
+    upper = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+    since = pd.Timestamp(since) if since is not None else None
+
+    chunks = []
+    for chunk in reader:
+        mask = pd.Series(True, index=chunk.index)
+        if since is not None:
+            mask &= chunk['Start'] > since
+        if lower is not None:
+            mask &= chunk['Start'] >= lower
+        if upper is not None:
+            mask &= chunk['Ende'] < upper
+        if not mask.all():
+            chunk = chunk[mask]
+        if len(chunk):
+            chunks.append(chunk[[column for column in wanted if column in chunk.columns]])
+
+    if not chunks:
+        return empty_sessions()
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,200 @@
+"""
+Tarife für die Kostenberechnung der Ladevorgänge.
+
+Neben einem festen Strompreis werden zeitabhängige Tarife unterstützt: Hoch- und
+Niedertarif (HT/NT) nach Uhrzeit und Wochentag sowie Preise, die sich ab einem
+Stichtag ändern. Ein Tarif wird als dict beschrieben, z.B.:
+
+    {
+        "prices": [
+            {"valid_from": "2024-01-01", "ht": "0,35", "nt": "0,25"},
+            {"valid_from": "2024-07-01", "ht": "0,38", "nt": "0,27"}
+        ],
+        "ht_hours": ["06:00", "22:00"],
+        "ht_weekdays": [0, 1, 2, 3, 4]
+    }
+
+Ohne "nt" gilt der HT-Preis rund um die Uhr, ohne "ht_hours" gilt immer HT.
+Vor dem ersten Stichtag gilt der erste Preis.
+
+Die Energie eines Ladevorgangs wird gleichmäßig auf seine Dauer verteilt und
+über die kumulierten Tarifkosten (Preis × Zeit) auf die Tarifzeiträume
+aufgeteilt – für alle Ladevorgänge gleichzeitig, ohne Schleife pro Vorgang.
+"""
+
+# Standard Library Imports
+import json
+from decimal import Decimal, ROUND_HALF_UP
+
+# Third Party Imports
+import numpy as np
+
+
+# Strompreise werden auf 1/10000 EUR genau gerechnet
+PRICE_SCALE = 10000
+
+
+def parse_price(price_str):
+    """Konvertiert einen Preis-String in Float, akzeptiert Komma und Punkt"""
+    try:
+        # Ersetze Komma durch Punkt und versuche zu konvertieren
+        price_str = str(price_str).replace(',', '.')
+        return float(price_str)
+    except (ValueError, AttributeError):
+        raise ValueError("Ungültiger Strompreis. Bitte geben Sie eine Zahl ein (z.B. 0,30 oder 0.30)")
+
+
+def price_units(price):
+    """Wandelt einen Strompreis in ganze 1/10000 EUR pro kWh um."""
+    return int((Decimal(str(parse_price(price))) * PRICE_SCALE).to_integral_value(ROUND_HALF_UP))
+
+
+def _seconds(values):
+    """Wandelt Zeitpunkte in Sekunden seit 1970 (int64) um."""
+    return np.asarray(values, dtype='datetime64[s]').astype('int64')
+
+
+def _time_of_day(text):
+    """Wandelt 'HH:MM' in Sekunden nach Mitternacht um."""
+    hours, minutes = (int(part) for part in str(text).split(':')[:2])
+    return hours * 3600 + minutes * 60
+
+
+class Tariff:
+    """
+    Zeitabhängiger Strompreis.
+    Preise werden intern in 1/10000 EUR pro kWh geführt.
+    """
+
+    def __init__(self, valid_from, ht_prices, nt_prices, ht_hours=None, ht_weekdays=None):
+        """Initialisiert den Tarif.
+
+        Args:
+            valid_from: Stichtage der Preisstufen (aufsteigend)
+            ht_prices: HT-Preis je Stichtag in 1/10000 EUR
+            nt_prices: NT-Preis je Stichtag in 1/10000 EUR
+            ht_hours: (Beginn, Ende) der HT-Zeit in Sekunden nach Mitternacht oder None
+            ht_weekdays: Wochentage mit HT-Zeit (0 = Montag)
+        """
+        self.valid_from = _seconds(valid_from)
+        self.ht_prices = np.asarray(ht_prices, dtype='int64')
+        self.nt_prices = np.asarray(nt_prices, dtype='int64')
+        self.ht_hours = ht_hours
+        self.ht_weekdays = np.asarray(ht_weekdays if ht_weekdays is not None else range(7), dtype='int64')
+
+    @classmethod
+    def flat(cls, price):
+        """Fester Strompreis in EUR pro kWh."""
+        units = price_units(price)
+        return cls(['1970-01-01'], [units], [units])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Erstellt den Tarif aus seiner Beschreibung (siehe Moduldokumentation)."""
+        prices = sorted(data.get('prices', []), key=lambda p: p.get('valid_from', '1970-01-01'))
+        if not prices:
+            raise ValueError("Der Tarif enthält keine Preise")
+
+        ht_hours = None
+        if data.get('ht_hours'):
+            start, end = (_time_of_day(t) for t in data['ht_hours'])
+            if not 0 <= start < end <= 86400:
+                raise ValueError("Die HT-Zeit muss innerhalb eines Tages liegen (z.B. 06:00 bis 22:00)")
+            ht_hours = (start, end)
+
+        return cls(
+            [p.get('valid_from', '1970-01-01') for p in prices],
+            [price_units(p['ht']) for p in prices],
+            [price_units(p.get('nt', p['ht'])) for p in prices],
+            ht_hours,
+            data.get('ht_weekdays'))
+
+    @property
+    def has_nt(self):
+        return self.ht_hours is not None and not np.array_equal(self.ht_prices, self.nt_prices)
+
+    @property
+    def is_flat(self):
+        return not self.has_nt and len(np.unique(self.ht_prices)) == 1
+
+    def _timeline(self, first, last):
+        """Erstellt die Zeitpunkte, an denen sich der Preis im Bereich [first, last] ändern kann.
+
+        Returns:
+            (Zeitpunkte, Preis ab Zeitpunkt, HT ab Zeitpunkt) als Arrays, Zeitpunkte in Sekunden
+        """
+        day = 86400
+        days = np.arange(first - first % day, last + day, day)
+        points = [days, self.valid_from[(self.valid_from > first) & (self.valid_from < last)], [last]]
+        if self.ht_hours is not None:
+            weekdays = ((days // day) + 3) % 7  # 01.01.1970 war ein Donnerstag
+            ht_days = days[np.isin(weekdays, self.ht_weekdays)]
+            points += [ht_days + self.ht_hours[0], ht_days + self.ht_hours[1]]
+        points = np.unique(np.concatenate(points))
+
+        # HT-Zeit und Preisstufe für jeden Abschnitt
+        if self.ht_hours is None:
+            is_ht = np.ones(len(points), dtype=bool)
+        else:
+            time_of_day = points % day
+            is_ht = (np.isin(((points // day) + 3) % 7, self.ht_weekdays)
+                     & (time_of_day >= self.ht_hours[0]) & (time_of_day < self.ht_hours[1]))
+        level = np.clip(np.searchsorted(self.valid_from, points, side='right') - 1, 0, None)
+        prices = np.where(is_ht, self.ht_prices[level], self.nt_prices[level])
+        return points, prices, is_ht
+
+    def split(self, starts, ends, energy_wh):
+        """Verteilt die Energie der Ladevorgänge auf die Tarifzeiten.
+
+        Args:
+            starts, ends: Beginn und Ende der Ladevorgänge
+            energy_wh: Energie der Ladevorgänge in Wh
+
+        Returns:
+            (Kosten in 1/10^7 EUR, Energie im HT in Wh) als float64-Arrays
+        """
+        s = _seconds(starts)
+        e = np.maximum(_seconds(ends), s)
+        energy_wh = np.asarray(energy_wh, dtype='float64')
+        if len(s) == 0:
+            return np.zeros(0), np.zeros(0)
+
+        points, prices, is_ht = self._timeline(int(s.min()), int(e.max()))
+
+        # Kumulierte Preis-Sekunden und HT-Sekunden an jedem Zeitpunkt
+        durations = np.diff(points).astype('float64')
+        cum_cost = np.concatenate([[0.0], np.cumsum(prices[:-1] * durations)])
+        cum_ht = np.concatenate([[0.0], np.cumsum(is_ht[:-1] * durations)])
+
+        def integral(t):
+            i = np.searchsorted(points, t, side='right') - 1
+            offset = (t - points[i]).astype('float64')
+            return cum_cost[i] + prices[i] * offset, cum_ht[i] + is_ht[i] * offset
+
+        cost_start, ht_start = integral(s)
+        cost_end, ht_end = integral(e)
+        duration = (e - s).astype('float64')
+
+        # Ladevorgänge ohne Dauer werden mit dem Preis zum Startzeitpunkt bewertet
+        i = np.searchsorted(points, s, side='right') - 1
+        has_duration = duration > 0
+        safe = np.where(has_duration, duration, 1.0)
+        avg_price = np.where(has_duration, (cost_end - cost_start) / safe, prices[i])
+        ht_share = np.where(has_duration, (ht_end - ht_start) / safe, is_ht[i])
+
+        return energy_wh * avg_price, energy_wh * ht_share
+
+
+def load_tariff(path):
+    """Liest eine Tarifbeschreibung aus einer JSON-Datei und prüft sie."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    Tariff.from_dict(data)
+    return data
+
+
+def tariff_from_spec(spec):
+    """Liefert den Tarif einer Berichtsbeschreibung: 'tariff' (dict) oder fester 'price'."""
+    if spec.get('tariff'):
+        return Tariff.from_dict(spec['tariff'])
+    return Tariff.flat(spec['price'])
@@ -0,0 +1,37 @@
+"""
+Gemeinsame Einstellungen der Tests.
+
+Die Module liegen flach im Projektverzeichnis, Stub-Server und Testdaten unter
+benchmarks/; beide Verzeichnisse werden dem Suchpfad hinzugefügt.
+"""
+
+# Standard Library Imports
+import os
+import sys
+
+# Third Party Imports
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture
+def make_stub():
+    """Startet Stubs der go-e APIs (siehe benchmarks/goe_stub_server.py) und beendet sie nach dem Test."""
+    from goe_stub_server import StubGoeServer
+
+    servers = []
+
+    def start(**options):
+        options.setdefault('rows', 300)
+        options.setdefault('export_seconds', 0.0)
+        options.setdefault('span_days', 400)
+        server = StubGoeServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
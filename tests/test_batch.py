@@ -0,0 +1,113 @@
+"""Tests für die Stapelverarbeitung gegen den Stub der go-e APIs."""
+
+# Standard Library Imports
+import json
+import time
+from datetime import date, timedelta
+
+# Local Imports
+import batch
+import goe_api
+from session_store import SessionStore
+
+
+def last_month():
+    end = date.today().replace(day=1) - timedelta(days=1)
+    return end.replace(day=1), end
+
+
+def tickets(stub, serial=None):
+    return [query for _, path, query in stub.requests
+            if path == '/api/v1/get_ticket' and (serial is None or f"e={serial}" in query)]
+
+
+def write_manifest(tmp_path, jobs):
+    manifest = tmp_path / 'flotte.json'
+    manifest.write_text(json.dumps({'jobs': jobs}), encoding='utf-8')
+    return str(manifest)
+
+
+def test_main_exit_codes(make_stub, tmp_path):
+    stub = make_stub()
+    manifest = write_manifest(tmp_path, [dict(stub.charger_config(serial), employee=f"Mitarbeiter {serial}")
+                                         for serial in ('111111', '222222')])
+    options = stub.client_options()
+
+    def run(db, *extra):
+        return batch.main([manifest, '--month', f"{last_month()[0]:%Y-%m}", '--db', str(tmp_path / db),
+                           '--output-dir', str(tmp_path / 'berichte'), '--chart-format', 'vector',
+                           '--cloud-url', options['cloud_url'], '--data-url', options['data_url'], *extra])
+
+    assert run('ok.sqlite') == batch.EXIT_OK
+    assert len(list((tmp_path / 'berichte').glob('*.pdf'))) == 2
+
+    stub.failures.add('ticket_error')
+    assert run('fehler.sqlite') == batch.EXIT_FAILED
+    assert run('fehler.sqlite', '--start', '2024-01-01') == batch.EXIT_USAGE
+    assert batch.main([str(tmp_path / 'fehlt.json')]) == batch.EXIT_USAGE
+
+
+def test_jobs_of_shared_charger_share_one_export(make_stub, tmp_path):
+    stub = make_stub(export_seconds=0.3)
+    shared = stub.charger_config('111111')
+    jobs = batch.load_manifest(write_manifest(tmp_path, [
+        dict(shared, employee='A', id_chips=['Chip 1']), dict(shared, employee='B', id_chips=['Chip 2']),
+        dict(shared, employee='C'), dict(stub.charger_config('222222'), employee='D')]))
+    start_date, end_date = last_month()
+
+    results = batch.run_batch(jobs, start_date, end_date, SessionStore(str(tmp_path / 'sessions.sqlite')),
+                              str(tmp_path / 'berichte'), workers=4, timeout=30,
+                              client=goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options()),
+                              render_options={'chart_format': 'vector'})
+
+    assert [result['status'] for result in results] == ['ok'] * 4
+    assert len(tickets(stub, '111111')) == 1
+    assert len(tickets(stub, '222222')) == 1
+
+
+def test_timeout_cancels_running_jobs(make_stub, tmp_path, monkeypatch):
+    stub = make_stub()
+    jobs = batch.load_manifest(write_manifest(tmp_path, [
+        dict(stub.charger_config(serial), employee=f"Mitarbeiter {serial}") for serial in ('111111', '222222')]))
+    start_date, end_date = last_month()
+    running = set()
+
+    def endless_render(sessions, spec, *args, progress_callback=None):
+        # Bricht nur über progress_callback ab, wie die Berichte je Zeitraum
+        running.add(spec['filename'])
+        try:
+            while True:
+                progress_callback(0, 1)
+                time.sleep(0.02)
+        finally:
+            running.discard(spec['filename'])
+
+    monkeypatch.setattr(batch.report, 'render_report', endless_render)
+    t0 = time.monotonic()
+    results = batch.run_batch(jobs, start_date, end_date, SessionStore(str(tmp_path / 'sessions.sqlite')),
+                              str(tmp_path / 'berichte'), workers=2, timeout=1,
+                              client=goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options()))
+    assert time.monotonic() - t0 < 5
+    assert [result['status'] for result in results] == ['timeout'] * 2
+
+    # Die Worker-Threads werden beendet statt im Hintergrund weiterzulaufen
+    deadline = time.monotonic() + 2
+    while running and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not running
+
+
+def test_export_deadline_fails_job(make_stub, tmp_path):
+    # Der Export wird nie fertig; beide Jobs der Wallbox warten auf denselben Export
+    stub = make_stub(failures={'timeout'})
+    shared = stub.charger_config('111111')
+    jobs = batch.load_manifest(write_manifest(tmp_path, [dict(shared, employee='A'), dict(shared, employee='B')]))
+    start_date, end_date = last_month()
+
+    t0 = time.monotonic()
+    results = batch.run_batch(jobs, start_date, end_date, SessionStore(str(tmp_path / 'sessions.sqlite')),
+                              str(tmp_path / 'berichte'), workers=2, timeout=1,
+                              client=goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options()))
+    assert time.monotonic() - t0 < 5
+    assert all(result['status'] in ('failed', 'timeout') for result in results)
+    assert len(tickets(stub)) == 1
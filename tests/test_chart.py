@@ -0,0 +1,74 @@
+"""Tests für das Verbrauchsdiagramm in den drei Diagrammformaten."""
+
+# Standard Library Imports
+import zlib
+from io import BytesIO
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+# Local Imports
+import chart
+import report
+
+
+DATES = pd.date_range('2024-03-01', periods=14, freq='D').values
+VALUES = np.array([0, 12.5, 3.0, 0, 7.25, 22.0, 5.5, 0, 0, 9.0, 11.0, 4.0, 18.5, 6.0])
+
+
+def chart_pdf(renderer, path):
+    """Zeichnet das Diagramm auf eine Seite und liefert das PDF als Bytes."""
+    pdf = report.PDF(str(path / 'diagramm.pdf'))
+    pdf.add_page()
+    height = renderer.draw(pdf, DATES, VALUES, x=10, y=30, w=190)
+    assert height == pytest.approx(190 * chart.FIGSIZE[1] / chart.FIGSIZE[0])
+    pdf.output()
+    return (path / 'diagramm.pdf').read_bytes()
+
+
+def test_get_renderer_shares_one_renderer_per_format():
+    renderers = {fmt: chart.get_renderer(50, fmt) for fmt in chart.CHART_FORMATS}
+    assert all(chart.get_renderer(50, fmt) is renderer for fmt, renderer in renderers.items())
+    assert len({id(renderer) for renderer in renderers.values()}) == len(chart.CHART_FORMATS)
+    assert chart.get_renderer(60, 'raster') is not renderers['raster']
+    with pytest.raises(ValueError):
+        chart.ChartRenderer(fmt='svg')
+
+
+def test_raster_chart(tmp_path):
+    renderer = chart.get_renderer(50, 'raster')
+    info = renderer.image_info(DATES, VALUES)
+    assert (info['w'], info['h']) == (chart.FIGSIZE[0] * 50, chart.FIGSIZE[1] * 50)
+    assert info['f'] == 'FlateDecode'
+    pixels = np.frombuffer(zlib.decompress(info['data']), dtype='uint8').reshape(info['h'], info['w'], 3)
+    # Balken in der Farbe des Diagramms (mit Transparenz auf Weiß), sonst überwiegend weiß
+    assert (pixels == 255).all(axis=2).mean() > 0.5
+    assert (np.abs(pixels.astype(int) - [112, 127, 142]).sum(axis=2) < 30).any()
+
+    # Die wiederverwendete Figure liefert für dieselben Daten dasselbe Bild
+    renderer.image_info(DATES[:3], VALUES[:3])
+    assert renderer.image_info(DATES, VALUES)['data'] == info['data']
+    assert b'/Subtype /Image' in chart_pdf(renderer, tmp_path)
+
+
+def test_jpeg_chart(tmp_path):
+    renderer = chart.get_renderer(50, 'jpeg')
+    info = renderer.image_info(DATES, VALUES)
+    assert info['f'] == 'DCTDecode'
+    image = Image.open(BytesIO(info['data']))
+    assert image.format == 'JPEG' and image.size == (info['w'], info['h'])
+    data = chart_pdf(renderer, tmp_path)
+    assert b'/Filter /DCTDecode' in data and info['data'] in data
+
+
+def test_vector_chart(tmp_path):
+    data = chart_pdf(chart.get_renderer(50, 'vector'), tmp_path)
+    assert b'/Subtype /Image' not in data
+    content = zlib.decompress(data.split(b'stream\n', 1)[1].split(b'endstream', 1)[0])
+    # Ein gefülltes Rechteck pro Tag, auch ohne Verbrauch
+    bars = [line for line in content.split(b'\n') if line.endswith(b' re f')]
+    assert len(bars) == len(VALUES)
+    assert b'(Stromverbrauch im Zeitverlauf)' in content
@@ -0,0 +1,183 @@
+"""Tests für Exporte einzelner Zeiträume und den abgedeckten Zeitraum im Sitzungsspeicher."""
+
+# Standard Library Imports
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs
+
+# Third Party Imports
+import pandas as pd
+
+# Local Imports
+import goe_api
+from session_store import SessionStore
+
+
+SESSIONS = pd.DataFrame({
+    'Start': pd.to_datetime(['2024-03-02 18:00', '2024-03-20 19:00']),
+    'Ende': pd.to_datetime(['2024-03-02 20:00', '2024-03-20 22:00']),
+    'Energie [kWh]': [10.0, 15.0]
+})
+
+
+def tickets(stub):
+    """Parameter der angeforderten Exporte in Reihenfolge der Anfragen."""
+    return [parse_qs(query) for _, path, query in stub.requests if path == '/api/v1/get_ticket']
+
+
+def to_date(values):
+    return datetime.fromtimestamp(int(values[0]) / 1000).date()
+
+
+def expected_sessions(stub, serial, start_date, end_date):
+    """Ladevorgänge des Stubs, die im Zeitraum begonnen und geendet haben (wie SessionStore.query)."""
+    sessions = stub.sessions(serial)
+    upper = pd.Timestamp(end_date + timedelta(days=1))
+    return sessions[(sessions['Start'] >= pd.Timestamp(start_date)) & (sessions['Ende'] < upper)]
+
+
+def test_window_params_include_margin():
+    params = goe_api.window_params(date(2024, 3, 1), date(2024, 3, 31))
+    assert params['from'] == int(datetime(2024, 2, 29).timestamp() * 1000)
+    assert params['to'] == int(datetime(2024, 4, 2).timestamp() * 1000)
+    assert goe_api.window_params() == {}
+    assert list(goe_api.window_params(last_day=date(2024, 3, 31))) == ['to']
+
+
+def test_split_window():
+    assert goe_api.split_window(date(2024, 1, 1), date(2024, 1, 10), 4) == [
+        (date(2024, 1, 1), date(2024, 1, 4)), (date(2024, 1, 5), date(2024, 1, 8)),
+        (date(2024, 1, 9), date(2024, 1, 10))]
+    assert goe_api.split_window(date(2024, 1, 1), date(2024, 1, 1), 4) == [(date(2024, 1, 1), date(2024, 1, 1))]
+
+
+def test_export_shards_depend_on_window_support():
+    client = goe_api.GoeApiClient(shard_days=30)
+    windows = [(date(2024, 1, 1), date(2024, 3, 31)), (None, None)]
+    # Unbekannt: ein Export, sonst käme bei fehlender Unterstützung jeder Abschnitt mit der gesamten Historie
+    assert client.export_shards(windows) == [(None, None)]
+    assert client.export_shards([(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 31))]) \
+        == [(date(2024, 1, 1), date(2024, 3, 31))]
+
+    client.window_support = True
+    shards = client.export_shards(windows)
+    assert shards == goe_api.split_window(date(2024, 1, 1), date(2024, 3, 31), 30) + [(None, None)]
+    assert len(shards) == 5
+    # Sehr lange Zeiträume ergeben höchstens MAX_SHARDS Abschnitte
+    shards = client.export_shards([(date(2000, 1, 1), date(2024, 12, 31))])
+    assert len(shards) == goe_api.MAX_SHARDS
+    assert shards[0][0] == date(2000, 1, 1) and shards[-1][1] == date(2024, 12, 31)
+
+    client.window_support = False
+    assert client.export_shards(windows) == [(None, None)]
+
+
+def test_store_coverage(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    assert not store.covers('1', date(2024, 3, 31), date(2024, 3, 1))
+
+    store.add_sessions('1', SESSIONS, datetime(2024, 4, 2, 8), covered_from=date(2024, 3, 1))
+    assert store.covered_from('1') == date(2024, 3, 1)
+    assert store.covers('1', date(2024, 3, 31), date(2024, 3, 1))
+    assert store.covers('1', date(2024, 4, 1), date(2024, 3, 15))
+    assert not store.covers('1', date(2024, 4, 2), date(2024, 3, 1))
+    assert not store.covers('1', date(2024, 3, 31), date(2024, 2, 29))
+    assert not store.covers('1', date(2024, 3, 31))
+
+    # Weitere Exporte verschieben den Beginn nicht
+    store.add_sessions('1', SESSIONS, datetime(2024, 5, 2, 8))
+    assert store.covered_from('1') == date(2024, 3, 1)
+    assert store.last_fetch('1') == datetime(2024, 5, 2, 8)
+
+    store.extend_coverage('1', date(2024, 1, 1))
+    assert store.covered_from('1') == date(2024, 1, 1)
+    store.extend_coverage('1', date(2024, 2, 1))
+    assert store.covered_from('1') == date(2024, 1, 1)
+    store.extend_coverage('1', None)
+    assert store.covered_from('1') is None
+    assert store.covers('1', date(2024, 4, 30))
+
+
+def test_fetch_requests_only_missing_windows(make_stub, tmp_path):
+    stub = make_stub()
+    config = stub.charger_config('111111')
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retry_delay=0.01, shard_days=30, **stub.client_options())
+    end_date = date.today() - timedelta(days=1)
+
+    start_date = end_date - timedelta(days=59)
+    sessions = goe_api.fetch_sessions(config, start_date, end_date, store, client=client)
+    assert len(sessions) == len(expected_sessions(stub, '111111', start_date, end_date))
+    # Ohne gespeicherte ältere Ladevorgänge belegt der erste Export nichts
+    assert client.window_support is None
+    first = tickets(stub)
+    assert len(first) == 1 and to_date(first[0]['from']) == start_date - goe_api.WINDOW_MARGIN
+    assert store.covered_from('111111') == start_date
+
+    # Zeitraum liegt vollständig vor: kein weiterer Export
+    goe_api.fetch_sessions(config, start_date + timedelta(days=10), end_date - timedelta(days=10), store,
+                           client=client)
+    assert len(tickets(stub)) == 1
+
+    # Der Abruf ab dem neuesten Ladevorgang lässt die gespeicherten älteren aus
+    goe_api.refresh_sessions(config, store, client=client)
+    assert client.window_support is True
+    assert len(tickets(stub)) == 2
+
+    # Früherer Beginn: nur der Zeitraum davor wird (in Abschnitten) exportiert
+    earlier = start_date - timedelta(days=120)
+    sessions = goe_api.fetch_sessions(config, earlier, end_date, store, client=client)
+    expected = expected_sessions(stub, '111111', earlier, end_date)
+    assert len(sessions) == len(expected)
+    assert list(sessions['Start']) == list(expected['Start'])
+    assert store.covered_from('111111') == earlier
+    head = [params for params in tickets(stub)[2:] if to_date(params['to']) <= start_date + goe_api.WINDOW_MARGIN]
+    assert len(head) == 4
+    assert min(to_date(params['from']) for params in head) == earlier - goe_api.WINDOW_MARGIN
+
+
+def test_unscoped_export_falls_back_to_full_history(make_stub, tmp_path):
+    stub = make_stub(failures={'unscoped'})
+    config = stub.charger_config('111111')
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retry_delay=0.01, shard_days=30, **stub.client_options())
+    end_date = date.today() - timedelta(days=1)
+
+    start_date = end_date - timedelta(days=59)
+    sessions = goe_api.fetch_sessions(config, start_date, end_date, store, client=client)
+    # Der Export enthielt die gesamte Historie; übernommen wird nur der angefragte Zeitraum
+    assert client.window_support is False
+    assert len(sessions) == len(expected_sessions(stub, '111111', start_date, end_date))
+
+    earlier = start_date - timedelta(days=120)
+    sessions = goe_api.fetch_sessions(config, earlier, end_date, store, client=client)
+    assert len(sessions) == len(expected_sessions(stub, '111111', earlier, end_date))
+    second = tickets(stub)[1:]
+    assert len(second) == 1 and 'from' not in second[0] and 'to' not in second[0]
+    assert store.covered_from('111111') is None
+
+
+def test_charger_without_older_sessions_is_not_sharded(make_stub, tmp_path):
+    # Die Wallbox hat keine Ladevorgänge vor dem Zeitraum, der Stub ignoriert from/to
+    stub = make_stub(failures={'unscoped'}, span_days=30)
+    config = stub.charger_config('111111')
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retry_delay=0.01, shard_days=30, **stub.client_options())
+    end_date = date.today() - timedelta(days=1)
+
+    start_date = end_date - timedelta(days=59)
+    goe_api.fetch_sessions(config, start_date, end_date, store, client=client)
+    assert client.window_support is None
+
+    # Ohne Beleg ein einziger Export statt paralleler Abschnitte
+    earlier = start_date - timedelta(days=120)
+    sessions = goe_api.fetch_sessions(config, earlier, end_date, store, client=client)
+    assert len(sessions) == len(expected_sessions(stub, '111111', earlier, end_date))
+    second = tickets(stub)[1:]
+    assert len(second) == 1 and to_date(second[0]['from']) == earlier - goe_api.WINDOW_MARGIN
+    assert 'to' not in second[0]
+
+    # Der Abruf ab dem neuesten Ladevorgang enthält die gespeicherten älteren: keine Unterstützung
+    goe_api.refresh_sessions(config, store, client=client)
+    assert client.window_support is False
+    goe_api.refresh_sessions(config, store, client=client)
+    assert 'from' not in tickets(stub)[-1]
@@ -0,0 +1,84 @@
+"""Tests für die Flottenauswertung."""
+
+# Standard Library Imports
+from argparse import Namespace
+from datetime import date, datetime, timedelta
+
+# Third Party Imports
+import pandas as pd
+import pytest
+
+# Local Imports
+import fleet
+from batch import date_range, EXIT_USAGE
+from session_store import SessionStore
+
+
+START, END = date(2024, 3, 1), date(2024, 3, 31)
+
+# OFFICE wird von A ohne ID-Chip und von B mit 'Chip 1' genutzt
+JOBS = [
+    {'employee': 'A', 'serial_number': 'OFFICE', 'price': '0.30'},
+    {'employee': 'B', 'serial_number': 'OFFICE', 'price': '0.30', 'id_chips': ['Chip 1']},
+    {'employee': 'C', 'serial_number': 'HOME', 'price': '0.40'},
+]
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    store.add_sessions('OFFICE', pd.DataFrame({
+        'Start': pd.to_datetime(['2024-03-04 08:00', '2024-03-05 09:00']),
+        'Ende': pd.to_datetime(['2024-03-04 12:00', '2024-03-05 12:00']),
+        'Energie [kWh]': [5.0, 7.0],
+        'ID Chip': ['Chip 1', 'Chip 2']
+    }), datetime(2024, 4, 2))
+    store.add_sessions('HOME', pd.DataFrame({
+        'Start': pd.to_datetime(['2024-03-10 18:00']),
+        'Ende': pd.to_datetime(['2024-03-10 22:00']),
+        'Energie [kWh]': [10.0]
+    }), datetime(2024, 4, 2))
+    return fleet.load_fleet_sessions(JOBS, START, END, store=store)
+
+
+def test_shared_charger_counts_sessions_once(sessions):
+    summary = fleet.fleet_summary(sessions, JOBS, START, END, 'charger')
+    office = summary['groups'].loc['OFFICE']
+    assert office['sessions'] == 2
+    assert office['wh'] == 12000
+    assert office['cents'] == 360
+    assert summary['monthly'].loc['OFFICE'].sum() == 12000
+    assert summary['groups'].loc['HOME', 'cents'] == 400
+    assert summary['totals']['sessions'] == 3
+    assert summary['totals']['cents'] == 760
+
+
+def test_shared_charger_belongs_to_each_employee(sessions):
+    summary = fleet.fleet_summary(sessions, JOBS, START, END, 'employee')
+    groups = summary['groups']
+    assert groups.loc['A', 'sessions'] == 2 and groups.loc['A', 'wh'] == 12000
+    assert groups.loc['B', 'sessions'] == 1 and groups.loc['B', 'wh'] == 5000
+    # Flottensummen zählen jeden Ladevorgang nur einmal
+    assert summary['totals']['sessions'] == 3
+    assert summary['totals']['wh'] == 22000
+
+
+def period(start=None, end=None, month=None, year=None):
+    return date_range(Namespace(start=start, end=end, month=month, year=year))
+
+
+def test_date_range_from_arguments():
+    assert period(start='2024-01-15', end='2024-02-10') == (date(2024, 1, 15), date(2024, 2, 10))
+    assert period(month='2024-02') == (date(2024, 2, 1), date(2024, 2, 29))
+    assert period(year=2023) == (date(2023, 1, 1), date(2023, 12, 31))
+    last_month = date.today().replace(day=1) - timedelta(days=1)
+    assert period() == (last_month.replace(day=1), last_month)
+    with pytest.raises(ValueError):
+        period(start='2024-01-15')
+    with pytest.raises(ValueError):
+        period(start='2024-02-10', end='2024-01-15')
+
+
+def test_fleet_cli_rejects_incomplete_range(tmp_path, capsys):
+    assert fleet.main([str(tmp_path / 'flotte.json'), '--end', '2024-03-31']) == EXIT_USAGE
+    assert "--start und --end" in capsys.readouterr().err
@@ -0,0 +1,164 @@
+"""Tests für Statusabfrage, Wiederholungen und Ausweichen auf die Cloud gegen den Stub der go-e APIs."""
+
+# Standard Library Imports
+import time
+
+# Third Party Imports
+import pytest
+
+# Local Imports
+import goe_api
+
+
+def dll_requests(stub, kind):
+    """Anzahl der DLL-Abfragen an die lokale ('charger') oder die Cloud API ('cloud')."""
+    return len([path for _, path, _ in stub.requests if path.startswith(f"/{kind}/")])
+
+
+class RecordingEvent:
+    """Ersatz für threading.Event: merkt sich die Wartezeiten und bricht nach stop_after ab."""
+
+    def __init__(self, stop_after):
+        self.waits = []
+        self.stop_after = stop_after
+
+    def is_set(self):
+        return False
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        return len(self.waits) >= self.stop_after
+
+
+def test_estimate_remaining():
+    assert goe_api.estimate_remaining([]) is None
+    assert goe_api.estimate_remaining([(0.0, 10.0)]) is None
+    # Kein Fortschritt oder keine Zeit vergangen: keine Schätzung
+    assert goe_api.estimate_remaining([(0.0, 40.0), (2.0, 40.0)]) is None
+    assert goe_api.estimate_remaining([(1.0, 10.0), (1.0, 20.0)]) is None
+    assert goe_api.estimate_remaining([(0.0, 0.0), (1.0, 10.0), (2.0, 50.0)]) == pytest.approx(2.0)
+    assert goe_api.estimate_remaining([(0.0, 0.0), (1.0, 100.0)]) == 0.0
+
+
+def test_poll_backoff_sequence(make_stub):
+    # Der Export wird nie fertig und meldet keinen Fortschritt
+    stub = make_stub(failures={'timeout'})
+    client = goe_api.GoeApiClient(**stub.client_options())
+    ticket = client.get_ticket(client.get_export_url(stub.charger_config('111111')))
+
+    event = RecordingEvent(stop_after=12)
+    with pytest.raises(goe_api.Cancelled):
+        client.poll_export(ticket, cancel_event=event)
+
+    expected, delay = [], goe_api.POLL_INITIAL_DELAY
+    for _ in range(12):
+        expected.append(delay)
+        delay = min(delay * goe_api.POLL_BACKOFF, goe_api.POLL_MAX_DELAY)
+    assert event.waits == pytest.approx(expected)
+    assert event.waits[0] == goe_api.POLL_INITIAL_DELAY and event.waits[-1] == goe_api.POLL_MAX_DELAY
+    assert len([path for _, path, _ in stub.requests if path == '/api/v1/get_status']) == 12
+
+
+def test_poll_waits_for_expected_completion(make_stub):
+    # Der Fortschritt steigt gleichmäßig; abgefragt wird nicht später als zur erwarteten Fertigstellung
+    stub = make_stub(export_seconds=2.0, progress_steps=20)
+    client = goe_api.GoeApiClient(**stub.client_options())
+    ticket = client.get_ticket(client.get_export_url(stub.charger_config('111111')))
+    bars = []
+
+    csv_data = client.poll_export(ticket, bars.append)
+    assert 'Start;Ende' in csv_data.splitlines()[0]
+    assert bars[-1] == [{'name': 'Export', 'progress': 100}]
+    polls = [at for at, path, _ in stub.requests if path == '/api/v1/get_status']
+    # Ohne Schätzung lägen zwischen den Abfragen bis zu POLL_MAX_DELAY Sekunden
+    assert max(later - earlier for earlier, later in zip(polls, polls[1:])) < 1.5
+    assert polls[-1] - polls[0] < 2.0 + 1.5
+
+
+def test_poll_timeout(make_stub):
+    stub = make_stub(failures={'timeout'})
+    client = goe_api.GoeApiClient(**stub.client_options())
+    ticket = client.get_ticket(client.get_export_url(stub.charger_config('111111')))
+    with pytest.raises(Exception, match='Timeout'):
+        client.poll_export(ticket, deadline=time.monotonic() + 0.5)
+
+
+def test_retry_backoff_sequence(make_stub, monkeypatch):
+    stub = make_stub(failures={'ticket_error'})
+    client = goe_api.GoeApiClient(retries=3, retry_delay=0.1, **stub.client_options())
+    export_url = client.get_export_url(stub.charger_config('111111'))
+    sleeps = []
+    monkeypatch.setattr(goe_api.random, 'uniform', lambda low, high: 1.0)
+    monkeypatch.setattr(goe_api.time, 'sleep', sleeps.append)
+
+    with pytest.raises(Exception, match='Ticket'):
+        client.get_ticket(export_url)
+    assert sleeps == pytest.approx([0.1, 0.2, 0.4])
+    assert len([path for _, path, _ in stub.requests if path == '/api/v1/get_ticket']) == 4
+
+
+def test_retry_recovers_from_rate_limit(make_stub):
+    # Jede zweite Anfrage wird mit 429 beantwortet
+    stub = make_stub(failures={'rate_limit'})
+    client = goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options())
+    sessions = client.export_sessions(stub.charger_config('111111'))
+    assert len(sessions) == len(stub.sessions('111111'))
+
+
+def test_failing_endpoint_is_moved_down(make_stub):
+    stub = make_stub()
+    config = stub.charger_config('111111')
+    client = goe_api.GoeApiClient(**stub.client_options())
+    local, cloud = config['local_api_url'], client.cloud_url.format(serial='111111')
+    assert [url for url, _ in client.endpoints(config)] == [local, cloud]
+
+    client.mark_failure(local)
+    assert [url for url, _ in client.endpoints(config)] == [cloud, local]
+    # Die Sperrzeit verdoppelt sich je Fehler bis zur Obergrenze
+    client.mark_failure(local)
+    assert client.health[local][0] == 2
+    assert client.health[local][1] - time.monotonic() == pytest.approx(2 * goe_api.HEALTH_COOLDOWN, abs=1)
+    for _ in range(10):
+        client.mark_failure(local)
+    assert client.health[local][1] - time.monotonic() == pytest.approx(goe_api.HEALTH_MAX_COOLDOWN, abs=1)
+
+    client.mark_success(local)
+    assert [url for url, _ in client.endpoints(config)] == [local, cloud]
+    # Ohne Cloud API Key gibt es keinen Ausweichweg
+    assert [url for url, _ in client.endpoints(dict(config, cloud_api_key=''))] == [local]
+
+
+def test_switches_to_cloud_while_local_api_is_down(make_stub):
+    stub = make_stub(failures={'local_down'})
+    config = stub.charger_config('111111')
+    client = goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options())
+    local = config['local_api_url']
+
+    # Mit Ausweichweg nur ein Versuch an der lokalen API, dann die Cloud
+    assert client.get_export_url(config).endswith('?e=111111')
+    assert dll_requests(stub, 'charger') == 1 and dll_requests(stub, 'cloud') == 1
+    assert not client.is_healthy(local)
+
+    # Weitere Abrufe gehen direkt an die Cloud, solange die lokale API gesperrt ist
+    for _ in range(3):
+        client.get_export_url(config)
+    assert dll_requests(stub, 'charger') == 1 and dll_requests(stub, 'cloud') == 4
+
+    # Nach Ablauf der Sperrzeit wird die wieder erreichbare lokale API bevorzugt
+    stub.failures.discard('local_down')
+    client.health[local] = (1, time.monotonic() - 1)
+    client.get_export_url(config)
+    assert dll_requests(stub, 'charger') == 2 and dll_requests(stub, 'cloud') == 4
+    assert local not in client.health
+
+
+def test_both_endpoints_down(make_stub):
+    stub = make_stub(failures={'local_down', 'cloud_down'})
+    config = stub.charger_config('111111')
+    client = goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options())
+    with pytest.raises(Exception, match='Lokale und Cloud API'):
+        client.get_export_url(config)
+    assert not client.is_healthy(config['local_api_url'])
+    assert not client.is_healthy(client.cloud_url.format(serial='111111'))
+    # Die Cloud als letzter Ausweg wird mit Wiederholungen abgefragt
+    assert dll_requests(stub, 'charger') == 1 and dll_requests(stub, 'cloud') == client.retries + 1
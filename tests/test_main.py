@@ -0,0 +1,117 @@
+"""Tests für den Hintergrund-Worker der GUI, ohne ein Tk-Fenster zu öffnen."""
+
+# Standard Library Imports
+import queue
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Third Party Imports
+import pytest
+
+# Local Imports
+import goe_api
+import perf_log
+import report
+from session_store import SessionStore
+
+pytest.importorskip('tkcalendar')
+import main
+
+
+class HeadlessApp:
+    """Die Anwendung ohne Fenster: Widgets und root.after werden durch Aufzeichnungen ersetzt."""
+
+    def __init__(self, tmp_path):
+        app = main.GoeChargerApp.__new__(main.GoeChargerApp)
+        app.progress_queue = queue.Queue()
+        app.cancel_event = threading.Event()
+        app._session_store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+        app.status_label = {'text': ''}
+        app.root = SimpleNamespace(after=lambda ms, callback: None)
+        self.bars, self.finished, self.statuses = [], [], []
+        app.update_progress_bars = self.bars.append
+        app.finish_report = lambda kind, payload: self.finished.append((kind, payload))
+        self.app = app
+        self.log = perf_log.PerfLog(str(tmp_path / 'perf.jsonl'), keep=True)
+
+    def start(self, config, spec, period_dir=None):
+        trace = perf_log.Trace('report', self.log)
+        self.thread = threading.Thread(target=self.app.report_worker,
+                                       args=(config, spec, period_dir, trace, self.app.cancel_event), daemon=True)
+        self.thread.start()
+
+    def drain(self, until, timeout=10):
+        """Verarbeitet die Queue wie der GUI-Thread, bis until() erfüllt oder der Bericht beendet ist."""
+        deadline = time.monotonic() + timeout
+        while not self.finished and not until() and time.monotonic() < deadline:
+            self.app.process_progress_queue()
+            self.statuses.append(self.app.status_label['text'])
+            time.sleep(0.02)
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    """Startet einen Stub und richtet den Client des Workers auf ihn aus."""
+    def start(make_stub, **options):
+        stub = make_stub(**options)
+        monkeypatch.setattr(goe_api, '_default_client', goe_api.GoeApiClient(**stub.client_options()))
+        return stub
+    return start
+
+
+def report_spec(tmp_path):
+    end_date = date.today() - timedelta(days=1)
+    return {'start_date': end_date - timedelta(days=30), 'end_date': end_date, 'price': 0.3,
+            'chart_format': 'vector', 'filename': str(tmp_path / 'bericht.pdf')}
+
+
+def test_cancel_stops_worker_during_export(make_stub, stub_client, tmp_path):
+    stub = stub_client(make_stub, export_seconds=20)
+    headless = HeadlessApp(tmp_path)
+    headless.start(stub.charger_config('111111'), report_spec(tmp_path))
+
+    # Abbrechen, sobald der Export Fortschritt meldet
+    headless.drain(lambda: headless.bars)
+    assert headless.bars and not headless.finished
+    headless.app.cancel_event.set()
+    cancelled_at = time.monotonic()
+    headless.drain(lambda: False)
+
+    assert headless.finished == [('cancelled', None)]
+    headless.thread.join(timeout=2)
+    assert not headless.thread.is_alive()
+    assert time.monotonic() - cancelled_at < 2
+    # Die Queue ist geleert, Statusmeldungen überschreiben den Abbruch nicht
+    assert headless.app.progress_queue.empty()
+    assert headless.app.status_label['text'] == 'Daten werden abgerufen ...'
+    assert headless.log.records[-1]['status'] == 'cancelled'
+    assert not (tmp_path / 'bericht.pdf').exists()
+
+
+def test_cancel_stops_period_reports(make_stub, stub_client, tmp_path, monkeypatch):
+    stub = stub_client(make_stub)
+    headless = HeadlessApp(tmp_path)
+    spec = report_spec(tmp_path)
+    spec['start_date'] = spec['end_date'] - timedelta(days=120)
+    period_dir = tmp_path / 'berichte'
+    period_dir.mkdir()
+
+    # Abbrechen, während der erste Monatsbericht erstellt wird; die übrigen entstehen nicht mehr
+    render_pdf = report.render_pdf
+
+    def render_and_cancel(model, period_spec):
+        headless.app.cancel_event.set()
+        return render_pdf(model, period_spec)
+
+    monkeypatch.setattr(report, 'render_pdf', render_and_cancel)
+    headless.start(stub.charger_config('111111'), spec, str(period_dir))
+    headless.drain(lambda: False)
+
+    assert headless.finished == [('cancelled', None)]
+    headless.thread.join(timeout=2)
+    assert not headless.thread.is_alive()
+    assert headless.app.progress_queue.empty()
+    assert len(list(period_dir.glob('*.pdf'))) == 1
+    assert not any(status.startswith('Bericht 2 von') for status in headless.statuses)
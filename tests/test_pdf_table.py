@@ -0,0 +1,68 @@
+"""Tests für das seitenweise Schreiben der Berichtstabelle."""
+
+# Standard Library Imports
+import re
+from datetime import date
+from decimal import Decimal
+
+# Third Party Imports
+import pandas as pd
+import pytest
+
+# Local Imports
+import report
+
+pymupdf = pytest.importorskip('pymupdf')
+
+TIMESTAMP = re.compile(r'\d\d\.\d\d\.\d{4} \d\d:\d\d$')
+
+
+def table_pages(filename):
+    """Liest je Seite Übertrag, Zeilen (kWh, EUR), Zwischensumme und Kopf aus dem PDF."""
+    document = pymupdf.open(filename)
+    assert not document.is_repaired
+    pages = []
+    for page in document:
+        lines = page.get_text().splitlines()
+        found = {'header': False, 'carry': None, 'subtotal': None, 'rows': []}
+        for i, line in enumerate(lines):
+            if lines[i:i + 4] == ['Start', 'Ende', 'kWh', 'EUR']:
+                found['header'] = True
+            elif line == 'Übertrag':
+                found['carry'] = tuple(Decimal(value) for value in lines[i + 1:i + 3])
+            elif line == 'Zwischensumme':
+                found['subtotal'] = tuple(Decimal(value) for value in lines[i + 1:i + 3])
+            elif TIMESTAMP.match(line) and i + 1 < len(lines) and TIMESTAMP.match(lines[i + 1]):
+                found['rows'].append(tuple(Decimal(value) for value in lines[i + 2:i + 4]))
+        pages.append((found, lines))
+    return pages
+
+
+def test_multi_page_report_carries_totals(tmp_path):
+    sessions = pd.DataFrame({
+        'Start': pd.date_range('2024-01-01 18:00', periods=150, freq='12h'),
+        'Energie [kWh]': [1.005 + 0.01 * (i % 7) for i in range(150)]
+    })
+    sessions['Ende'] = sessions['Start'] + pd.Timedelta(hours=2)
+    filename = report.generate_pdf(sessions, {
+        'start_date': date(2024, 1, 1), 'end_date': date(2024, 3, 31), 'price': '0,30', 'mode': 'sessions',
+        'chart_format': 'vector', 'filename': str(tmp_path / 'bericht.pdf')})
+
+    pages = [page for page in table_pages(filename) if page[0]['rows']]
+    assert len(pages) >= 3
+    assert sum(len(page['rows']) for page, _ in pages) == len(sessions)
+
+    running = (Decimal(0), Decimal(0))
+    for i, (page, _) in enumerate(pages):
+        # Kopf auf jeder Seite, Übertrag ab der zweiten Seite gleich der vorherigen Zwischensumme
+        assert page['header']
+        assert page['carry'] == (running if i else None)
+        running = tuple(total + sum(row[j] for row in page['rows']) for j, total in enumerate(running))
+        if i < len(pages) - 1:
+            assert page['subtotal'] == running
+        else:
+            assert page['subtotal'] is None
+
+    text = '\n'.join('\n'.join(lines) for _, lines in table_pages(filename))
+    assert f"Gesamtenergie:\n{running[0]:.2f} kWh" in text
+    assert f"Gesamtkosten:\n{running[1]:.2f} EUR" in text
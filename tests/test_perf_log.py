@@ -0,0 +1,77 @@
+"""Tests für die Laufzeitmessung: Protokolleinträge (JSON Lines) und Prometheus-Metriken."""
+
+# Standard Library Imports
+import json
+
+# Third Party Imports
+import pytest
+
+# Local Imports
+import perf_log
+
+
+def test_trace_writes_one_json_line(tmp_path):
+    path = tmp_path / 'perf.jsonl'
+    log = perf_log.PerfLog(str(path), keep=True)
+
+    with perf_log.Trace('batch_job', log, charger='111111') as trace:
+        with perf_log.stage('parse'):
+            perf_log.count('rows_parsed', 120)
+        perf_log.count('rows_parsed', 30)
+        perf_log.count('polls')
+    # Nur der erste Abschluss wird geschrieben
+    assert trace.finish('failed')['status'] == 'ok'
+    # Ohne aktiven Trace wird nichts gezählt
+    perf_log.count('polls')
+
+    with pytest.raises(ValueError):
+        with perf_log.Trace('batch_job', log, charger='222222'):
+            raise ValueError("kaputt")
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 2
+    first, second = (json.loads(line) for line in lines)
+    assert first['name'] == 'batch_job' and first['status'] == 'ok' and first['charger'] == '111111'
+    assert first['counters'] == {'rows_parsed': 150, 'polls': 1}
+    assert list(first['stages']) == ['parse'] and first['stages']['parse'] >= 0
+    assert first['process_peak_rss_mb'] > 0
+    assert 0 <= first['peak_rss_growth_mb'] <= first['process_peak_rss_mb']
+    assert 'peak_rss_mb' not in first
+    assert second['status'] == 'failed' and second['error'] == 'kaputt'
+    assert log.records == [first, second]
+
+
+def test_prometheus_text():
+    records = [
+        {'status': 'ok', 'duration': 2.0, 'stages': {'parse': 0.5, 'chart': 0.25},
+         'counters': {'polls': 3}, 'process_peak_rss_mb': 100.0, 'peak_rss_growth_mb': 10.0},
+        {'status': 'ok', 'duration': 1.0, 'stages': {'parse': 1.5}, 'counters': {'polls': 2, 'reports': 1},
+         'process_peak_rss_mb': 150.0, 'peak_rss_growth_mb': 50.0},
+        {'status': 'timeout', 'duration': 4.0, 'stages': {}, 'counters': {}, 'process_peak_rss_mb': None}
+    ]
+    lines = perf_log.prometheus_text(records).splitlines()
+
+    assert 'goe_report_total{status="ok"} 2' in lines
+    assert 'goe_report_total{status="timeout"} 1' in lines
+    assert 'goe_report_duration_seconds_sum 7.0000' in lines
+    assert 'goe_report_duration_seconds_count 3' in lines
+    assert 'goe_report_duration_seconds_max 4.0000' in lines
+    assert 'goe_report_stage_seconds_sum{stage="parse"} 2.0000' in lines
+    assert 'goe_report_stage_seconds_count{stage="parse"} 2' in lines
+    assert 'goe_report_stage_seconds_max{stage="parse"} 1.5000' in lines
+    assert 'goe_report_stage_seconds_max{stage="chart"} 0.2500' in lines
+    assert 'goe_report_polls_total 5' in lines
+    assert 'goe_report_reports_total 1' in lines
+    assert f"goe_report_process_peak_rss_bytes {150 * 1024 * 1024}" in lines
+    # Jede Metrik hat eine TYPE-Zeile vor ihren Werten
+    for line in lines:
+        if not line.startswith('#'):
+            name = line.split('{')[0].split(' ')[0]
+            base = name.rsplit('_sum', 1)[0].rsplit('_count', 1)[0]
+            assert any(f"# TYPE {base} " in other or f"# TYPE {name} " in other for other in lines)
+
+
+def test_prometheus_text_without_memory():
+    text = perf_log.prometheus_text([{'status': 'ok', 'duration': 1.0}])
+    assert 'peak_rss' not in text
+    assert text.endswith('\n')
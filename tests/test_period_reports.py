@@ -0,0 +1,43 @@
+"""Tests für Berichte je Zeitraum aus einem Abruf."""
+
+# Standard Library Imports
+import os
+from datetime import date
+
+# Third Party Imports
+import pandas as pd
+
+# Local Imports
+import report
+
+
+SESSIONS = pd.DataFrame({
+    'Start': pd.to_datetime(['2024-01-10 18:00', '2024-02-12 19:00']),
+    'Ende': pd.to_datetime(['2024-01-10 20:00', '2024-02-12 22:00']),
+    'Energie [kWh]': [10.0, 15.0]
+})
+
+
+def spec(**values):
+    return dict({'start_date': date(2024, 1, 1), 'end_date': date(2024, 2, 29), 'price': '0,30',
+                 'chart_format': 'vector'}, **values)
+
+
+def test_period_reports_are_named_after_driver(tmp_path):
+    first = report.generate_period_reports(SESSIONS, spec(employee='Erika Müller'), 'month', str(tmp_path))
+    second = report.generate_period_reports(SESSIONS, spec(license_plate='M-GO 42', employee='Max'), 'month',
+                                            str(tmp_path))
+
+    assert [os.path.basename(name) for name in first] == [
+        'goe_charger_bericht_Erika_Mueller_20240101_20240131.pdf',
+        'goe_charger_bericht_Erika_Mueller_20240201_20240229.pdf',
+        'goe_charger_bericht_Erika_Mueller_uebersicht_20240101_20240229.pdf']
+    assert not set(first) & set(second)
+    assert len(os.listdir(tmp_path)) == 6
+
+
+def test_period_prefix_matches_single_report():
+    values = spec(license_plate='M-GO 42')
+    assert report.report_filename(values).startswith(report.report_prefix(values) + '_2024')
+    assert report.report_prefix(spec()) == 'goe_charger_bericht'
+    assert report.report_prefix(spec(filename_prefix='flotte_03')) == 'flotte_03'
@@ -0,0 +1,121 @@
+"""Tests für den Vorababruf gegen den Stub der go-e APIs."""
+
+# Standard Library Imports
+import io
+import json
+import random
+import threading
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs
+
+# Local Imports
+import goe_api
+import prefetch
+from batch import EXIT_OK, EXIT_FAILED
+from session_store import SessionStore
+
+
+def tickets(stub):
+    """Angeforderte Exporte: Liste von (Seriennummer, Parameter)."""
+    result = []
+    for _, path, query in stub.requests:
+        if path == '/api/v1/get_ticket':
+            params = parse_qs(query)
+            result.append((params['e'][0], params))
+    return result
+
+
+def stored(store, serial):
+    return store.query_chargers([(serial, None)], date(1970, 1, 1), date.today())
+
+
+def test_prefetch_fetches_each_charger_once(make_stub, tmp_path):
+    stub = make_stub()
+    shared = stub.charger_config('111111')
+    jobs = [dict(shared, employee='A', id_chips=['Chip 1']), dict(shared, employee='B', id_chips=['Chip 2']),
+            dict(stub.charger_config('222222'), employee='C')]
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options())
+
+    results = prefetch.prefetch_all(jobs, store, client=client, stream=None)
+
+    assert [(r['charger'], r['status']) for r in results] == [('111111', 'ok'), ('222222', 'ok')]
+    assert sorted(serial for serial, _ in tickets(stub)) == ['111111', '222222']
+    for serial in ('111111', '222222'):
+        expected = stub.sessions(serial)
+        assert len(stored(store, serial)) == len(expected)
+        assert store.covers(serial, date.today() - timedelta(days=1), date(2000, 1, 1))
+        assert results[['111111', '222222'].index(serial)]['new_sessions'] == len(expected)
+
+
+def test_second_run_only_exports_new_sessions(make_stub, tmp_path):
+    stub = make_stub()
+    jobs = [stub.charger_config('111111')]
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retry_delay=0.01, **stub.client_options())
+
+    prefetch.prefetch_all(jobs, store, client=client, stream=None)
+    first = tickets(stub)
+    results = prefetch.prefetch_all(jobs, store, client=client, stream=None)
+
+    assert results[0]['new_sessions'] == 0
+    assert len(stored(store, '111111')) == len(stub.sessions('111111'))
+    # Erster Abruf ohne Zeitraum (neue Wallbox), danach nur ab dem neuesten gespeicherten Ladevorgang
+    assert 'from' not in first[0][1]
+    _, params = tickets(stub)[-1]
+    last_start = stub.sessions('111111')['Start'].max()
+    assert datetime.fromtimestamp(int(params['from'][0]) / 1000) <= last_start
+    assert datetime.fromtimestamp(int(params['from'][0]) / 1000) >= last_start - timedelta(days=2)
+
+
+def test_failed_charger_is_reported_and_others_continue(make_stub, tmp_path):
+    stub = make_stub(failures=('ticket_error',))
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    client = goe_api.GoeApiClient(retries=0, retry_delay=0.01, **stub.client_options())
+    stream = io.StringIO()
+
+    results = prefetch.prefetch_all([stub.charger_config('111111'), stub.charger_config('222222')], store,
+                                    client=client, stream=stream)
+
+    assert [r['status'] for r in results] == ['failed', 'failed']
+    assert all(r['error'] for r in results)
+    assert store.last_fetch('111111') is None
+    assert stream.getvalue().count('failed') == 2
+
+
+def test_stop_event_ends_prefetch_before_next_charger(make_stub, tmp_path):
+    stub = make_stub()
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    stop_event = threading.Event()
+    stop_event.set()
+
+    results = prefetch.prefetch_all([stub.charger_config('111111')], store, window=60,
+                                    client=goe_api.GoeApiClient(**stub.client_options()),
+                                    stop_event=stop_event, stream=None)
+
+    assert results == []
+    assert tickets(stub) == []
+
+
+def test_stagger_spreads_fetches_over_window():
+    offsets = prefetch.stagger(10, 3600, random.Random(1))
+    assert offsets == sorted(offsets)
+    assert all(i * 360 <= offset < (i + 1) * 360 for i, offset in enumerate(offsets))
+    assert prefetch.stagger(3, 0) == [0.0, 0.0, 0.0]
+
+
+def test_next_run():
+    assert prefetch.next_run(datetime(2024, 5, 1, 1, 0), '02:00') == datetime(2024, 5, 1, 2, 0)
+    assert prefetch.next_run(datetime(2024, 5, 1, 2, 0), '02:00') == datetime(2024, 5, 2, 2, 0)
+
+
+def test_main_once_exit_codes(make_stub, tmp_path):
+    stub = make_stub()
+    manifest = tmp_path / 'flotte.json'
+    manifest.write_text(json.dumps({'jobs': [stub.charger_config('111111')]}), encoding='utf-8')
+    args = [str(manifest), '--once', '--db', str(tmp_path / 'sessions.sqlite'),
+            '--cloud-url', stub.client_options()['cloud_url'], '--data-url', stub.client_options()['data_url']]
+
+    assert prefetch.main(args) == EXIT_OK
+    stub.failures.add('ticket_error')
+    assert prefetch.main(args) == EXIT_FAILED
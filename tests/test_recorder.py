@@ -0,0 +1,226 @@
+"""Tests für die Aufzeichnung über die lokale API und die Übernahme in den Sitzungsspeicher."""
+
+# Standard Library Imports
+import time
+import threading
+from datetime import date, datetime, timedelta
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Local Imports
+import goe_api
+import recorder
+from session_store import SessionStore
+
+
+def samples(start, end, sessions, gaps=(), step=600):
+    """Erzeugt Messwerte alle step Sekunden; sessions als (Anstecken, Abstecken, Wh), gaps als (von, bis)."""
+    times = pd.date_range(start, end, freq=f"{step}s")
+    for gap_start, gap_end in gaps:
+        times = times[(times < pd.Timestamp(gap_start)) | (times >= pd.Timestamp(gap_end))]
+    car = np.ones(len(times), dtype='uint8')
+    eto = np.zeros(len(times), dtype='int64')
+    for plug, unplug, wh in sessions:
+        plug, unplug = pd.Timestamp(plug), pd.Timestamp(unplug)
+        car[(times >= plug) & (times < unplug)] = 2
+        share = np.clip((times - plug) / (unplug - plug), 0, 1)
+        eto += np.round(share * wh).astype('int64')
+    data = np.zeros(len(times), dtype=recorder.SAMPLE_DTYPE)
+    # Gespeichert wird UTC; die Angaben hier sind Ortszeiten wie im Export
+    data['time'] = [recorder.epoch_ms(value) for value in times]
+    data['eto'] = 100000 + eto
+    data['car'] = car
+    return data
+
+
+def export(*sessions):
+    """Ladevorgänge wie aus einem Export: (Start, Ende, kWh)."""
+    return pd.DataFrame({'Start': pd.to_datetime([s for s, _, _ in sessions]),
+                         'Ende': pd.to_datetime([e for _, e, _ in sessions]),
+                         'Energie [kWh]': [kwh for _, _, kwh in sessions]})
+
+
+def test_sessions_missed_during_gap_come_from_next_export(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    store.add_sessions('111111', export(('2024-04-30 18:00', '2024-04-30 20:00', 7.0)), datetime(2024, 5, 1, 6, 0))
+
+    # Aufzeichnung ab dem Export, Lücke vom 01.05. 20:00 bis 03.05. (Ladevorgang am 02.05. verpasst)
+    recorder.write_samples(root, '111111', samples(
+        '2024-05-01 05:00', '2024-05-03 23:00',
+        [('2024-05-01 14:00', '2024-05-01 16:00', 5000), ('2024-05-03 09:00', '2024-05-03 11:00', 4000)],
+        gaps=[('2024-05-01 20:05', '2024-05-03 00:00')]))
+
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 1}
+    assert store.last_fetch('111111') == datetime(2024, 5, 1, 20, 0)
+    # Weitere Übernahmen (nach jedem Schreiben des Recorders) lassen die Zeit nach der Lücke aus
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 0}
+    assert not store.covers('111111', date(2024, 5, 3), date(2024, 5, 1))
+
+    # Der nächste Export liefert die Ladevorgänge ab dem neuesten gespeicherten, auch den verpassten
+    added = store.add_sessions('111111', export(
+        ('2024-04-30 18:00', '2024-04-30 20:00', 7.0), ('2024-05-01 14:00', '2024-05-01 16:00', 5.0),
+        ('2024-05-02 10:00', '2024-05-02 12:00', 6.0), ('2024-05-03 09:00', '2024-05-03 11:00', 4.0)),
+        datetime(2024, 5, 4, 6, 0))
+
+    assert added == 2
+    stored = store.query('111111', date(2024, 5, 1), date(2024, 5, 3))
+    assert stored['Start'].dt.strftime('%d.%m. %H:%M').tolist() == ['01.05. 14:00', '02.05. 10:00', '03.05. 09:00']
+    assert stored['Energie [kWh]'].tolist() == [5.0, 6.0, 4.0]
+    assert store.covers('111111', date(2024, 5, 3), date(2024, 5, 1))
+
+
+def test_recording_started_after_export_is_not_stored(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    store.add_sessions('111111', export(('2024-04-30 18:00', '2024-04-30 20:00', 7.0)), datetime(2024, 5, 1, 6, 0))
+    recorder.write_samples(root, '111111', samples('2024-05-03 00:00', '2024-05-03 23:00',
+                                                   [('2024-05-03 09:00', '2024-05-03 11:00', 4000)]))
+
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 0}
+    added = store.add_sessions('111111', export(('2024-05-02 10:00', '2024-05-02 12:00', 6.0),
+                                                ('2024-05-03 09:00', '2024-05-03 11:00', 4.0)),
+                               datetime(2024, 5, 4, 6, 0))
+    assert added == 2
+
+
+def test_gap_free_recording_continues_last_export(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    store.add_sessions('111111', export(('2024-04-30 18:00', '2024-04-30 20:00', 7.0)), datetime(2024, 5, 1, 6, 0))
+    recorder.write_samples(root, '111111', samples(
+        '2024-05-01 05:00', '2024-05-04 08:00',
+        [('2024-05-02 10:00', '2024-05-02 12:00', 6000), ('2024-05-03 09:00', '2024-05-03 11:00', 4000)]))
+
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 2}
+    assert store.covers('111111', date(2024, 5, 3), date(2024, 4, 1))
+    # Erneutes Übernehmen ändert nichts
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 0}
+
+
+def test_recorder_only_charger_is_covered_offline(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    sessions = [(f"2024-05-{day:02d} 18:00", f"2024-05-{day:02d} 21:00", 9000) for day in range(1, 10)]
+    recorder.write_samples(root, '111111', samples('2024-05-01 10:00', '2024-05-10 12:00', sessions))
+
+    # Erster Tag unvollständig aufgezeichnet: abgedeckt ab dem 02.05.
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 8}
+    assert store.covered_from('111111') == date(2024, 5, 2)
+    assert store.covers('111111', date(2024, 5, 9), date(2024, 5, 2))
+    assert not store.covers('111111', date(2024, 5, 9), date(2024, 5, 1))
+
+    # Bericht ohne Export: der Client zeigt auf einen nicht erreichbaren Port
+    client = goe_api.GoeApiClient(retries=0, cloud_url='http://127.0.0.1:9/{serial}', data_url='http://127.0.0.1:9')
+    config = {'serial_number': '111111', 'local_api_url': 'http://127.0.0.1:9', 'api_type': 'local'}
+    result = goe_api.fetch_sessions(config, date(2024, 5, 2), date(2024, 5, 9), store, client=client)
+    assert len(result) == 8
+    assert result['Energie [kWh]'].tolist() == [9.0] * 8
+
+
+def test_recorder_only_charger_without_full_day_is_not_covered(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    recorder.write_samples(root, '111111', samples('2024-05-01 10:00', '2024-05-01 23:00',
+                                                   [('2024-05-01 12:00', '2024-05-01 13:00', 2000)]))
+    assert recorder.sync_store(root, store, max_gap=1800) == {'111111': 0}
+    assert store.last_fetch('111111') is None
+
+
+def test_rebuild_sessions_skips_incomplete_sessions():
+    data = samples('2024-05-01 00:00', '2024-05-01 23:00',
+                   [('2024-04-30 22:00', '2024-05-01 02:00', 4000), ('2024-05-01 10:00', '2024-05-01 12:00', 3000),
+                    ('2024-05-01 22:00', '2024-05-02 02:00', 4000)])
+    sessions = recorder.rebuild_sessions(data)
+    assert sessions['Start'].tolist() == [pd.Timestamp('2024-05-01 10:00')]
+    assert sessions['Ende'].tolist() == [pd.Timestamp('2024-05-01 12:00')]
+    assert sessions['Energie [kWh]'].tolist() == [3.0]
+
+
+def test_ring_buffer_keeps_newest_samples():
+    buffer = recorder.RingBuffer(capacity=3)
+    for i in range(5):
+        buffer.append(i, i * 10, 1)
+    assert buffer.dropped == 2
+    assert buffer.drain()['time'].tolist() == [2, 3, 4]
+    assert len(buffer) == 0
+
+
+def test_samples_stay_ordered_when_clocks_go_back(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    time.tzset()
+    try:
+        # 27.10.2024: um 03:00 Sommerzeit wird die Uhr auf 02:00 zurückgestellt (01:00 UTC)
+        times = pd.date_range('2024-10-26 22:00', '2024-10-27 04:00', freq='600s', tz='UTC')
+        data = np.zeros(len(times), dtype=recorder.SAMPLE_DTYPE)
+        data['time'] = times.as_unit('ms').asi8
+        plugged = (times >= pd.Timestamp('2024-10-27 00:30', tz='UTC')) & (times < pd.Timestamp('2024-10-27 01:40',
+                                                                                                 tz='UTC'))
+        data['car'] = np.where(plugged, 2, 1)
+        data['eto'] = 100000 + np.cumsum(plugged) * 500
+        assert (np.diff(data['time']) > 0).all()
+
+        sessions = recorder.rebuild_sessions(data)
+        # Angesteckt um 02:30 Sommerzeit, abgesteckt 70 Minuten später um 02:40 Winterzeit
+        assert sessions['Start'].tolist() == [pd.Timestamp('2024-10-27 02:30')]
+        assert sessions['Ende'].tolist() == [pd.Timestamp('2024-10-27 02:40')]
+        assert sessions['Energie [kWh]'].tolist() == [3.5]
+
+        assert recorder.gap_free_since(data, 900) == datetime(2024, 10, 27, 0, 0)
+        assert recorder.covered_until(data, datetime(2024, 10, 27, 1, 0), 900) == datetime(2024, 10, 27, 5, 0)
+        assert recorder.epoch_ms(datetime(2024, 10, 27, 5, 0)) == data['time'][-1]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_buffer_is_kept_when_writing_fails(make_stub, tmp_path):
+    stub = make_stub()
+    # Das Verzeichnis der Aufzeichnung ist eine Datei: jedes Schreiben schlägt fehl
+    root = tmp_path / 'telemetrie'
+    root.write_text('')
+    client = goe_api.GoeApiClient(retries=0, retry_delay=0.01, **stub.client_options())
+    live = recorder.TelemetryRecorder([stub.charger_config('111111')], str(root), interval=0.02, heartbeat=0.05,
+                                      flush_samples=2, client=client)
+
+    thread = threading.Thread(target=live.record, args=(stub.charger_config('111111'),))
+    thread.start()
+    time.sleep(0.5)
+    live.stop_event.set()
+    thread.join(5)
+
+    # Beim Beenden wird nicht mit einer Ausnahme abgebrochen; die Messwerte bleiben im Puffer
+    assert not thread.is_alive()
+    assert live.errors['111111'] >= 2
+    assert len(live.buffers['111111']) >= 2
+
+
+def test_recording_against_stub_stops_at_gap(make_stub, tmp_path):
+    stub = make_stub(cycle_seconds=0.4, cycle_wh=1000)
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    root = str(tmp_path / 'telemetrie')
+    client = goe_api.GoeApiClient(retries=0, retry_delay=0.01, **stub.client_options())
+    config = stub.charger_config('111111')
+    live = recorder.TelemetryRecorder([config], root, interval=0.02, heartbeat=0.1, flush_seconds=0.2,
+                                      client=client)
+    with live:
+        time.sleep(0.1)
+        goe_api.refresh_sessions(config, store, client=client)
+        exported = store.last_session_start('111111')
+        time.sleep(1.5)
+        stub.failures.add('local_down')
+        time.sleep(0.6)
+        gap_start = datetime.now()
+        stub.failures.discard('local_down')
+        time.sleep(1.0)
+
+    recorded = recorder.recorded_sessions(root, '111111')
+    assert len(recorded) >= 4
+    assert recorder.sync_store(root, store, ['111111'], max_gap=0.3)['111111'] >= 2
+    # Übernommen wird nur bis zur Lücke; der Export-Stand bleibt davor
+    assert store.last_fetch('111111') < gap_start
+    stored = store.query('111111', date.today(), date.today())
+    assert len(stored) and (stored['Ende'] <= pd.Timestamp(gap_start)).all()
+    assert exported < store.last_session_start('111111')
@@ -0,0 +1,41 @@
+"""Tests für den Zwischenspeicher fertiger Berichte."""
+
+# Standard Library Imports
+import os
+import threading
+
+# Local Imports
+from report_cache import ReportCache
+
+
+def test_store_from_parallel_threads(tmp_path):
+    cache = ReportCache(str(tmp_path / 'cache'))
+    sources = []
+    for i in range(8):
+        source = tmp_path / f"bericht_{i}.pdf"
+        source.write_bytes(bytes([i]) * 2 * 1024 * 1024)
+        sources.append(source.read_bytes())
+
+    barrier = threading.Barrier(len(sources))
+    errors = []
+
+    def store(i):
+        barrier.wait()
+        try:
+            for _ in range(5):
+                cache.store('gleich', str(tmp_path / f"bericht_{i}.pdf"))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(len(sources))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # Ein vollständiger Eintrag eines der Threads, keine übrig gebliebenen Zwischendateien
+    assert os.listdir(cache.directory) == ['gleich.pdf']
+    target = tmp_path / 'abgerufen.pdf'
+    assert cache.fetch('gleich', str(target))
+    assert target.read_bytes() in sources
@@ -0,0 +1,117 @@
+"""Tests für die Schlüssel der Ladevorgänge, das Zusammenführen von Exporten und die Umstellung alter Datenbanken."""
+
+# Standard Library Imports
+import sqlite3
+from datetime import date, datetime
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Local Imports
+from session_store import SessionStore, session_keys
+
+
+EXPORT = pd.DataFrame({
+    'Start': pd.to_datetime(['2024-03-01 18:00', '2024-03-02 19:30', '2024-03-03 07:15', '2024-03-04 20:00']),
+    'Ende': pd.to_datetime(['2024-03-01 21:00', '2024-03-02 23:00', '2024-03-03 08:00', '2024-03-04 23:30']),
+    'Energie [kWh]': [10.0, 3.333, 1.111, 7.5]
+})
+
+# Schema vor den Sitzungsschlüsseln: Schlüssel aus Wallbox und Start, ohne RFID-Chip
+BASELINE_SCHEMA = """
+    CREATE TABLE sessions (
+        serial TEXT NOT NULL,
+        start TEXT NOT NULL,
+        ende TEXT NOT NULL,
+        energy_kwh REAL NOT NULL,
+        PRIMARY KEY (serial, start)
+    );
+    CREATE TABLE chargers (
+        serial TEXT PRIMARY KEY,
+        last_fetch TEXT NOT NULL
+    );
+"""
+
+
+def count(store):
+    with store._connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def stored(store, serial):
+    return store.query_chargers([(serial, None)], date(2024, 1, 1), date(2024, 12, 31))
+
+
+def test_session_keys_are_stable_across_formats():
+    keys = session_keys('111111', EXPORT)
+    assert len(set(keys)) == len(EXPORT) and (keys >= 0).all()
+
+    # Anders eingelesen: Zeitpunkte als Texte in Sekunden, Energie mit Rundungsrest, andere Reihenfolge
+    reformatted = pd.DataFrame({
+        'Start': pd.to_datetime(EXPORT['Start'].dt.strftime('%d.%m.%Y %H:%M:%S'), format='%d.%m.%Y %H:%M:%S')
+                   .astype('datetime64[s]'),
+        'Ende': EXPORT['Ende'].astype('datetime64[s]'),
+        'Energie [kWh]': EXPORT['Energie [kWh]'] + 1e-7
+    }).iloc[::-1]
+    assert session_keys('111111', reformatted).tolist() == keys[::-1].tolist()
+
+    # Gleicher Schlüssel nur für dieselbe Wallbox und denselben Ladevorgang
+    assert not set(session_keys('222222', EXPORT)) & set(keys)
+    changed = EXPORT.assign(**{'Energie [kWh]': EXPORT['Energie [kWh]'] + 0.001})
+    assert not set(session_keys('111111', changed)) & set(keys)
+
+
+def test_overlapping_exports_are_merged_once(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.sqlite'))
+    first, second = EXPORT.iloc[:3], EXPORT.iloc[1:]
+
+    assert store.merge_sessions('111111', first) == 3
+    assert store.merge_sessions('111111', second) == 1
+    assert count(store) == 4
+    # Erneut geladen, auch als Ganzes und mit doppelten Zeilen im Export
+    assert store.merge_sessions('111111', first) == 0
+    assert store.merge_sessions('111111', pd.concat([EXPORT, EXPORT])) == 0
+    assert store.add_sessions('111111', EXPORT, datetime(2024, 3, 5)) == 0
+    assert count(store) == 4
+    assert stored(store, '111111')['Energie [kWh]'].tolist() == EXPORT['Energie [kWh]'].tolist()
+
+    # Dieselben Zeiten an einer anderen Wallbox sind eigene Ladevorgänge
+    assert store.merge_sessions('222222', EXPORT) == 4
+    assert count(store) == 8
+
+
+def test_migrates_baseline_database(tmp_path):
+    db_file = str(tmp_path / 'sessions.sqlite')
+    conn = sqlite3.connect(db_file)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?)", [
+        ('111111', start.isoformat(), ende.isoformat(), energy)
+        for start, ende, energy in zip(EXPORT['Start'], EXPORT['Ende'], EXPORT['Energie [kWh]'])])
+    conn.execute("INSERT INTO sessions VALUES ('222222', '2024-03-01T12:00:00', '2024-03-01T13:00:00', 2.5)")
+    conn.execute("INSERT INTO chargers VALUES ('111111', '2024-03-05T08:00:00')")
+    conn.commit()
+    conn.close()
+
+    store = SessionStore(db_file)
+    assert count(store) == 5
+    sessions = stored(store, '111111')
+    assert sessions['Start'].tolist() == EXPORT['Start'].tolist()
+    assert sessions['Energie [kWh]'].tolist() == EXPORT['Energie [kWh]'].tolist()
+    assert sessions['ID Chip'].isna().all()
+    assert store.last_fetch('111111') == datetime(2024, 3, 5, 8)
+    assert store.covered_from('111111') is None
+    assert store.covers('111111', date(2024, 3, 4))
+
+    # Umgestellte Ladevorgänge haben dieselben Schlüssel wie ein neuer Export
+    with store._connect() as conn:
+        keys = [row[0] for row in conn.execute("SELECT session_key FROM sessions WHERE serial = '111111'")]
+    assert sorted(keys) == sorted(session_keys('111111', EXPORT).tolist())
+    assert store.merge_sessions('111111', EXPORT) == 0
+
+    # Erneutes Öffnen stellt nichts mehr um
+    assert count(SessionStore(db_file)) == 5
+    with sqlite3.connect(db_file) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'sessions', 'chargers'}
+    assert np.array_equal(stored(SessionStore(db_file), '222222')['Energie [kWh]'], [2.5])
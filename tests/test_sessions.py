@@ -0,0 +1,69 @@
+"""Tests für das blockweise Einlesen des CSV-Exports."""
+
+# Standard Library Imports
+from datetime import date, datetime
+
+# Third Party Imports
+import pandas as pd
+import pytest
+
+# Local Imports
+from sessions import parse_sessions, SESSION_COLUMNS
+
+
+HEADER = 'Start;Ende;Energie [kWh];ID Chip\n'
+
+
+def export(days=10):
+    """Ein Ladevorgang pro Tag ab dem 1.3.2024, 18:00 bis 21:00 Uhr."""
+    rows = [f"{day:02d}.03.2024 18:00:00;{day:02d}.03.2024 21:00:00;{day},5;Chip {day % 2}\n"
+            for day in range(1, days + 1)]
+    return HEADER + ''.join(rows)
+
+
+@pytest.mark.parametrize('filters, days', [
+    ({'since': datetime(2024, 3, 4, 18)}, list(range(5, 11))),
+    ({'start_date': date(2024, 3, 3)}, list(range(3, 11))),
+    ({'end_date': date(2024, 3, 7)}, list(range(1, 8))),
+    ({'since': datetime(2024, 3, 2), 'start_date': date(2024, 3, 4), 'end_date': date(2024, 3, 8)},
+     list(range(4, 9))),
+])
+def test_filters_span_several_chunks(filters, days):
+    # Drei Zeilen pro Block: die Treffer verteilen sich auf mehrere Blöcke
+    sessions = parse_sessions(export(), chunksize=3, **filters)
+    assert sessions['Start'].dt.day.tolist() == days
+    assert sessions['Energie [kWh]'].tolist() == [day + 0.5 for day in days]
+    assert list(sessions.index) == list(range(len(days)))
+    pd.testing.assert_frame_equal(sessions, parse_sessions(export(), **filters))
+
+
+def test_filters_exclude_everything():
+    sessions = parse_sessions(export(), start_date=date(2024, 4, 1), chunksize=3)
+    assert sessions.empty and list(sessions.columns) == SESSION_COLUMNS
+
+
+def test_missing_column_is_reported():
+    csv_data = 'Start;Energie [kWh]\n01.03.2024 18:00:00;1,5\n'
+    with pytest.raises(ValueError, match='Spalten fehlen im Export: Ende'):
+        parse_sessions(csv_data)
+    with pytest.raises(ValueError, match='Start, Ende, Energie'):
+        parse_sessions('Datum;Wert\n')
+
+
+def test_header_only_export():
+    sessions = parse_sessions(HEADER, chunksize=3)
+    assert sessions.empty
+    assert list(sessions.columns) == SESSION_COLUMNS
+    assert str(sessions['Start'].dtype).startswith('datetime64')
+    assert sessions['Energie [kWh]'].dtype == 'float64'
+
+
+def test_blank_end():
+    # Ein noch laufender Ladevorgang hat kein Ende
+    csv_data = export(3) + '04.03.2024 18:00:00;;0,5;Chip 0\n'
+    sessions = parse_sessions(csv_data, chunksize=2)
+    assert len(sessions) == 4
+    assert pd.isna(sessions['Ende'].iloc[-1])
+    assert sessions['ID Chip'].tolist() == ['Chip 1', 'Chip 0', 'Chip 1', 'Chip 0']
+    # Mit end_date zählt nur, was bis dahin beendet wurde
+    assert len(parse_sessions(csv_data, end_date=date(2024, 3, 31), chunksize=2)) == 3
@@ -0,0 +1,123 @@
+"""Tests für die Aufteilung der Kosten auf Tarifzeiten und die Rundung auf Cent."""
+
+# Standard Library Imports
+from decimal import Decimal
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local Imports
+from tariffs import Tariff, tariff_from_spec, price_units
+from report_model import build_report_model, energy_wh, to_cents
+
+
+HT_NT = {
+    'prices': [{'valid_from': '2024-01-01', 'ht': '0,40', 'nt': '0,20'},
+               {'valid_from': '2024-07-01', 'ht': '0,50', 'nt': '0,30'}],
+    'ht_hours': ['06:00', '22:00'],
+    'ht_weekdays': [0, 1, 2, 3, 4]
+}
+
+
+def split(tariff, sessions):
+    starts = pd.to_datetime([start for start, _, _ in sessions])
+    ends = pd.to_datetime([end for _, end, _ in sessions])
+    return tariff.split(starts, ends, np.array([wh for _, _, wh in sessions]))
+
+
+def test_price_units_rounds_half_up():
+    assert price_units('0,30') == 3000
+    assert price_units('0.12345') == 1235
+
+
+def test_flat_price():
+    cost, ht_wh = split(Tariff.flat('0,30'), [('2024-03-01 10:00', '2024-03-01 12:00', 10000)])
+    assert to_cents(cost).tolist() == [300]
+    assert ht_wh.tolist() == [10000]
+
+
+def test_energy_is_split_evenly_over_ht_and_nt():
+    # Montag 21:00 bis 23:00: eine Stunde HT, eine Stunde NT
+    cost, ht_wh = split(Tariff.from_dict(HT_NT), [('2024-01-08 21:00', '2024-01-08 23:00', 2000)])
+    assert ht_wh[0] == pytest.approx(1000)
+    assert to_cents(cost).tolist() == [60]
+
+
+def test_weekend_is_nt():
+    cost, ht_wh = split(Tariff.from_dict(HT_NT), [('2024-01-06 10:00', '2024-01-06 12:00', 1000)])
+    assert ht_wh[0] == 0
+    assert to_cents(cost).tolist() == [20]
+
+
+def test_price_change_at_valid_from():
+    # Sonntag 30.06. 23:00 bis Montag 01.07. 01:00, durchgehend NT: je eine Stunde zum alten und neuen Preis
+    cost, _ = split(Tariff.from_dict(HT_NT), [('2024-06-30 23:00', '2024-07-01 01:00', 2000)])
+    assert to_cents(cost).tolist() == [50]
+
+
+def test_price_before_first_valid_from():
+    cost, _ = split(Tariff.from_dict(HT_NT), [('2023-12-27 10:00', '2023-12-27 11:00', 1000)])
+    assert to_cents(cost).tolist() == [40]
+
+
+def test_session_without_duration_uses_price_at_start():
+    cost, ht_wh = split(Tariff.from_dict(HT_NT), [('2024-01-08 05:00', '2024-01-08 05:00', 1000),
+                                                  ('2024-01-08 12:00', '2024-01-08 11:00', 1000)])
+    assert to_cents(cost).tolist() == [20, 40]
+    assert ht_wh.tolist() == [0, 1000]
+
+
+def test_many_sessions_match_single_sessions():
+    rng = np.random.default_rng(1)
+    starts = pd.Timestamp('2024-05-01') + pd.to_timedelta(rng.integers(0, 120 * 86400, 200), unit='s')
+    ends = starts + pd.to_timedelta(rng.integers(0, 20 * 3600, 200), unit='s')
+    wh = rng.integers(100, 50000, 200)
+    tariff = Tariff.from_dict(HT_NT)
+    cost, ht_wh = tariff.split(starts, ends, wh)
+    for i in range(0, 200, 17):
+        single_cost, single_ht = tariff.split(starts[i:i + 1], ends[i:i + 1], wh[i:i + 1])
+        assert cost[i] == pytest.approx(single_cost[0])
+        assert ht_wh[i] == pytest.approx(single_ht[0])
+
+
+def test_to_cents_rounds_half_up():
+    # Kosten in 1/10^7 EUR
+    assert to_cents([49999, 50000, 149999, 150000, 0]).tolist() == [0, 1, 1, 2, 0]
+
+
+def test_energy_wh_rounds_to_whole_wh():
+    assert energy_wh([1.2344, 1.2346, 0.0004]).tolist() == [1234, 1235, 0]
+
+
+def test_report_totals_match_table_rows():
+    sessions = pd.DataFrame({
+        'Start': pd.to_datetime(['2024-01-08 21:00', '2024-01-08 23:30', '2024-01-09 07:00']),
+        'Ende': pd.to_datetime(['2024-01-08 23:00', '2024-01-09 01:30', '2024-01-09 08:00']),
+        'Energie [kWh]': [2.0, 3.333, 1.111]
+    })
+    tariff = tariff_from_spec({'tariff': HT_NT})
+    for mode in ('daily', 'sessions'):
+        model = build_report_model(sessions, tariff, mode)
+        rows = list(model['rows'])
+        assert sum(float(row[-1]) for row in rows) == pytest.approx(float(model['total_cost']))
+        assert model['total_energy'] == Decimal('6.44')
+    # 2 kWh: 1 HT + 1 NT = 0,60; 3,333 kWh NT = 0,67; 1,111 kWh HT = 0,44
+    assert [row[-1] for row in build_report_model(sessions, tariff, 'sessions')['rows']] == ['0.60', '0.67', '0.44']
+    assert ("davon HT / NT:", "2.11 / 4.33 kWh") in build_report_model(sessions, tariff)['summary']
+
+    # 1,005 kWh je Ladevorgang: jede Zeile zeigt 1,01 kWh, die exakte Summe wäre 301,50 kWh
+    sessions = pd.DataFrame({
+        'Start': pd.date_range('2024-01-01 18:00', periods=300, freq='D'),
+        'Energie [kWh]': [1.005] * 300
+    })
+    sessions['Ende'] = sessions['Start'] + pd.Timedelta(hours=2)
+    tariff = tariff_from_spec({'price': '0,30'})
+    for mode in ('sessions', 'daily'):
+        model = build_report_model(sessions, tariff, mode)
+        rows = list(model['rows'])
+        assert {row[-2] for row in rows} == {'1.01'}
+        assert model['total_energy'] == Decimal('303.00')
+        assert model['rows'].subtotal(len(rows))[0] == '303.00'
+        assert ("Gesamtenergie:", "303.00 kWh") in model['summary']